@@ -120,12 +120,13 @@ attributes::
 from .engine import Engine, DecoTable
 from .model import ZH_L16B_GF, ZH_L16C_GF, DecoModelValidator
 from .flow import sender
-from .conveyor import Conveyor
+from .conveyor import Conveyor, AdaptiveConveyor
+from .error import ConfigError
 
-__version__ = '0.14.1'
+__version__ = '0.15.0'
 
 
-def create(time_delta=None, validate=True):
+def create(time_delta=None, validate=True, tolerance=None):
     """
     Create decompression engine .
 
@@ -142,15 +143,26 @@ def create(time_delta=None, validate=True):
 
     :param time_delta: Time between dive steps.
     :param validate: Validate decompression data with decompression model
-                     validator.
+                     validator. If integer greater than one, then every
+                     n-th dive step and all decompression stops are
+                     validated.
+    :param tolerance: Select dive steps calculated every time delta with
+                      adaptive conveyor using the tolerance [bar].
     """
+    if tolerance and not time_delta:
+        raise ConfigError('Tolerance requires time delta between dive steps')
+
     engine = Engine()
 
     pipeline = []
     if validate:
-        pipeline.append(DecoModelValidator(engine))
+        pipeline.append(DecoModelValidator(engine, every=int(validate)))
 
-    if time_delta:
+    if time_delta and tolerance:
+        engine.calculate = AdaptiveConveyor(
+            engine, time_delta, tolerance=tolerance
+        )
+    elif time_delta:
         engine.calculate = Conveyor(engine, time_delta)
     engine.calculate = sender(engine.calculate, *pipeline)
 
@@ -37,6 +37,7 @@ The `decotengu.alt` module provides some of such alternatives
   using 1 minute intervals
 - decompression calculations using fixed point arithmetic
 - first decompression stop binary search algorithm
+- first decompression stop candidate scan algorithm
 
 .. - ascent jump - go to next depth, then calculate tissue saturation for time
 ..  which would take to get from previous to next depth (used by those who
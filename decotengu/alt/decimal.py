@@ -85,7 +85,7 @@ the surface
 
     >>> max_error = max(abs(v1[0] - float(v2[0]) + v1[1] - float(v2[1])) for v1, v2 in zip(last.data.tissues, last_dec.data.tissues))
     >>> round(max_error, 10)
-    1.06134e-05
+    7.6244e-06
 
 """
 
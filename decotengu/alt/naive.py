@@ -96,10 +96,11 @@ class AscentJumper(object):
 
         t = engine._pressure_to_time(start.abs_p - abs_p, ascent_rate)
         end_time = int(start.time + t)
-        logger.debug(
-            'ascent from {0.abs_p}bar ({0.time}min) to {1}bar ({2}min))'
-            .format(start, abs_p, end_time)
-        )
+        if __debug__:
+            logger.debug(
+                'ascent from {0.abs_p}bar ({0.time}min) to {1}bar ({2}min))'
+                .format(start, abs_p, end_time)
+            )
 
         step = start
         minute = const.MINUTE
@@ -0,0 +1,168 @@
+#
+# DecoTengu - dive decompression library.
+#
+# Copyright (C) 2013-2018 by Artur Wroblewski <wrobell@riseup.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+.. _algo-scan:
+
+First Decompression Stop Candidate Scan
+---------------------------------------
+Both, the default algorithm finding first decompression stop and its
+binary search alternative (see :ref:`algo-bisect`), evaluate candidate
+depths of first decompression stop one by one, and each evaluation
+requires calculation of tissues gas loading.
+
+The candidate scan algorithm calculates tissues gas loading for all
+candidate depths at once. The candidate depths are the target depth and
+all depths divisible by 3 between the target depth and current depth. They
+are reached by ascent for :math:`dt + i * t_{3m}` minutes, where
+:math:`i = 0..n - 1`, :math:`n` is the number of candidate depths and
+:math:`dt` is time of ascent to the deepest candidate depth. As all of the
+ascents start with the same dive step, the values of exponential function
+of Schreiner equation are
+
+    .. math::
+
+        e^{-k * (dt + i * t_{3m})} = e^{-k * dt} * (e^{-k * t_{3m}})^i
+
+so the exponential function is called twice for each tissue compartment
+and inert gas, regardless of the number of candidate depths.
+
+Having tissues gas loading for all candidate depths, the ascent ceiling
+limits are calculated in one pass. Then, the ascent to current ascent
+ceiling limit (rounded to depth divisible by 3) is repeated using the
+precomputed ascent ceiling limits, while it is possible to do so. This is
+the rule of the default algorithm finding first decompression stop, therefore
+both algorithms find the same decompression stops.
+
+The complexity of the algorithm is :math:`O(n)`, where :math:`n` is
+number of candidate depths, but its inner loop is much cheaper than
+call of the exponential function. The algorithm is implemented by
+:py:class:`decotengu.alt.scan.ScanFindFirstStop` class.
+"""
+
+import math
+import logging
+
+from ..engine import Phase, Step
+from .. import const
+
+logger = logging.getLogger(__name__)
+
+
+class ScanFindFirstStop(object):
+    """
+    Find first decompression stop using Schreiner equation evaluated for
+    all candidate depths of first decompression stop at once.
+
+    Method returns dive step - start of first decompression stop.
+
+    The first decompression stop depth is searched between depth of
+    starting dive step and target depth parameter. The latter can be
+    surface or any other depth divisible by 3.
+
+    :var engine: DecoTengu decompression engine.
+    """
+    def __init__(self, engine):
+        """
+        Create the callable overriding
+        :py:meth:`decotengu.engine.Engine._find_first_stop`.
+
+        :param engine: DecoTengu decompression engine.
+        """
+        self.engine = engine
+
+
+    def __call__(self, start, abs_p, gas):
+        """
+        Execute candidate scan to find first decompression stop.
+
+        :param start: Starting dive step indicating current depth.
+        :param abs_p: Absolute pressure of target depth - surface or gas
+            switch depth.
+        :param gas: Gas mix configuration.
+
+        .. seealso:: :py:meth:`decotengu.Engine._find_first_stop`
+        """
+        engine = self.engine
+        model = engine.model
+
+        assert start.abs_p > abs_p, '{} vs. {}'.format(start.abs_p, abs_p)
+        assert engine._to_depth(abs_p) % 3 == 0, engine._to_depth(abs_p)
+
+        ts_3m = engine._pressure_to_time(engine._p3m, engine.ascent_rate)
+
+        # candidate depths are target depth and depths divisible by 3
+        # between target depth and starting depth, the last one is the
+        # deepest candidate
+        n = math.ceil((start.abs_p - abs_p) / engine._p3m - const.EPSILON)
+        dp = start.abs_p - abs_p - (n - 1) * engine._p3m
+        dt = engine._pressure_to_time(dp, engine.ascent_rate)
+        if __debug__:
+            logger.debug(
+                'find first stop: {}bar -> {}bar, {}min, n={}, dt={}min'
+                .format(start.abs_p, abs_p, start.time, n, dt)
+            )
+        assert n > 0 and dt > 0, (n, dt)
+
+        # tissues gas loading and ascent ceiling limits for all candidate
+        # depths, from the deepest to the shallowest one
+        gf = start.data.gf
+        rate = -engine.ascent_rate * engine._meter_to_bar
+        candidates = model.load_series(
+            start.abs_p, ts_3m, n, gas, rate, start.data, offset=dt
+        )
+        limits = model.ceiling_limits(candidates, gf)
+
+        # ascend to ascent ceiling limit rounded to 3m, while it is
+        # possible, see `Engine._find_first_stop`; k == -1 is starting
+        # dive step
+        k = -1
+        limit = model.ceiling_limit(start.data, gf)
+        while True:
+            target = max(abs_p, engine._ceil_pressure_3m(limit))
+            i = n - 1 - engine._n_stops(target, abs_p)
+            if i <= k:
+                break
+            k = i
+            limit = limits[k]
+
+        if k == -1:
+            stop = start
+            if __debug__:
+                logger.debug('find first stop: already at deco zone')
+        else:
+            time = dt + k * ts_3m
+            p = start.abs_p - engine._time_to_pressure(time, engine.ascent_rate)
+            stop = Step(Phase.ASCENT, p, start.time + time, gas, candidates[k])
+
+            if __debug__:
+                depth = engine._to_depth(p)
+                assert depth % 3 == 0, \
+                    'Invalid first stop depth pressure {}bar ({}m)' \
+                    .format(p, depth)
+
+                logger.debug(
+                    'find first stop: found at {}, ascent time={}'
+                    .format(p, time)
+                )
+
+        return stop
+
+
+# vim: sw=4:et:ai
@@ -44,30 +44,35 @@ inert gas exposure with exponential function
 
         e^{-k * t}
 
-We can precompute the values for above function for 1 minute and for
-6 seconds intervals and store them in a table for each gas decay constant
-:math:`k`. Then, exponential function results can be calculated with
-formula
+We can precompute the values for above function for time quantum
+:math:`t_q` (6 seconds by default) and for its powers-of-two multiples
+:math:`2^j * t_q`, where :math:`j = 0..m`, and store them in a table for
+each gas decay constant :math:`k`. Time :math:`t` is expressed as integer
+number of time quanta
 
     .. math::
 
-        e^{-k * t} = (e_{1min}) ^ {n_{1min}} * (e_{6s}) ^ {n_{6s}}
+        n = t / t_q = \\sum_{j=0}^{m - 1} b_j * 2^j + q * 2^m
 
-where
+where :math:`b_j` are bits of the number :math:`n`. Then, exponential
+function results can be calculated with formula
+
+    .. math::
 
-:math:`e_{1min}`
-    Exponential function value :math:`e^{-k * 1}`.
+        e^{-k * t} = (e_{2^m}) ^ q * \\prod_{b_j = 1} e_{2^j}
+
+where
 
-:math:`e_{6s}`
-    Exponential function value :math:`e^{-k * 0.1}` (:math:`0.1` is
-    6 seconds).
+:math:`e_{2^j}`
+    Exponential function value :math:`e^{-k * 2^j * t_q}`.
 
-:math:`n_{1min}`
-    Number of one minute time intervals :math:`t\ div\ 1` in time :math:`t`.
+:math:`q`
+    Number of :math:`2^m * t_q` time intervals in time :math:`t`, which is
+    zero unless time is longer than :math:`2^m * t_q` (over 102 minutes
+    for default configuration).
 
-:math:`n_{6s}`
-    Number of 6 second time intervals :math:`(t\ mod\ 1) * 10` in time
-    :math:`t\ mod\ 1`.
+Therefore, value of exponential function is a product of
+:math:`O(log(n))` precomputed values.
 
 The precalculated values of exponential function imply configuration
 constraints, which are discussed in the following section.
@@ -78,16 +83,39 @@ Configuration Constraints
 ~~~~~~~~~~~~~~~~~~~~~~~~~
 The main configuration constraint for DecoTengu tabular calculation is the
 number of precomputed values of exponential function. This is driven by
-limited amount of computer memory.
-
-To keep the number of precomputed values of exponential function constant,
-we need to make ascent and descent rates constant. Therefore, first
-configuration constraint sets ascent and descent rates to 10m/min.
-
-The second configuration constraint is the smallest depth change for which
-tissue saturation can be calculated. By default it is 1m (or 6s at
-10m/min), which forces us to round up current depth value, i.e. from 31.2m
-to 32m.
+limited amount of computer memory. For each gas decay constant, there are
+:math:`m + 1` values stored. The bits of number of time quanta are split
+into indices of the precomputed values with two split tables, one for the
+lower and one for the higher half of :math:`m` bits, so the split tables
+have :math:`2 * 2^{m / 2}` entries. The memory footprint of the tables is
+reported by :py:attr:`decotengu.alt.tab.TabExp.memory` attribute and it
+does not change with time of exposure.
+
+The second configuration constraint is the smallest time change for which
+tissue saturation can be calculated, the time quantum. To calculate tissue
+saturation exactly, all times of exposure have to be multiples of the time
+quantum. Therefore, by default, ascent and descent rates are set to
+10m/min, so the default 6s time quantum is time of 1m depth change.
+
+It is possible to keep arbitrary ascent and descent rates by quantizing
+time of exposure to the time quantum. In such case, tissues gas loading is
+calculated for time of exposure rounded to the nearest multiple of the time
+quantum, while the pressure change is preserved, i.e. ascent or descent is
+performed at a slightly different rate. Rounding only the argument of
+exponential function is not an option, because the Schreiner equation
+relies on cancellation of its terms, which is lost for slow tissue
+compartments when the terms are calculated for different times.
+
+The quantized time of exposure changes tissues gas loading, therefore
+decompression table can differ from the one calculated without tabular
+calculator. For 541 random dive plans (15m to 90m, descent rates from
+5m/min to 25m/min, ascent rates from 3m/min to 18m/min) 159 decompression
+tables differed. The decompression stops differed by up to 2 minutes,
+total decompression time by up to 5 minutes and first decompression stop
+was 3m deeper or shallower for 4 dive plans.
+
+The maximum error of tabular calculator against `math.exp` function can be
+checked with :py:meth:`decotengu.alt.tab.TabExp.max_error` method.
 
 .. _tab-algo:
 
@@ -97,8 +125,12 @@ The values of exponential function are precomputed and stored by tabular
 calculator class :py:class:`decotengu.alt.tab.TabExp`.
 
 The :py:class:`decotengu.alt.tab.TabExp` class divides time into
-one minute segments and 6 seconds segments and caclulates exponential
-function value using formula specified at the begining of this section.
+powers-of-two multiples of time quantum and calculates exponential function
+value using formula specified at the begining of this section.
+
+The :py:class:`decotengu.alt.tab.TimeQuantizer` class rounds time of
+exposure to the multiple of time quantum when loading tissues with inert
+gas.
 
 The helper function :py:func:`decotengu.alt.tab.tab_engine` takes
 decompression engine object as an argument and overrides engine
@@ -139,6 +171,7 @@ Perform calculations
 
 import math
 import logging
+import sys
 
 from .. import const
 
@@ -154,17 +187,38 @@ class TabExp(object):
     Calculate value of exponential function using precomputed values for
     `exp` function.
 
+    :var quantum: Time quantum [min].
+    :var size: Number of powers-of-two multiples of time quantum.
     :var _kt_exp: Collection of precomputed values of exp function for
         nitrogen and helium decay constants :math:`k`.
+    :var _low: Split table of lower bits of number of time quanta into
+        indices of precomputed values of exp function.
+    :var _high: Split table of higher bits of number of time quanta into
+        indices of precomputed values of exp function.
+    :var _one: Value of exp function for zero time.
     """
-    def __init__(self, n2_k_const, he_k_const):
+    def __init__(self, n2_k_const, he_k_const, quantum=None, size=10):
         """
         Create instance of tabular calculator.
 
         The precomputed values of exponential function are calculated.
+
+        :param n2_k_const: Collection of nitrogen decay constants.
+        :param he_k_const: Collection of helium decay constants.
+        :param quantum: Time quantum [min], 6s by default.
+        :param size: Number of powers-of-two multiples of time quantum.
         """
         super().__init__()
 
+        self.quantum = TIME_6S if quantum is None else quantum
+        self.size = size
+        self._one = EXP(0 * self.quantum)
+
+        half = (size + 1) // 2
+        self._half = half
+        self._low = self._split_table(0, half)
+        self._high = self._split_table(half, size - half)
+
         self._kt_exp = self._calc_exp(n2_k_const)
         self._kt_exp.update(self._calc_exp(he_k_const))
 
@@ -172,21 +226,89 @@ class TabExp(object):
     def _calc_exp(self, k_const):
         """
         For each gas decay constant :math:`k` calculate value of
-        exponential function for 1min and 6s.
+        exponential function for powers-of-two multiples of time quantum.
+
+        The table for each constant :math:`k` has `size + 1` values, the
+        last one is for :math:`2^{size}` time quanta.
 
         :param k_const: Collection of gas decay constants :math:`k`.
         """
         kt_exp = {}
         for k in k_const:
             exp = lambda t: EXP(-k * t)
-            kt_exp[k] = {
-                6: exp(TIME_6S),  # 1m at 10m/min
-                60: exp(1),       # 10m at 10m/min
-            }
+            kt_exp[k] = tuple(
+                exp(self.quantum * 2 ** j) for j in range(self.size + 1)
+            )
 
         return kt_exp
 
 
+    def _split_table(self, start, bits):
+        """
+        Create split table of bits of number of time quanta into indices
+        of precomputed values of exponential function.
+
+        The table has an item for each number with specified number of
+        bits. The item is tuple of indices of set bits of the number,
+        offset by the starting bit.
+
+        :param start: Starting bit.
+        :param bits: Number of bits.
+        """
+        return tuple(
+            tuple(j + start for j in range(bits) if n >> j & 1)
+            for n in range(1 << bits)
+        )
+
+
+    def _split(self, n):
+        """
+        Split number of time quanta into indices of precomputed values of
+        exponential function.
+
+        The indices are bits of the number. The index of the last
+        precomputed value is repeated for each :math:`2^{size}` time quanta.
+
+        :param n: Number of time quanta.
+        """
+        q, n = divmod(n, 1 << self.size)
+        mask = (1 << self._half) - 1
+        bits = self._low[n & mask] + self._high[n >> self._half]
+        return bits + (self.size,) * q
+
+
+    @property
+    def memory(self):
+        """
+        Memory footprint of the precomputed values of exponential function
+        and of the split tables [bytes].
+        """
+        size = sum(
+            sys.getsizeof(t) + sum(sys.getsizeof(v) for v in t)
+            for t in self._kt_exp.values()
+        )
+        for table in self._low, self._high:
+            size += sys.getsizeof(table)
+            size += sum(sys.getsizeof(v) for v in table)
+        return size
+
+
+    def max_error(self, time):
+        """
+        Calculate maximum absolute error of tabular calculator against
+        `math.exp` function for all gas decay constants and for all
+        multiples of time quantum up to specified time.
+
+        :param time: Maximum time of exposure [min].
+        """
+        n = math.ceil(time / self.quantum)
+        times = (i * self.quantum for i in range(n + 1))
+        return max(
+            abs(float(self(t, k)) - math.exp(-float(k * t)))
+            for t in times for k in self._kt_exp
+        )
+
+
     def __call__(self, time, k):
         """
         Calculate exponential function value using precomputed values and
@@ -199,37 +321,151 @@ class TabExp(object):
         :param time: Time of exposure [min].
         :param k: Gas decay constant :math:`k` for a tissue compartment.
         """
+        kt_exp = self._kt_exp[k]
+        n = round(time / self.quantum)
+
         if __debug__:
             logger.debug(
-                'tab exp: time to split {}min ({}s)'.format(time, time * 60)
+                'tab exp: time to split {}min ({}s), n={}'.format(
+                    time, time * 60, n
+                )
             )
+            assert abs(n * self.quantum - time) < const.EPSILON, \
+                'Time {}min is not multiple of time quantum'.format(time)
+
+        q, n = divmod(n, 1 << self.size)
+        half = self._half
+        result = self._one
+        for j in self._low[n & ((1 << half) - 1)]:
+            result *= kt_exp[j]
+        for j in self._high[n >> half]:
+            result *= kt_exp[j]
+        for _ in range(q):
+            result *= kt_exp[-1]
+        return result
 
-        kt_exp = self._kt_exp[k]
-        n1 = round(time // 1)
-        n2 = round(time % 1 * 10)
-        result = kt_exp[60] ** n1 * kt_exp[6] ** n2
 
-        if __debug__:
-            logger.debug('tab exp: n1={}, n2={}'.format(n1, n2))
-            assert abs(n1 * 60 + n2 * 6 - time * 60) < const.EPSILON
 
-        return result
+class TimeQuantizer(object):
+    """
+    Decompression model tissues gas loading with time of exposure rounded
+    to the nearest multiple of time quantum.
+
+    The pressure change is preserved, so pressure rate change is adjusted
+    to the rounded time of exposure. Decompression table calculated with
+    quantized time of exposure can differ from the one calculated without
+    the quantization, see :ref:`tab-conf`.
+
+    :var model: Decompression model.
+    :var quantum: Time quantum [min].
+    :var _load: Original tissues gas loading method.
+    :var _load_into: Original tissues gas loading into data buffer method.
+    """
+    def __init__(self, model, quantum):
+        """
+        Create time quantizer for decompression model.
+
+        :param model: Decompression model.
+        :param quantum: Time quantum [min].
+        """
+        self.model = model
+        self.quantum = quantum
+        self._load = model.load
+        self._load_into = model.load_into
+
 
+    def quantize(self, time, rate):
+        """
+        Round time of exposure to the nearest, non-zero multiple of time
+        quantum and adjust pressure rate change.
 
+        :param time: Time of exposure [min].
+        :param rate: Pressure rate change [bar/min].
+        """
+        if time == 0:
+            return time, rate
+
+        t = max(1, round(time / self.quantum)) * self.quantum
+        return t, rate * time / t
+
+
+    def load(self, abs_p, time, gas, rate, data):
+        """
+        Calculate gas loading for all tissue compartments.
 
-def tab_engine(engine):
+        .. seealso:: :py:meth:`decotengu.model.ZH_L16_GF.load`
+        """
+        time, rate = self.quantize(time, rate)
+        return self._load(abs_p, time, gas, rate, data)
+
+
+    def load_into(self, abs_p, time, gas, rate, data, buff):
+        """
+        Calculate gas loading for all tissue compartments and store it in
+        data buffer.
+
+        .. seealso:: :py:meth:`decotengu.model.ZH_L16_GF.load_into`
+        """
+        time, rate = self.quantize(time, rate)
+        return self._load_into(abs_p, time, gas, rate, data, buff)
+
+
+    def load_series(self, abs_p, time, n, gas, rate, data, offset=None):
+        """
+        Calculate gas loading for all tissue compartments for a series of
+        times of exposure.
+
+        Each time of exposure is rounded separately, therefore the tissues
+        gas loading is calculated for each time of exposure with
+        :py:meth:`decotengu.alt.tab.TimeQuantizer.load` method.
+
+        .. seealso:: :py:meth:`decotengu.model.ZH_L16_GF.load_series`
+        """
+        if offset is None:
+            offset = time
+        return tuple(
+            self.load(abs_p, offset + i * time, gas, rate, data)
+            for i in range(n)
+        )
+
+
+
+def tab_engine(engine, quantum=None, size=10, quantize=False):
     """
     Override DecoTengu engine object attributes and methods, so it is
     possible to use tabular tissue calculator.
 
+    If time is not quantized, then descent and ascent rates are set to
+    10m/min. Otherwise, the rates are not changed and time of exposure is
+    rounded to the nearest multiple of time quantum (see
+    :py:class:`decotengu.alt.tab.TimeQuantizer`). The decompression stops
+    calculated with quantized time of exposure can differ by up to few
+    minutes from the stops calculated without tabular calculator, see
+    :ref:`tab-conf`.
+
     :param engine: DecoTengu engine object.
+    :param quantum: Time quantum [min], 6s by default.
+    :param size: Number of powers-of-two multiples of time quantum.
+    :param quantize: Round time of exposure to the nearest multiple of time
+        quantum if true.
     """
     model = engine.model
-    model._exp = TabExp(model.n2_k_const, model.he_k_const)
-
-    logger.warning('overriding descent rate and ascent rate to 10m/min')
-    engine.descent_rate = 10
-    engine.ascent_rate = 10
+    model._exp = TabExp(
+        model.n2_k_const, model.he_k_const, quantum=quantum, size=size
+    )
+
+    if quantize:
+        logger.warning(
+            'quantizing time of exposure to {}min'.format(model._exp.quantum)
+        )
+        quantizer = TimeQuantizer(model, model._exp.quantum)
+        model.load = quantizer.load
+        model.load_into = quantizer.load_into
+        model.load_series = quantizer.load_series
+    else:
+        logger.warning('overriding descent rate and ascent rate to 10m/min')
+        engine.descent_rate = 10
+        engine.ascent_rate = 10
 
 
 # vim: sw=4:et:ai
@@ -0,0 +1,289 @@
+#
+# DecoTengu - dive decompression library.
+#
+# Copyright (C) 2013-2018 by Artur Wroblewski <wrobell@riseup.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Batch calculation of dive plans.
+
+Dive plans are read one per line. A line is either JSON object or text
+with dive depth [m], dive bottom time [min], optional gradient factors
+[percentage] and optional gas mixes in ``dt-lint`` gas list syntax, i.e.::
+
+    40 35
+    40 35 20/90 21,0@0 50,0@21 100,0@6
+    {"depth": 40, "time": 35, "gf_low": 20, "gas_list": "21,0@0 50,0@21"}
+
+The JSON object keys are `depth`, `time`, `gf_low`, `gf_high`,
+`gas_list`, `last_stop_6m`, `pressure` [millibar], `model`,
+`descent_rate`, `descent`, `alt` and `id`. The alternative
+implementations `alt` are specified as list of names or as comma separated
+names, i.e. "tab,bisect". The missing values are taken from the default
+plan parameters.
+
+Decompression engines are configured once for each distinct
+configuration and reused by dive plans
+
+    >>> lines = ['40 35', '45 25 30/85 27,0@0 50,0@22']
+    >>> for result in run_batch(lines, PLAN_DEFAULTS):
+    ...     print(result['line'], result['total'], result['stops'][0])
+    1 51.0 [21.0, 1.0]
+    2 15.0 [18.0, 1.0]
+
+The results of dive plans are returned in input order.
+"""
+
+from collections import deque
+from functools import lru_cache, partial
+import json
+import multiprocessing
+import re
+
+import decotengu
+from .error import EngineError
+
+PLAN_DEFAULTS = {
+    'gf_low': 30,
+    'gf_high': 85,
+    'gas_list': '21,0@0',
+    'last_stop_6m': False,
+    'pressure': None,
+    'model': 'zh-l16b-gf',
+    'descent_rate': 20.0,
+    'descent': True,
+    'alt': (),
+}
+
+# number of configured decompression engines kept by a process
+ENGINE_CACHE_SIZE = 64
+
+# alternative implementations supported by `use_alt`
+ALTERNATIVES = {'ascentjump', 'decostep', 'tab', 'bisect', 'scan'}
+
+
+def parse_gas_list(gas_list):
+    """
+    Parse gas mix list in ``dt-lint`` gas list syntax.
+
+    Tuple of gas mixes is returned, each gas mix is tuple of depth, O2
+    percentage, helium percentage and travel gas mix flag.
+
+    :param gas_list: Gas mix list, i.e. "28,0@0 50,0@22".
+    """
+    if isinstance(gas_list, str):
+        gas_list = gas_list.split()
+    result = []
+    for mix in gas_list:
+        o2, he, depth = re.split('[,@]', mix)
+        travel = o2[0] == '+'
+        result.append((int(depth), int(o2), int(he), travel))
+    return tuple(result)
+
+
+def parse_alt(alt):
+    """
+    Parse collection of alternative implementation names.
+
+    Sorted tuple of names is returned.
+
+    :param alt: Collection of names or comma separated names, i.e.
+        "tab,bisect".
+    """
+    if isinstance(alt, str):
+        alt = alt.split(',') if alt else ()
+    alt = set(alt)
+    invalid = alt - ALTERNATIVES
+    if invalid:
+        raise ValueError(
+            'Invalid alternative(s): {}'.format(', '.join(sorted(invalid)))
+        )
+    return tuple(sorted(alt))
+
+
+def parse_plan(line, defaults):
+    """
+    Parse dive plan line.
+
+    Dictionary of dive plan parameters is returned.
+
+    :param line: Dive plan line (JSON object or text).
+    :param defaults: Default dive plan parameters.
+    """
+    plan = dict(defaults)
+    line = line.strip()
+    if line.startswith('{'):
+        plan.update(json.loads(line))
+    else:
+        items = line.split()
+        if len(items) < 2:
+            raise ValueError('Dive depth and bottom time required')
+        plan['depth'], plan['time'] = (
+            float(v) if '.' in v else int(v) for v in items[:2]
+        )
+        items = items[2:]
+        if items and '/' in items[0]:
+            gf_low, gf_high = items.pop(0).split('/')
+            plan['gf_low'] = int(gf_low)
+            plan['gf_high'] = int(gf_high)
+        if items:
+            plan['gas_list'] = items
+
+    if 'depth' not in plan or 'time' not in plan:
+        raise ValueError('Dive depth and bottom time required')
+    plan['gas_list'] = parse_gas_list(plan['gas_list'])
+    plan['alt'] = parse_alt(plan['alt'])
+    return plan
+
+
+def use_alt(engine, alt):
+    """
+    Override decompression engine with alternative implementations.
+
+    :param engine: DecoTengu decompression engine.
+    :param alt: Collection of alternative implementation names, i.e.
+        `tab`, `bisect`.
+    """
+    if 'ascentjump' in alt:
+        from .alt.naive import AscentJumper
+        engine._free_ascent = AscentJumper(engine)
+    if 'decostep' in alt:
+        from .alt.naive import DecoStopStepper
+        engine._deco_stop = DecoStopStepper(engine)
+    if 'tab' in alt:
+        from .alt.tab import tab_engine
+        tab_engine(engine)
+    if 'bisect' in alt:
+        from .alt.bisect import BisectFindFirstStop
+        engine._find_first_stop = BisectFindFirstStop(engine)
+    if 'scan' in alt:
+        from .alt.scan import ScanFindFirstStop
+        engine._find_first_stop = ScanFindFirstStop(engine)
+
+
+def engine_key(plan):
+    """
+    Create key of decompression engine configuration of a dive plan.
+
+    :param plan: Dive plan parameters.
+    """
+    return (
+        plan['model'], plan['gf_low'], plan['gf_high'], plan['gas_list'],
+        plan['last_stop_6m'], plan['pressure'], plan['descent_rate'],
+        plan['alt'],
+    )
+
+
+@lru_cache(maxsize=ENGINE_CACHE_SIZE)
+def create_engine(key):
+    """
+    Create and configure decompression engine.
+
+    The configured decompression engines are cached, so dive plans with
+    the same configuration reuse decompression engine.
+
+    :param key: Decompression engine configuration, see
+        :py:func:`engine_key`.
+    """
+    model, gf_low, gf_high, gas_list, last_stop_6m, pressure, \
+        descent_rate, alt = key
+
+    engine = decotengu.create()
+    if model == 'zh-l16b-gf':
+        engine.model = decotengu.ZH_L16B_GF()
+    elif model == 'zh-l16c-gf':
+        engine.model = decotengu.ZH_L16C_GF()
+    else:
+        raise ValueError('Unknown decompression model {}'.format(model))
+
+    engine.model.gf_low = gf_low / 100
+    engine.model.gf_high = gf_high / 100
+    engine.last_stop_6m = last_stop_6m
+    if pressure is not None:
+        engine.surface_pressure = pressure / 1000
+    engine.descent_rate = descent_rate
+    for depth, o2, he, travel in gas_list:
+        engine.add_gas(depth, o2, he, travel=travel)
+
+    use_alt(engine, alt)
+    return engine
+
+
+def run_plan(plan):
+    """
+    Calculate dive plan.
+
+    Dictionary with decompression stops and total decompression time is
+    returned.
+
+    :param plan: Dive plan parameters.
+    """
+    engine = create_engine(engine_key(plan))
+    data = engine.calculate(plan['depth'], plan['time'], descent=plan['descent'])
+    deque(data, maxlen=0)
+
+    result = {'depth': plan['depth'], 'time': plan['time']}
+    if 'id' in plan:
+        result['id'] = plan['id']
+    result['stops'] = [[s.depth, s.time] for s in engine.deco_table]
+    result['total'] = engine.deco_table.total
+    return result
+
+
+def run_line(defaults, item):
+    """
+    Parse and calculate dive plan line.
+
+    Errors are reported in the result dictionary.
+
+    :param defaults: Default dive plan parameters.
+    :param item: Tuple of line number and dive plan line.
+    """
+    no, line = item
+    try:
+        result = run_plan(parse_plan(line, defaults))
+    except (ValueError, KeyError, TypeError, EngineError) as ex:
+        result = {'error': str(ex)}
+    result['line'] = no
+    return result
+
+
+def run_batch(lines, defaults, jobs=1, chunk_size=16):
+    """
+    Calculate dive plans.
+
+    Empty lines and lines starting with `#` are skipped. If number of jobs
+    is greater than one, then dive plans are calculated by pool of worker
+    processes. Iterator of results is returned in input order.
+
+    :param lines: Dive plan lines.
+    :param defaults: Default dive plan parameters.
+    :param jobs: Number of worker processes.
+    :param chunk_size: Number of dive plans sent to a worker at once.
+    """
+    items = (
+        (no, line) for no, line in enumerate(lines, 1)
+        if line.strip() and not line.lstrip().startswith('#')
+    )
+    f = partial(run_line, defaults)
+    if jobs > 1:
+        with multiprocessing.Pool(jobs) as pool:
+            yield from pool.imap(f, items, chunksize=chunk_size)
+    else:
+        yield from map(f, items)
+
+
+# vim: sw=4:et:ai
@@ -0,0 +1,354 @@
+#
+# DecoTengu - dive decompression library.
+#
+# Copyright (C) 2013-2018 by Artur Wroblewski <wrobell@riseup.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+DecoTengu benchmarks.
+
+The benchmarks measure time and memory of dive profile calculation for
+few diving scenarios (see `SCENARIOS`) and for various configurations of
+decompression engine, i.e. alternative implementations (see `CONFIGS`).
+
+Each benchmark creates decompression engine, performs warmup calculations
+and then measures time of the calculation several times. Peak memory and
+number of memory blocks held by dive steps are measured for one additional
+calculation with `tracemalloc` module.
+
+    >>> result = run_benchmark('standard', 'shallow', number=1, repeat=2)
+    >>> result.config, result.scenario, len(result.times)
+    ('standard', 'shallow', 2)
+
+The results can be saved in JSON file and compared with results saved
+previously (baseline), see :py:func:`decotengu.bench.compare` function.
+
+The benchmarks are run with ``dt-perf`` script.
+"""
+
+from collections import namedtuple
+from contextlib import contextmanager
+from decimal import Decimal
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+import decotengu
+from .alt.bisect import BisectFindFirstStop
+from .alt.decimal import DecimalContext
+from .alt.naive import DecoStopStepper
+from .alt.scan import ScanFindFirstStop
+from .alt.tab import tab_engine
+from .conveyor import Conveyor
+
+Config = namedtuple('Config', 'type overrides')
+Config.__doc__ = """
+Configuration of decompression engine used by a benchmark.
+
+:var type: Numeric type of decompression engine parameters.
+:var overrides: Functions overriding decompression engine attributes.
+"""
+
+Result = namedtuple(
+    'Result',
+    'config scenario number times min median mean stdev memory_peak'
+    ' memory_blocks'
+)
+Result.__doc__ = """
+Benchmark result.
+
+:var config: Configuration name.
+:var scenario: Scenario name.
+:var number: Number of calculations in a benchmark run.
+:var times: Time of one calculation for each benchmark run [s].
+:var min: Minimum time of calculation [s].
+:var median: Median time of calculation [s].
+:var mean: Mean time of calculation [s].
+:var stdev: Standard deviation of time of calculation [s].
+:var memory_peak: Peak memory allocated during calculation [bytes].
+:var memory_blocks: Number of memory blocks held by dive steps.
+"""
+
+Comparison = namedtuple(
+    'Comparison', 'config scenario metric baseline value change regression'
+)
+Comparison.__doc__ = """
+Comparison of benchmark result with baseline result.
+
+:var config: Configuration name.
+:var scenario: Scenario name.
+:var metric: Compared metric, i.e. `median` or `memory_peak`.
+:var baseline: Baseline value of the metric.
+:var value: Value of the metric.
+:var change: Relative change of the metric.
+:var regression: True if change of the metric is above threshold.
+"""
+
+# compared metrics of benchmark results
+METRICS = 'median', 'memory_peak'
+
+
+def create_engine(type=float):
+    """
+    Create decompression engine for benchmarks.
+
+    :param type: Numeric type of decompression engine parameters.
+    """
+    engine = decotengu.create(validate=False)
+    engine.ascent_rate = type(10)
+    engine.descent_rate = type(10)
+    engine.model.gf_low = type(0.3)
+    engine.model.gf_high = type(0.85)
+    return engine
+
+
+def dive_shallow(type=float):
+    """
+    Shallow dive profile on Air. No gas mix switches.
+
+    :param type: Numeric type of decompression engine parameters.
+    """
+    engine = create_engine(type=type)
+    engine.add_gas(type(0), type(21), type(0))
+    return engine, type(17), type(90)
+
+
+def dive_u260(type=float):
+    """
+    Nitrox dive with one gas switch.
+
+    The gas mix switch is performed at 22m, before first decompression stop
+    at 18m.
+
+    :param type: Numeric type of decompression engine parameters.
+    """
+    engine = create_engine(type=type)
+    engine.add_gas(type(0), type(27), type(0))
+    engine.add_gas(type(22), type(50), type(0))
+    return engine, type(45), type(25)
+
+
+def dive_trimix(type=float):
+    """
+    Trimix dive with two gas mix switches.
+
+    :param type: Numeric type of decompression engine parameters.
+    """
+    engine = create_engine(type=type)
+    engine.add_gas(type(0), type(18), type(45))
+    engine.add_gas(type(22), type(50), type(0))
+    engine.add_gas(type(6), type(100), type(0))
+    return engine, type(68), type(20)
+
+
+def dive_deepstop(type=float):
+    """
+    Trimix dive with three gas mix switches.
+
+    This is dive profile presented in Baker "Deep Stops" paper.
+
+    See figure 3, page 7 of the paper for the dive profile and
+    decompression stops information.
+
+    The first gas mix switch is performed at 33m, after first deco stop at
+    57m.
+
+    :param type: Numeric type of decompression engine parameters.
+    """
+    engine = create_engine(type=type)
+    engine.model.gf_low = type(0.2)
+    engine.model.gf_high = type(0.75)
+    engine.add_gas(type(0), type(13), type(50))
+    engine.add_gas(type(33), type(36), type(0))
+    engine.add_gas(type(21), type(50), type(0))
+    engine.add_gas(type(9), type(80), type(0))
+    return engine, type(90), type(20)
+
+
+def _stepper(engine):
+    engine._deco_stop = DecoStopStepper(engine)
+
+
+def _bisect(engine):
+    engine._find_first_stop = BisectFindFirstStop(engine)
+
+
+def _scan(engine):
+    engine._find_first_stop = ScanFindFirstStop(engine)
+
+
+def _conveyor(time_delta):
+    def f(engine):
+        engine.calculate = Conveyor(engine, time_delta)
+    return f
+
+
+SCENARIOS = {
+    'shallow': dive_shallow,
+    'u260': dive_u260,
+    'trimix': dive_trimix,
+    'deepstop': dive_deepstop,
+}
+
+CONFIGS = {
+    'standard': Config(float, ()),
+    'stepper': Config(float, (_stepper,)),
+    'bisect': Config(float, (_bisect,)),
+    'scan': Config(float, (_scan,)),
+    'tab': Config(float, (tab_engine,)),
+    'tab-stepper': Config(float, (_stepper, tab_engine)),
+    'tab-decimal': Config(Decimal, (tab_engine,)),
+    'conveyor-1min': Config(float, (_conveyor(1),)),
+    'conveyor-1s': Config(float, (_conveyor(1 / 60),)),
+}
+
+
+@contextmanager
+def _type_context(type):
+    """
+    Create context for numeric type of decompression engine parameters.
+    """
+    if type is Decimal:
+        with DecimalContext():
+            yield
+    else:
+        yield
+
+
+def run_benchmark(config, scenario, number=10, repeat=5, warmup=1):
+    """
+    Run benchmark of dive profile calculation for a configuration and
+    a scenario.
+
+    :param config: Configuration name, see `CONFIGS`.
+    :param scenario: Scenario name, see `SCENARIOS`.
+    :param number: Number of calculations in a benchmark run.
+    :param repeat: Number of benchmark runs.
+    :param warmup: Number of calculations before benchmark runs.
+    """
+    cfg = CONFIGS[config]
+    with _type_context(cfg.type):
+        engine, depth, t = SCENARIOS[scenario](type=cfg.type)
+        for f in cfg.overrides:
+            f(engine)
+
+        calculate = lambda: tuple(engine.calculate(depth, t, descent=False))
+        for i in range(warmup):
+            calculate()
+
+        times = []
+        for i in range(repeat):
+            t1 = time.perf_counter()
+            for j in range(number):
+                calculate()
+            t2 = time.perf_counter()
+            times.append((t2 - t1) / number)
+
+        tracemalloc.start()
+        try:
+            steps = calculate()
+            blocks = len(tracemalloc.take_snapshot().traces)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del steps
+
+    return Result(
+        config, scenario, number, times, min(times),
+        statistics.median(times), statistics.mean(times),
+        statistics.stdev(times) if len(times) > 1 else 0.0,
+        peak, blocks,
+    )
+
+
+def run_benchmarks(configs=None, scenarios=None, **kw):
+    """
+    Run benchmarks for configurations and scenarios.
+
+    Iterator of benchmark results is returned.
+
+    :param configs: Configuration names (all by default).
+    :param scenarios: Scenario names (all by default).
+    :param kw: Parameters of :py:func:`decotengu.bench.run_benchmark`
+        function.
+    """
+    configs = CONFIGS if configs is None else configs
+    scenarios = SCENARIOS if scenarios is None else scenarios
+    for config in configs:
+        for scenario in scenarios:
+            yield run_benchmark(config, scenario, **kw)
+
+
+def save_results(f, results):
+    """
+    Save benchmark results in JSON file.
+
+    :param f: File object.
+    :param results: Collection of benchmark results.
+    """
+    data = {
+        'decotengu': decotengu.__version__,
+        'python': platform.python_version(),
+        'results': [r._asdict() for r in results],
+    }
+    json.dump(data, f, indent=2)
+
+
+def load_results(f):
+    """
+    Load benchmark results from JSON file.
+
+    :param f: File object.
+    """
+    data = json.load(f)
+    return [Result(**r) for r in data['results']]
+
+
+def compare(baseline, results, threshold=0.1, memory_threshold=0.1):
+    """
+    Compare benchmark results with baseline results.
+
+    The median time and peak memory of a benchmark result is compared with
+    baseline result of the same configuration and scenario. Regression is
+    reported when relative change of a metric is above threshold. Results
+    without baseline result are skipped.
+
+    Iterator of comparisons is returned.
+
+    :param baseline: Collection of baseline benchmark results.
+    :param results: Collection of benchmark results.
+    :param threshold: Threshold of relative change of time.
+    :param memory_threshold: Threshold of relative change of memory.
+    """
+    index = {(r.config, r.scenario): r for r in baseline}
+    thresholds = {'median': threshold, 'memory_peak': memory_threshold}
+    for r in results:
+        base = index.get((r.config, r.scenario))
+        if base is None:
+            continue
+        for metric in METRICS:
+            v1 = getattr(base, metric)
+            v2 = getattr(r, metric)
+            change = (v2 - v1) / v1 if v1 else 0.0
+            yield Comparison(
+                r.config, r.scenario, metric, v1, v2, change,
+                change > thresholds[metric]
+            )
+
+
+# vim: sw=4:et:ai
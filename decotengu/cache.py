@@ -0,0 +1,289 @@
+#
+# DecoTengu - dive decompression library.
+#
+# Copyright (C) 2013-2018 by Artur Wroblewski <wrobell@riseup.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Dive plan prefix cache.
+
+Decompression engine calculates dive profile as a sequence of segments -
+descent, bottom time, ascent, gas mix switch, decompression stop. A
+segment is defined by its kind, gas mix, time, ascent or descent rate and
+gradient factor, and it transforms dive step at its start into dive step
+at its end. As dive step contains tissues gas loading, dive steps are
+snapshots of tissues state at segment boundaries.
+
+Dive plans, which differ at their tail only, i.e. by additional
+decompression gas mix or by last decompression stop at 6m, share the
+prefix of their sequence of segments. The cache stores dive steps in
+a trie, where the trie edges are labeled with segments. A dive profile
+calculation walks the trie reusing cached dive steps, so it resumes at the
+end of the deepest matching prefix. The least recently used trie edges
+are evicted from the cache.
+
+Create the decompression engine and install the cache with
+:py:func:`decotengu.cache.plan_cache` function
+
+    >>> import decotengu
+    >>> from decotengu.cache import plan_cache
+    >>> engine = decotengu.create()
+    >>> engine.add_gas(0, 21)
+    >>> engine.add_gas(21, 50)
+    >>> cache = plan_cache(engine)
+    >>> profile = list(engine.calculate(45, 30))
+    >>> engine.deco_table.total
+    29.0
+
+Perform last decompression stop at 6m. The descent, the bottom part of
+the dive and decompression stops deeper than 6m are reused
+
+    >>> engine.last_stop_6m = True
+    >>> profile = list(engine.calculate(45, 30))
+    >>> engine.deco_table.total
+    31.0
+    >>> cache.hits, cache.saved_loads
+    (18, 26)
+
+Install the cache after other overrides of decompression engine and
+decompression model methods are applied, i.e. after
+:py:func:`decotengu.alt.tab.tab_engine` function is called.
+"""
+
+from collections import OrderedDict
+from functools import wraps
+
+from . import const
+
+# decompression model methods calculating tissues gas loading
+LOAD_METHODS = 'load', 'load_into', 'load_series'
+
+
+def _key_switch(engine, step, gas):
+    return 'switch', gas
+
+
+def _key_const(engine, step, time, gas, phase='const'):
+    return 'const', time, gas, phase
+
+
+def _key_descent(engine, step, time, gas, phase='descent'):
+    return 'descent', time, gas, phase, engine.descent_rate
+
+
+def _key_ascent(engine, step, time, gas, gf=None, phase='ascent'):
+    return 'ascent', time, gas, gf, phase, engine.ascent_rate
+
+
+def _key_first_stop(engine, step, abs_p, gas):
+    return 'first_stop', abs_p, gas, engine.ascent_rate
+
+
+def _key_ndl(engine, step, gas):
+    return 'ndl', gas, engine.model.gf_high, engine.ascent_rate, \
+        engine.surface_pressure
+
+
+def _key_deco_stop(engine, step, next_time, gas, gf):
+    return 'deco_stop', next_time, gas, gf, engine.ascent_rate
+
+
+# segment key functions of decompression engine methods; a method
+# calculates dive step at the end of a segment from the dive step at its
+# start
+SEGMENTS = {
+    '_switch_gas': _key_switch,
+    '_step_next': _key_const,
+    '_step_next_descent': _key_descent,
+    '_step_next_ascent': _key_ascent,
+    '_find_first_stop': _key_first_stop,
+    '_ndl_ascent': _key_ndl,
+    '_deco_stop': _key_deco_stop,
+}
+
+
+class PlanCache(object):
+    """
+    Dive plan prefix cache.
+
+    The trie is stored as ordered dictionary of its edges. The key of an
+    edge is identity of dive step at the start of a segment and the
+    segment. The value of an edge is the dive step at the start of the
+    segment, the dive step at the end of the segment and number of tissues
+    gas loading calculations performed to calculate the segment. The root
+    of the trie is decompression model.
+
+    :var engine: DecoTengu decompression engine.
+    :var size: Maximum number of cached segments.
+    :var hits: Number of reused segments.
+    :var misses: Number of calculated segments.
+    :var loads: Number of tissues gas loading calculations.
+    :var saved_loads: Number of tissues gas loading calculations saved by
+        reused segments.
+    :var _edges: Trie edges.
+    """
+    def __init__(self, engine, size=const.PLAN_CACHE_SIZE):
+        """
+        Create dive plan prefix cache.
+
+        :param engine: DecoTengu decompression engine.
+        :param size: Maximum number of cached segments.
+        """
+        self.engine = engine
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.saved_loads = 0
+        self._edges = OrderedDict()
+
+
+    @property
+    def hit_rate(self):
+        """
+        Ratio of reused segments.
+        """
+        n = self.hits + self.misses
+        return self.hits / n if n else 0
+
+
+    def __len__(self):
+        return len(self._edges)
+
+
+    def clear(self):
+        """
+        Remove all cached segments.
+        """
+        self._edges.clear()
+
+
+    def install(self):
+        """
+        Override methods of decompression engine and decompression model
+        with caching and counting wrappers.
+        """
+        engine = self.engine
+        model = engine.model
+        for name in LOAD_METHODS:
+            setattr(model, name, self._counted(getattr(model, name)))
+
+        engine._step_start = self._step_start(engine._step_start)
+        for name, key in SEGMENTS.items():
+            setattr(engine, name, self._cached(key, getattr(engine, name)))
+
+
+    def _counted(self, f):
+        """
+        Create wrapper counting tissues gas loading calculations.
+
+        :param f: Decompression model method to wrap.
+        """
+        @wraps(f)
+        def wrapper(*args, **kw):
+            self.loads += 1
+            return f(*args, **kw)
+        return wrapper
+
+
+    def _step_start(self, f):
+        """
+        Create caching wrapper of the method creating first dive step.
+
+        The first dive step depends on decompression model, its tissues
+        gas loading calculation method and its parameters (including water
+        vapour pressure), and on
+        decompression model data and dive runtime at the start of the dive.
+
+        :param f: Method creating first dive step.
+        """
+        engine = self.engine
+
+        @wraps(f)
+        def wrapper(abs_p, gas, data=None, time=0):
+            model = engine.model
+            segment = (
+                'start', abs_p, gas, engine.surface_pressure, model.gf_low,
+                model.water_vapour_pressure, model.load, data, time
+            )
+            return self._segment(model, segment, f, abs_p, gas, data, time)
+        return wrapper
+
+
+    def _cached(self, key, f):
+        """
+        Create caching wrapper of decompression engine method calculating
+        a segment.
+
+        :param key: Function creating segment key.
+        :param f: Decompression engine method to wrap.
+        """
+        engine = self.engine
+
+        @wraps(f)
+        def wrapper(step, *args, **kw):
+            segment = key(engine, step, *args, **kw)
+            return self._segment(step, segment, f, step, *args, **kw)
+        return wrapper
+
+
+    def _segment(self, parent, segment, f, *args, **kw):
+        """
+        Find cached dive step at the end of a segment or calculate it.
+
+        :param parent: Dive step at the start of the segment (or
+            decompression model for the first dive step).
+        :param segment: Segment key.
+        :param f: Function calculating the dive step.
+        :param args: Function arguments.
+        :param kw: Function keyword arguments.
+        """
+        edges = self._edges
+        key = id(parent), segment
+        edge = edges.get(key)
+        if edge is not None and edge[0] is parent:
+            edges.move_to_end(key)
+            self.hits += 1
+            self.saved_loads += edge[2]
+            return edge[1]
+
+        loads = self.loads
+        step = f(*args, **kw)
+        self.misses += 1
+        if len(edges) >= self.size:
+            edges.popitem(last=False)
+        # keep reference to the parent, so its id is not reused
+        edges[key] = parent, step, self.loads - loads
+        return step
+
+
+
+def plan_cache(engine, size=const.PLAN_CACHE_SIZE):
+    """
+    Install dive plan prefix cache in decompression engine.
+
+    The cache object is returned, which reports number of reused segments
+    and saved tissues gas loading calculations.
+
+    :param engine: DecoTengu decompression engine.
+    :param size: Maximum number of cached segments.
+    """
+    cache = PlanCache(engine, size)
+    cache.install()
+    return cache
+
+
+# vim: sw=4:et:ai
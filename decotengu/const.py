@@ -42,4 +42,24 @@ TIME_3M = 0.3 # time [min] to ascent/descent at 10m/min
 #
 DECO_STOP_SEARCH_TIME = 8
 
+# maximum number of dive plan segments remembered by dive plan cache, see
+# decotengu.cache.PlanCache
+PLAN_CACHE_SIZE = 4096
+
+# relative difference of inert gas pressure in tissue compartment and its
+# saturation at surface, at which the tissue compartment is desaturated,
+# see decotengu.model.ZH_L16_GF.desaturation_time
+DESATURATION_TOLERANCE = 0.05
+
+# aircraft cabin pressure [bar], see decotengu.model.ZH_L16_GF.no_fly_time
+CABIN_PRESSURE = 0.75
+
+# nitrogen percentage of air breathed at surface, see decotengu.series.AIR
+# and decotengu.model.ZH_L16_GF.desaturation_time
+AIR_N2 = 79
+
+# precision [min] of search of desaturation and no-fly time of tissue
+# compartment loaded with helium, see decotengu.model.ZH_L16_GF._decay_search
+DECAY_TIME_PRECISION = 0.01
+
 # vim: sw=4:et:ai
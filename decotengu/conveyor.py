@@ -21,11 +21,12 @@
 Conveyor to move depth between points in time.
 """
 
-from functools import partial
+from itertools import islice
 import logging
 import math
 
-from .engine import Phase
+from .engine import Phase, Step
+from .error import EngineError
 from .const import EPSILON
 
 logger = logging.getLogger(__name__)
@@ -51,14 +52,20 @@ class Conveyor(object):
 
     :var engine: DecoTengu decompression engine.
     :var time_delta: Time delta to increase dive steps granulity [min].
+    :var validate: Validate expansion of dive steps if true.
     :var f_calc: Orignal DecoTengu decompression engine calculation method.
+    :var chunk_size: Maximum number of dive steps, which tissues gas
+        loading is calculated at once.
     """
-    def __init__(self, engine, time_delta):
+    chunk_size = 1024
+
+    def __init__(self, engine, time_delta, validate=False):
         """
         Create conveyor.
 
         :param engine: DecoTengu decompression engine.
         :param time_delta: Time delta to increase dive steps granulity [min].
+        :param validate: Validate expansion of dive steps if true.
         """
         if time_delta < 0.1 / 60:
             logger.warn(
@@ -76,6 +83,7 @@ class Conveyor(object):
                 ' is not zero'
             )
         self.time_delta = time_delta
+        self.validate = validate
         self.engine = engine
         self.f_calc = engine.calculate
 
@@ -127,49 +135,364 @@ class Conveyor(object):
                 yield end
                 continue
 
-            # determine descent/ascent/const engine method
-            f_step = self.engine._step_next # default const
-            if end.phase == Phase.DECO_STOP:
-                f_step = partial(self.engine._step_next, phase=Phase.DECO_STOP)
-            elif end.phase == Phase.ASCENT:
-                assert end.abs_p - prev.abs_p < 0
-                f_step = partial(self.engine._step_next_ascent, gf=end.data.gf)
-            elif end.phase == Phase.DESCENT:
-                assert end.abs_p - prev.abs_p > 0
-                f_step = self.engine._step_next_descent
-
             k, tr = self.trays(prev.time, end.time)
-            logger.debug(
-                'conveyor time {}min -> {}min, {}bar -> {}bar, steps {},' \
-                'rest {}'.format(
-                    prev.time, end.time, prev.abs_p, end.abs_p, k, tr
-                ))
-            step = prev
-            for i in range(k):
-                step = f_step(step, self.time_delta, end.gas)
-                yield step
-
             if __debug__:
-                # validate steps expansion: (step + time(tr) = stop) == end?
-                stop = f_step(step, tr, end.gas)
-                assert abs(end.abs_p - stop.abs_p) < EPSILON, \
-                    '{} bar ({}min) vs. {} bar ({}min)'.format(
-                        end.abs_p, end.time, stop.abs_p, stop.time
+                logger.debug(
+                    'conveyor time {}min -> {}min, {}bar -> {}bar, steps {},'
+                    ' rest {}'.format(
+                        prev.time, end.time, prev.abs_p, end.abs_p, k, tr
                     )
+                )
+            if k > 0:
+                yield from self._expand(prev, end, k)
 
-                # check nitrogen
-                vt = (v1[0] - v2[0] for v1, v2 in zip(end.data.tissues, stop.data.tissues))
-                dstr = ' '.join(str(v) for v in vt)
-                assert all(abs(v) < EPSILON for v in vt), dstr
-
-                # check helium
-                vt = (v1[1] - v2[1] for v1, v2 in zip(end.data.tissues, stop.data.tissues))
-                dstr = ' '.join(str(v) for v in vt)
-                assert all(abs(v) < EPSILON for v in vt), dstr
-
-                logger.debug('step expansion validation ok')
+            if self.validate:
+                self._validate(prev, end, k, tr)
 
             yield end
             prev = end
 
+
+    def _expand(self, prev, end, k):
+        """
+        Calculate dive steps between two dive steps every time delta.
+
+        Tissues gas loading of dive steps is calculated in chunks with
+        :py:meth:`decotengu.model.ZH_L16_GF.load_series` method, so the
+        value of exponential function for time delta is calculated once
+        for each tissue compartment and chunk.
+
+        :param prev: Previous dive step.
+        :param end: Next dive step.
+        :param k: Number of dive steps to calculate.
+        """
+        engine = self.engine
+        td = self.time_delta
+        gf = None
+
+        # determine descent/ascent/const rate of depth change
+        phase = end.phase
+        if phase == Phase.ASCENT:
+            assert end.abs_p - prev.abs_p < 0
+            rate = -engine.ascent_rate
+            gf = end.data.gf
+        elif phase == Phase.DESCENT:
+            assert end.abs_p - prev.abs_p > 0
+            rate = engine.descent_rate
+        else:
+            rate = 0
+            if phase != Phase.DECO_STOP:
+                phase = Phase.CONST
+
+        # calculate tissues gas loading in chunks to limit memory usage
+        # for long dive profiles with short time delta
+        data = prev.data
+        for j in range(0, k, self.chunk_size):
+            n = min(self.chunk_size, k - j)
+            abs_p = prev.abs_p + engine._time_to_pressure(j * td, rate)
+            series = engine.model.load_series(
+                abs_p, td, n, end.gas, rate * engine._meter_to_bar, data
+            )
+            for i, data in enumerate(series, j + 1):
+                time = i * td
+                p = prev.abs_p + engine._time_to_pressure(time, rate) \
+                    if rate else prev.abs_p
+                if gf is not None:
+                    data = data._replace(gf=gf)
+                yield Step(phase, p, prev.time + time, end.gas, data)
+
+
+    def _validate(self, prev, end, k, tr):
+        """
+        Validate expansion of dive steps.
+
+        Dive step after `k` time deltas and the time rest has to be the same
+        as the next dive step. The dive step is calculated with one
+        calculation of tissues gas loading from previous dive step.
+
+        :param prev: Previous dive step.
+        :param end: Next dive step.
+        :param k: Number of expanded dive steps.
+        :param tr: Time rest between last expanded dive step and next dive
+            step.
+        """
+        step = prev
+        if k > 0:
+            # validate all dive steps, not the ones selected by subclasses
+            *_, step = Conveyor._expand(self, prev, end, k)
+
+        stop = self._step_next(step, tr, end)
+        if abs(end.abs_p - stop.abs_p) > EPSILON:
+            raise EngineError(
+                'Conveyor validation error: {}bar ({}min) vs. {}bar ({}min)'
+                .format(end.abs_p, end.time, stop.abs_p, stop.time)
+            )
+
+        tissues = zip(end.data.tissues, stop.data.tissues)
+        if any(abs(v1 - v2) > EPSILON for t1, t2 in tissues
+                for v1, v2 in zip(t1, t2)):
+            raise EngineError(
+                'Conveyor validation error: tissues gas loading at {}'
+                .format(end)
+            )
+
+        if __debug__:
+            logger.debug('step expansion validation ok')
+
+
+    def _step_next(self, step, time, end):
+        """
+        Calculate next dive step with engine method matching phase of the
+        next dive step.
+
+        :param step: Current dive step.
+        :param time: Time between current and next dive step [min].
+        :param end: Next dive step.
+        """
+        engine = self.engine
+        if end.phase == Phase.ASCENT:
+            gf = end.data.gf
+            return engine._step_next_ascent(step, time, end.gas, gf=gf)
+        elif end.phase == Phase.DESCENT:
+            return engine._step_next_descent(step, time, end.gas)
+        else:
+            return engine._step_next(step, time, end.gas, phase=end.phase)
+
+
+
+class AdaptiveConveyor(Conveyor):
+    """
+    Conveyor to expand dive profile into dive steps selected adaptively.
+
+    The dive steps are calculated every time delta, but a dive step is
+    emitted only if
+
+    - linear interpolation of tissues pressure and ascent ceiling limit
+      between emitted dive steps would differ by more than the tolerance
+      from a skipped dive step
+    - the time between emitted dive steps would exceed maximum gap
+    - ascent ceiling limit is within the margin of dive step pressure
+
+    The dive steps are selected with swinging door algorithm. For each
+    value of tissue pressure and ascent ceiling limit, the range of slopes
+    of a line from last emitted dive step, which is within the tolerance of
+    all skipped dive steps, is maintained. If a dive step is out of the
+    range, then the previous dive step is emitted.
+
+    Therefore, the dive steps are sparse on long constant depth and
+    decompression stop dive phases, and dense when the tissues pressure
+    curves bend or the ceiling is close to the diver. For example::
+
+        >>> import decotengu
+        >>> engine = decotengu.Engine()
+        >>> engine.add_gas(0, 21)
+        >>> conveyor = AdaptiveConveyor(engine, 1 / 60) # dive step every 1s
+        >>> engine.calculate = conveyor
+        >>> profile = list(engine.calculate(35, 40))
+        >>> conveyor.samples, conveyor.skipped
+        (54, 5198)
+        >>> conveyor.error <= conveyor.tolerance
+        True
+
+    Dive steps returned by the original `Engine.calculate` method are
+    always emitted.
+
+    :var tolerance: Tolerance of linear interpolation of tissues pressure
+        and ascent ceiling limit [bar].
+    :var max_gap: Maximum time between emitted dive steps [min].
+    :var margin: Ascent ceiling limit margin [bar].
+    :var samples: Number of dive steps of last dive profile.
+    :var skipped: Number of dive steps skipped for last dive profile.
+    :var error: Maximum error of linear interpolation of tissues pressure
+        and ascent ceiling limit of last dive profile [bar].
+    """
+    def __init__(
+            self, engine, time_delta, tolerance=0.01, max_gap=5, margin=0.01,
+            validate=False
+        ):
+        """
+        Create adaptive conveyor.
+
+        :param engine: DecoTengu decompression engine.
+        :param time_delta: Time delta of calculated dive steps [min].
+        :param tolerance: Tolerance of linear interpolation of tissues
+            pressure and ascent ceiling limit [bar].
+        :param max_gap: Maximum time between emitted dive steps [min].
+        :param margin: Ascent ceiling limit margin [bar].
+        :param validate: Validate expansion of dive steps if true.
+        """
+        super().__init__(engine, time_delta, validate=validate)
+        self.tolerance = tolerance
+        self.max_gap = max_gap
+        self.margin = margin
+        self.samples = 0
+        self.skipped = 0
+        self.error = 0
+
+
+    @property
+    def reduction(self):
+        """
+        Ratio of number of dive steps calculated every time delta to number
+        of emitted dive steps of last dive profile.
+        """
+        return (self.samples + self.skipped) / self.samples \
+            if self.samples else 1
+
+
+    def __call__(self, *args, **kw):
+        """
+        Execute original `Engine.calculate` method and expand dive steps
+        adaptively.
+        """
+        self.samples = 0
+        self.skipped = 0
+        self.error = 0
+        for step in super().__call__(*args, **kw):
+            self.samples += 1
+            yield step
+
+        if __debug__:
+            logger.debug(
+                'adaptive conveyor samples {}, skipped {}, error {:.4f}bar'
+                ' (tolerance {}bar)'.format(
+                    self.samples, self.skipped, self.error, self.tolerance
+                )
+            )
+
+
+    def _expand(self, prev, end, k):
+        """
+        Calculate dive steps between two dive steps every time delta and
+        select the dive steps to emit.
+
+        :param prev: Previous dive step.
+        :param end: Next dive step.
+        :param k: Number of dive steps to calculate.
+        """
+        model = self.engine.model
+        tolerance = self.tolerance
+        max_gap = self.max_gap + EPSILON
+        margin = self.margin
+
+        steps = super()._expand(prev, end, k)
+        gf = end.data.gf if end.phase == Phase.ASCENT else prev.data.gf
+        values = lambda step, limit: \
+            tuple(v for t in step.data.tissues for v in t) + (limit,)
+        last_limit, end_limit = model.ceiling_limits(
+            (prev.data, end.data), gf=gf
+        )
+        last = prev.time, values(prev, last_limit)
+        door = self._door(last[1])
+        skipped = []  # time and values of skipped dive steps
+
+        while True:
+            chunk = tuple(islice(steps, self.chunk_size))
+            if not chunk:
+                break
+
+            limits = model.ceiling_limits((s.data for s in chunk), gf=gf)
+            for step, limit in zip(chunk, limits):
+                item = step.time, values(step, limit)
+                if skipped and (
+                        step.time - last[0] > max_gap
+                        or not self._within(door, last, item)):
+                    # emit previous dive step
+                    *skipped, item_prev = skipped
+                    self._skip(last, item_prev, skipped)
+                    yield step_prev
+                    last = item_prev
+                    door = self._door(last[1])
+                    skipped = []
+
+                if step.abs_p - limit < margin:
+                    self._skip(last, item, skipped)
+                    yield step
+                    last = item
+                    door = self._door(last[1])
+                    skipped = []
+                else:
+                    self._update(door, last, item)
+                    skipped.append(item)
+                    step_prev = step
+
+        # next dive step is always emitted, so check if it is within the
+        # tolerance of skipped dive steps
+        item = end.time, values(end, end_limit)
+        if skipped and not self._within(door, last, item):
+            *skipped, item_prev = skipped
+            self._skip(last, item_prev, skipped)
+            yield step_prev
+            last = item_prev
+            skipped = []
+        self._skip(last, item, skipped)
+
+
+    def _door(self, values):
+        """
+        Create swinging door, the ranges of slopes for values of a dive
+        step.
+
+        :param values: Values of tissues pressure and ascent ceiling limit.
+        """
+        inf = float('inf')
+        return [-inf] * len(values), [inf] * len(values)
+
+
+    def _within(self, door, last, item):
+        """
+        Check if line between last emitted dive step and a dive step is
+        within swinging door.
+
+        :param door: Swinging door.
+        :param last: Time and values of last emitted dive step.
+        :param item: Time and values of a dive step.
+        """
+        dt = item[0] - last[0]
+        low, high = door
+        return all(
+            lo <= (v - lv) / dt <= hi
+            for v, lv, lo, hi in zip(item[1], last[1], low, high)
+        )
+
+
+    def _update(self, door, last, item):
+        """
+        Narrow swinging door, so a line from last emitted dive step is
+        within the tolerance of a skipped dive step.
+
+        :param door: Swinging door.
+        :param last: Time and values of last emitted dive step.
+        :param item: Time and values of skipped dive step.
+        """
+        dt = item[0] - last[0]
+        tolerance = self.tolerance
+        low, high = door
+        for i, (v, lv) in enumerate(zip(item[1], last[1])):
+            low[i] = max(low[i], (v - lv - tolerance) / dt)
+            high[i] = min(high[i], (v - lv + tolerance) / dt)
+
+
+    def _skip(self, last, item, skipped):
+        """
+        Account skipped dive steps between two emitted dive steps and
+        calculate error of linear interpolation.
+
+        :param last: Time and values of last emitted dive step.
+        :param item: Time and values of emitted dive step.
+        :param skipped: Time and values of skipped dive steps.
+        """
+        if not skipped:
+            return
+
+        self.skipped += len(skipped)
+        t1, v1 = last
+        t2, v2 = item
+        error = max(
+            abs(v - (a + (b - a) * (t - t1) / (t2 - t1)))
+            for t, values in skipped
+            for v, a, b in zip(values, v1, v2)
+        )
+        self.error = max(self.error, error)
+
 # vim: sw=4:et:ai
@@ -98,6 +98,39 @@ Dive decompression stop information.
 :var time: Length of decompression stops [min].
 """
 
+DivePlan = namedtuple(
+    'DivePlan',
+    'depth time descent abs_p config descent_gas_list gas_list'
+    ' descent_stages free_stages deco_stages gf_steps data runtime'
+)
+DivePlan.__doc__ = """
+Compiled dive plan.
+
+Compiled dive plan is immutable, it can be hashed and pickled. It is
+created with :py:meth:`decotengu.engine.Engine.compile` method and
+executed with :py:meth:`decotengu.engine.Engine.execute` method.
+
+:var depth: Maximum depth [m].
+:var time: Dive bottom time [min].
+:var descent: Skip descent part of a dive if false.
+:var abs_p: Absolute pressure of maximum depth [bar].
+:var config: Configuration of decompression engine, for which the dive
+    plan is compiled.
+:var descent_gas_list: Travel gas mixes and bottom gas mix sorted by
+    switch depth.
+:var gas_list: Bottom gas mix and decompression gas mixes sorted by
+    switch depth.
+:var descent_stages: Dive descent stages (empty if descent is skipped).
+:var free_stages: Deco-free ascent stages.
+:var deco_stages: Decompression ascent stages candidates, see
+    :py:meth:`decotengu.engine.Engine._deco_ascent_stages`.
+:var gf_steps: Gradient factor slope for each number of decompression
+    stops.
+:var data: Decompression model data at the start of the dive (null for
+    surface saturation).
+:var runtime: Dive runtime at the start of the dive [min].
+"""
+
 
 class Engine(object):
     """
@@ -231,21 +264,25 @@ class Engine(object):
         return p >= self.model.ceiling_limit(data, gf=gf)
 
 
-    def _step_start(self, abs_p, gas):
+    def _step_start(self, abs_p, gas, data=None, time=0):
         """
         Create the very first dive step.
 
         The first step is initialized with decompression data calculated
-        for surface.
+        for surface, unless decompression model data is specified, i.e.
+        tissues gas loading after surface interval.
 
         The dive starting depth is usually surface, but any depth can be
         specified, i.e. when descent part of the dive is to be skipped.
 
         :param abs_p: Absolute pressure of dive starting depth.
         :param gas: Gas mix configuration.
+        :param data: Decompression model data at the start of the dive.
+        :param time: Dive runtime at the start of the dive [min].
         """
-        data = self.model.init(self.surface_pressure)
-        step = Step(Phase.START, abs_p, 0, gas, data)
+        if data is None:
+            data = self.model.init(self.surface_pressure)
+        step = Step(Phase.START, abs_p, time, gas, data)
         return step
 
 
@@ -354,7 +391,7 @@ class Engine(object):
         return step
 
 
-    def _dive_descent(self, abs_p, gas_list):
+    def _dive_descent(self, abs_p, gas_list, stages=None, data=None, time=0):
         """
         Dive descent from surface to absolute pressure of destination
         depth.
@@ -364,12 +401,16 @@ class Engine(object):
 
         :param abs_p: Absolute pressure of destination depth.
         :param gas_list: List of gas mixes - travel and bottom gas mixes.
+        :param stages: Precalculated dive descent stages.
+        :param data: Decompression model data at the start of the dive.
+        :param time: Dive runtime at the start of the dive [min].
         """
         gas = gas_list[0]
-        step = self._step_start(self.surface_pressure, gas)
+        step = self._step_start(self.surface_pressure, gas, data, time)
         yield step
 
-        stages = self._descent_stages(abs_p, gas_list)
+        if stages is None:
+            stages = self._descent_stages(abs_p, gas_list)
         for i, (depth, gas) in enumerate(stages):
             if i > 0: # perform gas switch
                 step = self._switch_gas(step, gas)
@@ -384,10 +425,37 @@ class Engine(object):
             step = self._switch_gas(step, last)
             yield step
 
-        logger.debug('descent finished at {:.4f}bar'.format(step.abs_p))
+        if __debug__:
+            logger.debug('descent finished at {:.4f}bar'.format(step.abs_p))
+
+
+    def _dive_bottom(self, start, time, gas):
+        """
+        Dive bottom part from the end of descent until the end of bottom
+        time.
+
+        Method returns dive step - end of bottom part of a dive.
+
+        :param start: Dive step at the end of descent.
+        :param time: Dive bottom time [min] (including descent time).
+        :param gas: Bottom gas mix.
+        """
+        t = time - start.time
+        if t <= 0:
+            raise EngineError('Bottom time shorter than descent time')
+
+        if __debug__:
+            logger.debug(
+                'bottom time {}min (descent is {}min)'.format(t, start.time)
+            )
+        assert t > 0
+        return self._step_next(start, t, gas)
 
 
-    def _dive_ascent(self, start, gas_list):
+    def _dive_ascent(
+            self, start, gas_list, stages=None, deco_stages=None,
+            gf_steps=None
+        ):
         """
         Dive ascent from starting dive step.
 
@@ -403,6 +471,10 @@ class Engine(object):
         :param start: Starting dive step.
         :param gas_list: List of gas mixes - bottom and decompression gas
             mixes.
+        :param stages: Precalculated deco-free ascent stages.
+        :param deco_stages: Precalculated decompression ascent stages
+            candidates.
+        :param gf_steps: Precalculated gradient factor slopes.
         """
         # check if ndl dive
         bottom_gas = gas_list[0]
@@ -413,7 +485,8 @@ class Engine(object):
 
         step = start
 
-        stages = self._free_ascent_stages(gas_list)
+        if stages is None:
+            stages = self._free_ascent_stages(gas_list)
         for step in self._free_staged_ascent(step, stages):
             yield step
 
@@ -421,8 +494,8 @@ class Engine(object):
         # stage
         assert not abs(step.abs_p - self.surface_pressure) < const.EPSILON
 
-        stages = self._deco_ascent_stages(step.abs_p, gas_list)
-        yield from self._deco_staged_ascent(step, stages)
+        stages = self._deco_ascent_stages(step.abs_p, gas_list, deco_stages)
+        yield from self._deco_staged_ascent(step, stages, gf_steps)
 
 
     def _ndl_ascent(self, start, gas):
@@ -605,7 +678,7 @@ class Engine(object):
         yield (self.surface_pressure, gas_list[-1])
 
 
-    def _deco_ascent_stages(self, start_abs_p, gas_list):
+    def _deco_ascent_stages(self, start_abs_p, gas_list, stages=None):
         """
         Calculate stages for decompression ascent.
 
@@ -625,18 +698,47 @@ class Engine(object):
         Only gas mixes, which switch depth is shallower than start depth,
         are used for decompression ascent stages calculation.
 
+        :param start_abs_p: Absolute pressure of decompression start depth.
         :param gas_list: List of gas mixes - bottom and decompression gas
             mixes.
-        :param start_abs_p: Absolute pressure of decompression start depth.
+        :param stages: Precalculated decompression ascent stages
+            candidates, see
+            :py:meth:`decotengu.engine.Engine._deco_stage_candidates`.
         """
         assert start_abs_p > self.surface_pressure
+        if stages is None:
+            stages = self._deco_stage_candidates(gas_list)
+        yield from ((p, m) for p_switch, p, m in stages if p_switch < start_abs_p)
+
+
+    def _deco_stage_candidates(self, gas_list):
+        """
+        Calculate decompression ascent stages candidates.
+
+        Decompression ascent stage candidate is a tuple
+
+        - absolute pressure of switch depth of next gas mix
+        - absolute pressure of destination depth
+        - gas mix
+
+        The last candidate is ascent to the surface, its switch depth is
+        the surface.
+
+        :param gas_list: List of gas mixes - bottom and decompression gas
+            mixes.
+
+        .. seealso:: :func:`decotengu.Engine._deco_ascent_stages`
+        """
         mixes = zip(gas_list[:-1], gas_list[1:])
         _pressure = lambda mix: self._to_pressure(mix.depth // 3 * 3)
-        yield from (
-            (_pressure(m2), m1) for m1, m2 in mixes
-            if self._to_pressure(m2.depth) < start_abs_p
+        stages = [
+            (self._to_pressure(m2.depth), _pressure(m2), m1)
+            for m1, m2 in mixes
+        ]
+        stages.append(
+            (self.surface_pressure, self.surface_pressure, gas_list[-1])
         )
-        yield (self.surface_pressure, gas_list[-1])
+        return tuple(stages)
 
 
     def _validate_gas_list(self, depth):
@@ -715,7 +817,10 @@ class Engine(object):
         :param gas: Gas to switch to.
         """
         gp = self._to_pressure(gas.depth)
-        logger.debug('ascent gas switch to {} at {}bar'.format(gas, step.abs_p))
+        if __debug__:
+            logger.debug(
+                'ascent gas switch to {} at {}bar'.format(gas, step.abs_p)
+            )
         assert step.abs_p - gp < self._p3m
         if abs(step.abs_p - gp) < const.EPSILON:
             steps = (self._switch_gas(step, gas),)
@@ -776,12 +881,13 @@ class Engine(object):
                 #       so move to next stage
 
 
-    def _deco_staged_ascent(self, start, stages):
+    def _deco_staged_ascent(self, start, stages, gf_steps=None):
         """
         Perform staged asccent within decompression zone.
 
         :param start: Starting dive step.
         :param stages: Dive stages.
+        :param gf_steps: Precalculated gradient factor slopes.
 
         .. seealso:: :func:`decotengu.Engine._ascent_stages_deco`
         """
@@ -790,7 +896,7 @@ class Engine(object):
             assert depth % 3 == 0 and depth > 0, depth
 
         bottom_gas = self._gas_list[0]
-        stages = self._deco_stops(start, stages)
+        stages = self._deco_stops(start, stages, gf_steps)
         step = start
         for depth, gas, time, gf in stages:
             # switch gas
@@ -815,7 +921,7 @@ class Engine(object):
             logger.debug('deco engine: gf at surface={:.4f}'.format(step.data.gf))
 
 
-    def _deco_stops(self, step, stages):
+    def _deco_stops(self, step, stages, gf_steps=None):
         """
         Calculate collection of decompression stops.
 
@@ -830,11 +936,16 @@ class Engine(object):
 
         :param step: Current dive step.
         :param stages: Decompression ascent stages.
+        :param gf_steps: Precalculated gradient factor slopes, see
+            :py:meth:`decotengu.engine.Engine._gf_steps`.
 
         .. seealso:: :func:`decotengu.Engine._deco_ascent_stages`
         """
         k = self._n_stops(step.abs_p)
-        gf_step = (self.model.gf_high - self.model.gf_low) / k
+        if gf_steps is None or k >= len(gf_steps):
+            gf_step = (self.model.gf_high - self.model.gf_low) / k
+        else:
+            gf_step = gf_steps[k]
         ts_3m = self._pressure_to_time(self._p3m, self.ascent_rate)
         gf = step.data.gf
 
@@ -875,26 +986,35 @@ class Engine(object):
             logger.debug('deco stop: calculate at {}m'.format(depth))
             assert depth % 3 == 0 and depth > 0, depth
 
+        # the search below evaluates speculative tissues gas loading into
+        # two scratch buffers, which are reused by the search probes;
+        # decompression model data is created for accepted result only
+        model = self.model
+        abs_p = step.abs_p
+        b1 = model.buffer(step.data)
+        b2 = model.buffer(step.data)
+        other = lambda buff: b2 if buff is b1 else b1
+
         # there are a lot of 1 minute deco stops, so check if we can ascend
         # after 1 minute first; otherwise continue searching for the
         # decompression stop length
-        data = self._tissue_pressure_const(
-            step.abs_p, const.MINUTE, gas, step.data
-        )
-        if self._can_ascend(step.abs_p, next_time, data, gf):
+        data = model.load_into(abs_p, const.MINUTE, gas, 0, step.data, b1)
+        if self._can_ascend(abs_p, next_time, data, gf):
             return Step(
-                Phase.DECO_STOP, step.abs_p, step.time + const.MINUTE, gas, data
+                Phase.DECO_STOP, abs_p, step.time + const.MINUTE, gas,
+                model.freeze(data)
             )
 
         max_time = self._deco_stop_search_time
         # next_f(arg=(time, data)): (time, data) <- track both time and deco
-        # data
+        # data; recurse_while keeps previous result, so load tissues into
+        # the other buffer
         next_f = lambda time, data: (
             time + max_time,
-            self._tissue_pressure_const(step.abs_p, max_time, gas, data)
+            model.load_into(abs_p, max_time, gas, 0, data, other(data))
         )
         inv_f = lambda time, data: \
-            not self._can_ascend(step.abs_p, next_time, data, gf)
+            not self._can_ascend(abs_p, next_time, data, gf)
 
         time, data = recurse_while(inv_f, next_f, const.MINUTE, data)
 
@@ -906,10 +1026,11 @@ class Engine(object):
 
         # start with `data` returned by `recurse_while`, so no need to add
         # `time`
-        next_f = lambda k: self._tissue_pressure_const(step.abs_p, k, gas, data)
+        probe = other(data)
+        next_f = lambda k: model.load_into(abs_p, k, gas, 0, data, probe)
         # should we stay at deco stop?
         exec_deco_stop = lambda k: \
-            not self._can_ascend(step.abs_p, next_time, next_f(k), gf)
+            not self._can_ascend(abs_p, next_time, next_f(k), gf)
 
         # ascent is possible after self._deco_stop_search_time, so
         # check for self._deco_stop_search_time - 1
@@ -956,59 +1077,189 @@ class Engine(object):
             self._gas_list.append(GasMix(depth, o2, 100 - o2 - he, he))
 
 
-    def calculate(self, depth, time, descent=True):
+    def compile(self, depth, time, descent=True, data=None, runtime=0):
         """
-        Start dive profile calculation for specified dive depth and bottom
-        time.
+        Compile dive plan for specified dive depth and bottom time.
 
-        The method returns an iterator of dive steps.
+        The gas mix list is validated and sorted, and dive descent, dive
+        ascent stages and gradient factor slopes are calculated once for
+        the dive plan.
 
-        Before the calculation the gas mix list is validated. See
-        :func:`decotengu.engine.Engine._validate_gas_list` method
-        documentation for the list of gas mix list rules.
+        The compiled dive plan is executed with
+        :py:meth:`decotengu.engine.Engine.execute` method by decompression
+        engine with the same configuration.
 
         :param depth: Maximum depth [m].
         :param time: Dive bottom time [min].
         :param descent: Skip descent part of a dive if set to false.
+        :param data: Decompression model data at the start of the dive.
+        :param runtime: Dive runtime at the start of the dive [min].
 
         .. seealso:: :func:`decotengu.Engine._validate_gas_list`
-        .. seealso:: :func:`decotengu.Engine.add_gas`
+        .. seealso:: :class:`decotengu.engine.DivePlan`
         """
-        del self.deco_table[:]
         self._validate_gas_list(depth)
 
         # prepare travel and bottom gas mixes
         depth_key = operator.attrgetter('depth')
         bottom_gas = self._gas_list[0]
-        gas_list = sorted(self._travel_gas_list, key=depth_key)
-        gas_list.append(bottom_gas)
-
-        abs_p = self._to_pressure(depth)
-        if descent:
-            for step in self._dive_descent(abs_p, gas_list):
-                yield step
-        else:
-            step = self._step_start(abs_p, bottom_gas)
-            yield step
+        descent_gas_list = sorted(self._travel_gas_list, key=depth_key)
+        descent_gas_list.append(bottom_gas)
 
         # prepare decompression gases, first gas mix is assumed to be
         # bottom gas mix
         gas_list = sorted(self._gas_list[1:], key=depth_key, reverse=True)
         gas_list.insert(0, bottom_gas)
 
-        t = time - step.time
-        if t <= 0:
-            raise EngineError('Bottom time shorter than descent time')
+        abs_p = self._to_pressure(depth)
+        if descent:
+            descent_stages = self._descent_stages(abs_p, descent_gas_list)
+        else:
+            descent_stages = ()
+
+        return DivePlan(
+            depth, time, descent, abs_p, self._config(),
+            tuple(descent_gas_list), tuple(gas_list), tuple(descent_stages),
+            tuple(self._free_ascent_stages(gas_list)),
+            self._deco_stage_candidates(gas_list),
+            self._gf_steps(abs_p), data, runtime,
+        )
 
-        if __debug__:
-            logger.debug(
-                'bottom time {}min (descent is {}min)'.format(t, step.time)
+
+    def execute(self, plan):
+        """
+        Start dive profile calculation for compiled dive plan.
+
+        The method returns an iterator of dive steps.
+
+        `ConfigError` is raised if the dive plan is compiled for
+        decompression engine with different configuration.
+
+        :param plan: Compiled dive plan.
+
+        .. seealso:: :func:`decotengu.Engine.compile`
+        """
+        if plan.config != self._config():
+            raise ConfigError(
+                'Dive plan compiled for different decompression engine'
+                ' configuration'
             )
-        assert t > 0
-        step = self._step_next(step, t, bottom_gas)
+
+        del self.deco_table[:]
+
+        bottom_gas = plan.gas_list[0]
+        if plan.descent:
+            descent = self._dive_descent(
+                plan.abs_p, plan.descent_gas_list, plan.descent_stages,
+                plan.data, plan.runtime
+            )
+            for step in descent:
+                yield step
+        else:
+            step = self._step_start(
+                plan.abs_p, bottom_gas, plan.data, plan.runtime
+            )
+            yield step
+
+        step = self._dive_bottom(step, plan.runtime + plan.time, bottom_gas)
         yield step
 
-        yield from self._dive_ascent(step, gas_list)
+        yield from self._dive_ascent(
+            step, plan.gas_list, plan.free_stages, plan.deco_stages,
+            plan.gf_steps
+        )
+
+
+    def calculate(self, depth, time, descent=True, data=None, runtime=0):
+        """
+        Start dive profile calculation for specified dive depth and bottom
+        time.
+
+        The method returns an iterator of dive steps.
+
+        Before the calculation the gas mix list is validated. See
+        :func:`decotengu.engine.Engine._validate_gas_list` method
+        documentation for the list of gas mix list rules.
+
+        By default, the dive starts at runtime 0min with tissues saturated
+        at surface pressure. The calculation can start with any
+        decompression model data, i.e. after surface interval or in the
+        middle of a dive (with descent skipped), at dive runtime offset.
+        The bottom time is measured from the runtime offset and time of
+        all dive steps includes the offset.
+
+        :param depth: Maximum depth [m].
+        :param time: Dive bottom time [min].
+        :param descent: Skip descent part of a dive if set to false.
+        :param data: Decompression model data at the start of the dive,
+            see :py:meth:`decotengu.model.ZH_L16_GF.snapshot`.
+        :param runtime: Dive runtime at the start of the dive [min].
+
+        .. seealso:: :func:`decotengu.Engine._validate_gas_list`
+        .. seealso:: :func:`decotengu.Engine.add_gas`
+        """
+        plan = self.compile(
+            depth, time, descent=descent, data=data, runtime=runtime
+        )
+        yield from self.execute(plan)
+
+
+    def _config(self):
+        """
+        Get configuration of decompression engine used by compiled dive
+        plans.
+        """
+        model = self.model
+        return (
+            type(model).__name__, model.gf_low, model.gf_high,
+            model.water_vapour_pressure, self.surface_pressure,
+            self.ascent_rate, self.descent_rate, self.last_stop_6m,
+            tuple(self._gas_list), tuple(self._travel_gas_list),
+        )
+
+
+    def _gf_steps(self, abs_p):
+        """
+        Calculate gradient factor slope for each number of decompression
+        stops between depth and the surface.
+
+        The slope for zero decompression stops is zero.
+
+        :param abs_p: Absolute pressure of maximum depth [bar].
+        """
+        gf = self.model.gf_high - self.model.gf_low
+        n = self._n_stops(abs_p) + 1
+        return (0,) + tuple(gf / k for k in range(1, n + 1))
+
+
+    def calculate_profile(self, depth, time, descent=True, data=None,
+            runtime=0, typecode='d'):
+        """
+        Calculate dive profile for specified dive depth and bottom time and
+        store it in columnar dive profile.
+
+        The dive steps are not kept in memory, which allows to calculate
+        long dive profiles with short time delta.
+
+        :param depth: Maximum depth [m].
+        :param time: Dive bottom time [min].
+        :param descent: Skip descent part of a dive if set to false.
+        :param data: Decompression model data at the start of the dive.
+        :param runtime: Dive runtime at the start of the dive [min].
+        :param typecode: Typecode of tissues gas loading arrays, `d` for
+            double precision or `f` for single precision.
+
+        .. seealso:: :py:class:`decotengu.profile.DiveProfile`
+        .. seealso:: :func:`decotengu.Engine.calculate`
+        """
+        from .profile import DiveProfile # FIXME: circular import
+
+        profile = DiveProfile(self.model.NUM_COMPARTMENTS, typecode=typecode)
+        steps = self.calculate(
+            depth, time, descent=descent, data=data, runtime=runtime
+        )
+        profile.extend(steps)
+        return profile
 
 
 
@@ -22,6 +22,12 @@ DecoTengu data flow procesing functions and coroutines.
 """
 
 from functools import wraps
+from itertools import islice
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
 
 
 def coroutine(func):
@@ -43,12 +49,18 @@ def split(*tc):
     Coroutine to receive a value and send it to all coroutines specified
     by ``tc`` list.
 
+    The target coroutines are closed when the coroutine is closed.
+
     :param tc: List of target coroutines.
     """
-    while True:
-        v = yield
+    try:
+        while True:
+            v = yield
+            for c in tc:
+                c.send(v)
+    except GeneratorExit:
         for c in tc:
-            c.send(v)
+            c.close()
 
 
 def sender(gen, *tf):
@@ -57,7 +69,8 @@ def sender(gen, *tf):
     functions specified by `tf` list.
 
     The `tf` is list of functions - each function is called to create
-    a coroutine when generator is started.
+    a coroutine when generator is started. The coroutines are closed
+    when generator is exhausted.
 
     :param gen: Data generator.
     :param *tf: List of functions.
@@ -69,7 +82,220 @@ def sender(gen, *tf):
         for v in data:
             t.send(v)
             yield v
+        t.close()
     return _send
 
 
+def chunked_sender(gen, *tf, chunk_size=1024):
+    """
+    Decorate generator `gen` to send all its data in chunks to coroutines
+    started by functions specified by `tf` list.
+
+    The data is collected in lists of `chunk_size` items, so a coroutine
+    is resumed once for each chunk instead of once for each item. The
+    remaining items are sent when generator is exhausted, then the
+    coroutines are closed. Use :py:func:`chunk_adapter` function to send
+    chunks to a coroutine processing items one by one.
+
+    A chunk is collected from the generator before its items are yielded,
+    so the generator runs up to `chunk_size` items ahead of the consumer.
+
+    For example, to validate dive steps and save dive information in CSV
+    file
+
+        >>> import io
+        >>> import decotengu
+        >>> from decotengu.model import DecoModelValidator
+        >>> from decotengu.output import DiveStepInfoBatch, \\
+        ...     csv_columns_writer
+        >>> engine = decotengu.Engine()
+        >>> engine.add_gas(0, 21)
+        >>> f = io.StringIO()
+        >>> validator = DecoModelValidator(engine)
+        >>> info = DiveStepInfoBatch(engine, csv_columns_writer(f))
+        >>> calculate = chunked_sender(
+        ...     engine.calculate, validator.chunks, info.chunks
+        ... )
+        >>> data = list(calculate(35, 40))
+        >>> len(f.getvalue().splitlines()) == len(data) + 1
+        True
+
+    :param gen: Data generator.
+    :param *tf: List of functions.
+    :param chunk_size: Number of items in a chunk.
+    """
+    @wraps(gen)
+    def _send(*a, **kw):
+        t = split(*[c() for c in tf])
+        data = iter(gen(*a, **kw))
+        chunk = list(islice(data, chunk_size))
+        while chunk:
+            t.send(chunk)
+            yield from chunk
+            chunk = list(islice(data, chunk_size))
+        t.close()
+    return _send
+
+
+def chunk_adapter(tf):
+    """
+    Create function to start coroutine, which receives chunks of items
+    and sends the items one by one to a coroutine started by `tf`
+    function.
+
+    The adapter allows to use existing coroutines with
+    :py:func:`chunked_sender` function.
+
+    :param tf: Function starting a coroutine processing items one by one.
+    """
+    @coroutine
+    def adapter():
+        target = tf()
+        send = target.send
+        try:
+            while True:
+                chunk = yield
+                for v in chunk:
+                    send(v)
+        except GeneratorExit:
+            target.close()
+    return adapter
+
+
+
+class ThreadedSink(object):
+    """
+    Coroutine class to send data to a coroutine running in a background
+    thread.
+
+    The data is collected into batches, which are put into a bounded queue
+    consumed by a writer thread. The writer thread sends the data to
+    a coroutine, i.e. to a coroutine writing a file. When the queue is
+    full, the producer waits for the writer thread (backpressure).
+
+    The exception raised by the coroutine in the writer thread is raised
+    again by the producer on next batch, on flush or on close. After the
+    exception, the writer thread discards data until it is closed.
+
+    The class is used as an item of a pipeline of coroutines, i.e.
+
+        >>> import io
+        >>> import decotengu
+        >>> from decotengu.output import DiveStepInfoGenerator, csv_writer
+        >>> engine = decotengu.create()
+        >>> engine.add_gas(0, 21)
+        >>> f = io.StringIO()
+        >>> info = DiveStepInfoGenerator(engine, csv_writer(f))
+        >>> data = sender(engine.calculate, ThreadedSink(info))(35, 40)
+        >>> for step in data: pass
+        >>> len(f.getvalue().splitlines())
+        257
+
+    :var tf: Function creating the coroutine run in the writer thread.
+    :var batch_size: Number of items in a batch.
+    :var queue_size: Maximum number of batches in the queue.
+    """
+    def __init__(self, tf, batch_size=256, queue_size=16):
+        """
+        Create the coroutine object.
+
+        :param tf: Function creating the coroutine run in the writer
+            thread.
+        :param batch_size: Number of items in a batch.
+        :param queue_size: Maximum number of batches in the queue.
+        """
+        self.tf = tf
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self._queue = None
+        self._batch = []
+        self._error = None
+
+
+    @coroutine
+    def __call__(self):
+        """
+        Start the coroutine and the writer thread.
+        """
+        self._queue = queue.Queue(self.queue_size)
+        self._batch = []
+        self._error = None
+        thread = threading.Thread(
+            target=self._run, args=(self.tf(),), daemon=True
+        )
+        thread.start()
+
+        try:
+            while True:
+                v = yield
+                self._batch.append(v)
+                if len(self._batch) >= self.batch_size:
+                    self._put()
+        except GeneratorExit:
+            self._put()
+            raise
+        finally:
+            # the writer thread discards data after an error, so it is
+            # always possible to stop it
+            self._queue.put(None)
+            thread.join()
+            self._check()
+
+
+    def flush(self):
+        """
+        Send collected data to the writer thread and wait until all data
+        is processed by the coroutine.
+        """
+        self._put()
+        self._queue.join()
+        self._check()
+
+
+    def _put(self):
+        """
+        Put batch of data into the queue.
+        """
+        self._check()
+        if self._batch:
+            self._queue.put(self._batch)
+            self._batch = []
+
+
+    def _check(self):
+        """
+        Raise exception of the coroutine run in the writer thread.
+        """
+        error = self._error
+        if error is not None:
+            self._error = None
+            raise error
+
+
+    def _run(self, target):
+        """
+        Send data from the queue to the coroutine.
+
+        :param target: Coroutine to send data to.
+        """
+        error = False
+        while True:
+            batch = self._queue.get()
+            try:
+                if batch is None:
+                    if not error:
+                        target.close()
+                    break
+                if not error:
+                    for v in batch:
+                        target.send(v)
+            except Exception as ex:
+                if __debug__:
+                    logger.debug('writer thread error: {}'.format(ex))
+                self._error = ex
+                error = True
+            finally:
+                self._queue.task_done()
+
+
 # vim: sw=4:et:ai
@@ -373,10 +373,11 @@ References
 """
 
 from collections import namedtuple
+from functools import partial
 import math
 import logging
 
-from .error import EngineError
+from .error import ConfigError, EngineError
 from . import const
 from .flow import coroutine
 
@@ -392,6 +393,40 @@ Data for ZH-L16-GF decompression model.
 """
 
 
+class DataBuffer(object):
+    """
+    Mutable data for ZH-L16-GF decompression model.
+
+    The buffer has the same attributes as decompression model data, but
+    its tissues gas loading can be overwritten in place. It is used as
+    scratch buffer when evaluating speculative tissues gas loading, i.e.
+    when searching for length of decompression stop, so no decompression
+    model data is created for discarded results.
+
+    :var tissues: Tissues gas loading. List of two item lists - each list
+        holds value of inert gas pressure (N2, He) in a tissue compartment.
+    :var gf: Gradient factor value.
+
+    .. seealso:: :py:class:`decotengu.model.Data`
+    """
+    __slots__ = ('tissues', 'gf')
+
+    def __init__(self, tissues, gf):
+        """
+        Create decompression model data buffer.
+
+        :param tissues: Tissues gas loading.
+        :param gf: Gradient factor value.
+        """
+        self.tissues = [list(t) for t in tissues]
+        self.gf = gf
+
+
+    def __repr__(self):
+        return 'DataBuffer(tissues={}, gf={})'.format(self.tissues, self.gf)
+
+
+
 def eq_gf_limit(gf, p_n2, p_he, a_n2, b_n2, a_he, b_he):
     """
     Calculate ascent ceiling limit of a tissue compartment using Buhlmann
@@ -466,6 +501,37 @@ class ZH_L16_GF(object):
         return data
 
 
+    def snapshot(self, n2, he=None, gf=None):
+        """
+        Create decompression model data from stored pressure of inert gas
+        in tissues, i.e. downloaded from a dive computer.
+
+        The decompression model data can be used to start dive profile
+        calculation, see :py:meth:`decotengu.engine.Engine.calculate`.
+
+        :param n2: Pressure of nitrogen in each tissue compartment [bar].
+        :param he: Pressure of helium in each tissue compartment [bar]
+            (zero if not specified).
+        :param gf: Gradient factor value (gradient factor low parameter
+            if not specified).
+        """
+        n2 = tuple(n2)
+        he = (0.0,) * len(n2) if he is None else tuple(he)
+
+        n = self.NUM_COMPARTMENTS
+        if len(n2) != n or len(he) != n:
+            raise ValueError(
+                'Pressure of inert gas required for {} tissue compartments'
+                .format(n)
+            )
+        if any(p < 0 for p in n2 + he):
+            raise ValueError('Pressure of inert gas cannot be negative')
+
+        if gf is None:
+            gf = self.gf_low
+        return Data(tuple(zip(n2, he)), gf)
+
+
     def load(self, abs_p, time, gas, rate, data):
         """
         Calculate gas loading for all tissue compartments.
@@ -492,6 +558,97 @@ class ZH_L16_GF(object):
         return Data(tp, data.gf)
 
 
+    def load_into(self, abs_p, time, gas, rate, data, buff):
+        """
+        Calculate gas loading for all tissue compartments and store it in
+        decompression model data buffer.
+
+        The method returns the decompression model data buffer. The input
+        decompression model data can be the buffer itself.
+
+        :param abs_p: Absolute pressure [bar] (current depth).
+        :param time: Time of exposure [min] (i.e. time of ascent).
+        :param gas: Gas mix configuration.
+        :param rate: Pressure rate change [bar/min].
+        :param data: Decompression model data or data buffer.
+        :param buff: Decompression model data buffer.
+
+        .. seealso::
+
+            - :py:meth:`decotengu.model.ZH_L16_GF.load`
+            - :py:class:`decotengu.model.DataBuffer`
+        """
+        n2_loader, he_loader = self._tissue_loaders(abs_p, gas, rate)
+
+        for i, ((p_n2, p_he), tp) in enumerate(zip(data.tissues, buff.tissues)):
+            tp[0] = n2_loader(time, p_n2, i)
+            tp[1] = he_loader(time, p_he, i)
+        buff.gf = data.gf
+        return buff
+
+
+    def buffer(self, data):
+        """
+        Create decompression model data buffer initialized with
+        decompression model data.
+
+        :param data: Decompression model data.
+        """
+        return DataBuffer(data.tissues, data.gf)
+
+
+    def freeze(self, buff):
+        """
+        Create decompression model data from decompression model data
+        buffer.
+
+        :param buff: Decompression model data buffer.
+        """
+        return Data(tuple((p_n2, p_he) for p_n2, p_he in buff.tissues), buff.gf)
+
+
+    def load_series(self, abs_p, time, n, gas, rate, data, offset=None):
+        """
+        Calculate gas loading for all tissue compartments for a series of
+        exposure times.
+
+        The exposure times are :math:`offset + i * time` for
+        :math:`i = 0..n - 1` and all of them start with the same
+        decompression model data. Schreiner equation is evaluated with the
+        exponential function value of each exposure time obtained by
+        multiplication of the values for `offset` and `time`, so the
+        exponential function is called only twice for each tissue
+        compartment and inert gas.
+
+        The method returns tuple of `n` decompression model data
+        instances.
+
+        :param abs_p: Absolute pressure [bar] (current depth).
+        :param time: Time of exposure [min] between two consecutive items
+            of the series.
+        :param n: Number of items in the series.
+        :param gas: Gas mix configuration.
+        :param rate: Pressure rate change [bar/min].
+        :param data: Decompression model data.
+        :param offset: Time of exposure [min] of the first item of the
+            series (`time` by default).
+
+        .. seealso:: :py:meth:`decotengu.model.ZH_L16_GF.load`
+        """
+        if offset is None:
+            offset = time
+        n2_loader, he_loader = self._series_loaders(
+            abs_p, gas, rate, time, offset
+        )
+        n2 = zip(*(
+            n2_loader(n, p_n2, i) for i, (p_n2, _) in enumerate(data.tissues)
+        ))
+        he = zip(*(
+            he_loader(n, p_he, i) for i, (_, p_he) in enumerate(data.tissues)
+        ))
+        return tuple(Data(tuple(zip(v1, v2)), data.gf) for v1, v2 in zip(n2, he))
+
+
     def ceiling_limit(self, data, gf=None):
         """
         Calculate pressure of ascent ceiling limit using decompression
@@ -515,6 +672,269 @@ class ZH_L16_GF(object):
         return max(self.gf_limit(gf, data))
 
 
+    def ceiling_limits(self, data, gf=None):
+        """
+        Calculate pressure of ascent ceiling limit for each item of
+        a collection of decompression model data.
+
+        The method returns a tuple of values - a pressure value for each
+        decompression model data item.
+
+        :param data: Collection of decompression model data.
+        :param gf: Gradient factor value, `gf_low` by default.
+
+        .. seealso:: :py:meth:`decotengu.model.ZH_L16_GF.ceiling_limit`
+        """
+        if gf is None:
+            gf = self.gf_low
+        assert gf > 0 and gf <= 1.5
+
+        # Buhlmann equation inlined, see `eq_gf_limit`
+        coeffs = tuple(zip(self.N2_A, self.N2_B, self.HE_A, self.HE_B))
+        gf_1 = 1 - gf
+        return tuple(
+            max(
+                (p_n2 + p_he - (n2_a * p_n2 + he_a * p_he) / (p_n2 + p_he) * gf)
+                / (gf * (p_n2 + p_he) / (n2_b * p_n2 + he_b * p_he) + gf_1)
+                for (p_n2, p_he), (n2_a, n2_b, he_a, he_b)
+                in zip(d.tissues, coeffs)
+            )
+            for d in data
+        )
+
+
+    def desaturation_time(self, surface_pressure, data,
+            tolerance=const.DESATURATION_TOLERANCE):
+        """
+        Calculate desaturation time [min] of a diver breathing air at
+        surface.
+
+        Inert gas pressure in all tissue compartments drops within
+        tolerance of the saturation at surface after desaturation time.
+
+        :param surface_pressure: Surface pressure [bar].
+        :param data: Decompression model data.
+        :param tolerance: Relative difference of inert gas pressure in
+            a tissue compartment and its saturation at surface.
+
+        .. seealso:: :py:meth:`decotengu.model.ZH_L16_GF.desaturation_times`
+        """
+        return self.desaturation_times(surface_pressure, (data,), tolerance)[0]
+
+
+    def desaturation_times(self, surface_pressure, data,
+            tolerance=const.DESATURATION_TOLERANCE):
+        """
+        Calculate desaturation time [min] of a diver breathing air at
+        surface for each item of a collection of decompression model data.
+
+        At constant pressure, difference of inert gas pressure in a tissue
+        compartment and its saturation decays exponentially, so time of
+        the decay below the tolerance is calculated in closed form for
+        tissue compartments loaded with nitrogen only. For tissue
+        compartment loaded with helium, the closed form with decay
+        constant of the slower decaying gas is an upper bound of the time,
+        which is searched for with nitrogen and helium decaying at their
+        own rates, see :py:meth:`decotengu.model.ZH_L16_GF._decay_search`.
+
+        The method returns a tuple of values - a desaturation time for
+        each decompression model data item.
+
+        :param surface_pressure: Surface pressure [bar].
+        :param data: Collection of decompression model data.
+        :param tolerance: Relative difference of inert gas pressure in
+            a tissue compartment and its saturation at surface.
+        """
+        p_sat = self._surface_p_n2(surface_pressure)
+        p_t = tolerance * p_sat
+        limits = ((p_t, p_t),) * self.NUM_COMPARTMENTS
+        passed = lambda i, p_n2, p_he: p_n2 + p_he - p_sat <= p_t
+        return tuple(
+            self._surface_time(d, p_sat, limits, passed) for d in data
+        )
+
+
+    def no_fly_time(self, surface_pressure, data,
+            abs_p=const.CABIN_PRESSURE, gf=None):
+        """
+        Calculate no-fly time [min] of a diver breathing air at surface.
+
+        Ascent ceiling limit is at or above aircraft cabin pressure after
+        no-fly time.
+
+        :param surface_pressure: Surface pressure [bar].
+        :param data: Decompression model data.
+        :param abs_p: Aircraft cabin pressure [bar].
+        :param gf: Gradient factor value, `gf_high` by default.
+
+        .. seealso:: :py:meth:`decotengu.model.ZH_L16_GF.no_fly_times`
+        """
+        return self.no_fly_times(surface_pressure, (data,), abs_p, gf)[0]
+
+
+    def no_fly_times(self, surface_pressure, data,
+            abs_p=const.CABIN_PRESSURE, gf=None):
+        """
+        Calculate no-fly time [min] of a diver breathing air at surface for
+        each item of a collection of decompression model data.
+
+        Ascent ceiling limit of a tissue compartment is at or above
+        aircraft cabin pressure when inert gas pressure in the tissue
+        compartment is at or below the limit
+
+        .. math::
+
+            P_{abs} * (GF / b + 1 - GF) + a * GF
+
+        The decay of inert gas pressure below the limit is calculated in
+        closed form, as for desaturation time, for tissue compartments
+        loaded with nitrogen only. For tissue compartment loaded with
+        helium, the closed form with the Buhlmann coefficients resulting
+        in the lowest limit is an upper bound of the time, which is
+        searched for with Buhlmann coefficients weighted by nitrogen and
+        helium pressure, see :py:func:`decotengu.model.eq_gf_limit`.
+
+        The method returns a tuple of values - a no-fly time for each
+        decompression model data item. Infinite time is returned if the
+        ascent ceiling limit at saturation at surface is below aircraft
+        cabin pressure.
+
+        :param surface_pressure: Surface pressure [bar].
+        :param data: Collection of decompression model data.
+        :param abs_p: Aircraft cabin pressure [bar].
+        :param gf: Gradient factor value, `gf_high` by default.
+
+        .. seealso::
+
+            - :py:meth:`decotengu.model.ZH_L16_GF.desaturation_times`
+            - :py:func:`decotengu.model.eq_gf_limit`
+        """
+        if gf is None:
+            gf = self.gf_high
+        assert gf > 0 and gf <= 1.5
+
+        p_sat = self._surface_p_n2(surface_pressure)
+        gf_1 = 1 - gf
+        coeffs = tuple(zip(self.N2_A, self.N2_B, self.HE_A, self.HE_B))
+        limits = tuple(
+            (
+                abs_p * (gf / n2_b + gf_1) + n2_a * gf - p_sat,
+                abs_p * (gf / max(n2_b, he_b) + gf_1)
+                    + min(n2_a, he_a) * gf - p_sat
+            )
+            for n2_a, n2_b, he_a, he_b in coeffs
+        )
+        passed = lambda i, p_n2, p_he: \
+            eq_gf_limit(gf, p_n2, p_he, *coeffs[i]) <= abs_p
+        return tuple(
+            self._surface_time(d, p_sat, limits, passed) for d in data
+        )
+
+
+    def _surface_p_n2(self, surface_pressure):
+        """
+        Calculate pressure of nitrogen in tissue compartment saturated at
+        surface with air.
+
+        :param surface_pressure: Surface pressure [bar].
+        """
+        return const.AIR_N2 / 100 \
+            * (surface_pressure - self.water_vapour_pressure)
+
+
+    def _surface_time(self, data, p_sat, limits, passed):
+        """
+        Calculate time [min] of a diver breathing air at surface until
+        inert gas pressure in all tissue compartments passes a check.
+
+        The time is calculated in closed form for tissue compartment
+        loaded with nitrogen only. For tissue compartment loaded with
+        helium, the time is searched for if its upper bound, calculated in
+        closed form with decay constant of the slower decaying gas, is
+        longer than the time of the other tissue compartments.
+
+        :param data: Decompression model data.
+        :param p_sat: Pressure of nitrogen in tissue compartment saturated
+            at surface [bar].
+        :param limits: Limit of inert gas pressure difference to `p_sat`
+            for each tissue compartment, for nitrogen and for the upper
+            bound of helium loaded tissue compartment [bar].
+        :param passed: Check function receiving tissue compartment index,
+            nitrogen and helium pressure.
+        """
+        f = self._decay_time
+        items = zip(
+            data.tissues, limits, self.n2_k_const, self.he_k_const
+        )
+        result = 0
+        for i, ((p_n2, p_he), (l_n2, l_he), k_n2, k_he) in enumerate(items):
+            if p_he > 0:
+                t = f(p_n2 + p_he - p_sat, l_he, min(k_n2, k_he))
+                if result < t < math.inf:
+                    t = self._decay_search(
+                        p_n2, p_he, p_sat, k_n2, k_he, t,
+                        partial(passed, i)
+                    )
+            else:
+                t = f(p_n2 - p_sat, l_n2, k_n2)
+            result = max(result, t)
+        return result
+
+
+    def _decay_search(self, p_n2, p_he, p_sat, k_n2, k_he, time, passed):
+        """
+        Search for time [min] of decay of inert gas pressure in a tissue
+        compartment until it passes a check.
+
+        Nitrogen pressure decays to `p_sat` and helium pressure decays to
+        zero, each with its own decay constant. Helium decays faster than
+        nitrogen, so the check result changes once and the time is found
+        with binary search within precision of
+        `decotengu.const.DECAY_TIME_PRECISION`. The found time is not
+        shorter than the exact time.
+
+        :param p_n2: Nitrogen pressure in the tissue compartment [bar].
+        :param p_he: Helium pressure in the tissue compartment [bar].
+        :param p_sat: Pressure of nitrogen in tissue compartment saturated
+            at surface [bar].
+        :param k_n2: Nitrogen decay constant of the tissue compartment.
+        :param k_he: Helium decay constant of the tissue compartment.
+        :param time: Time, at which inert gas pressure passes the check
+            [min].
+        :param passed: Check function receiving nitrogen and helium
+            pressure.
+        """
+        exp = math.exp
+        if passed(p_n2, p_he):
+            return 0
+
+        lo, hi = 0, time
+        while hi - lo > const.DECAY_TIME_PRECISION:
+            t = (lo + hi) / 2
+            n2 = p_sat + (p_n2 - p_sat) * exp(-k_n2 * t)
+            if passed(n2, p_he * exp(-k_he * t)):
+                hi = t
+            else:
+                lo = t
+        return hi
+
+
+    def _decay_time(self, p, p_t, k):
+        """
+        Calculate time [min] of exponential decay of inert gas pressure
+        difference to target pressure difference.
+
+        :param p: Inert gas pressure difference [bar].
+        :param p_t: Target inert gas pressure difference [bar].
+        :param k: Gas decay constant :math:`k` for a tissue compartment.
+        """
+        if p <= p_t:
+            return 0
+        if p_t <= 0:
+            return math.inf
+        return math.log(p / p_t) / k
+
+
     def _k_const(self, half_life):
         """
         Calculate gas decay constant :math:`k` for each tissue compartment
@@ -590,6 +1010,75 @@ class ZH_L16_GF(object):
         return f
 
 
+    def _series_loaders(self, abs_p, gas, rate, time, offset):
+        """
+        Create function to load tissue compartment with inert gas for
+        a series of exposure times for each inert gas specified in gas mix
+        configuration.
+
+        :param abs_p: Absolute pressure of current depth [bar] (:math:`P_{abs}`).
+        :param gas: Gas mix configuration.
+        :param rate: Pressure rate change [bar/min] (:math:`P_{rate}`).
+        :param time: Time of exposure [min] between items of the series.
+        :param offset: Time of exposure [min] of the first item of the
+            series.
+        """
+        n2_loader = self._series_loader(
+            abs_p, gas.n2 / 100, rate, self.n2_k_const, time, offset
+        )
+        he_loader = self._series_loader(
+            abs_p, gas.he / 100, rate, self.he_k_const, time, offset
+        )
+        return n2_loader, he_loader
+
+
+    def _series_loader(self, abs_p, f_gas, rate, k_const, time, offset):
+        """
+        Create function to load tissue compartment with inert gas for
+        a series of exposure times :math:`offset + i * time`.
+
+        The created function uses Schreiner equation and has the following
+        parameters
+
+        n
+            Number of items in the series (:math:`i = 0..n - 1`).
+        p_i
+            Initial (current) pressure of inert gas in tissue compartment
+            [bar] (:math:`P_{i}`).
+        tissue_no
+            Number of tissue compartment in the decompression model
+            (starting with zero).
+
+        The function returns list of inert gas pressure values.
+
+        :param abs_p: Absolute pressure of current depth [bar] (:math:`P_{abs}`).
+        :param f_gas: Inert gas fraction, i.e. for air it is 0.79 (:math:`F_{gas}`).
+        :param rate: Pressure rate change [bar/min] (:math:`P_{rate}`).
+        :param k_const: Collection of gas decay constants for each tissue
+            compartment (:math:`k`).
+        :param time: Time of exposure [min] between items of the series.
+        :param offset: Time of exposure [min] of the first item of the
+            series.
+
+        .. seealso:: :py:meth:`decotengu.model.ZH_L16_GF._tissue_loader`
+        """
+        assert time > 0 and offset > 0
+        p_alv = f_gas * (abs_p - self.water_vapour_pressure)
+        r = f_gas * rate
+        def f(n, p_i, tissue_no):
+            k = k_const[tissue_no]
+            c = p_alv - r / k
+            d = c - p_i
+            e_t = self._exp(time, k)
+            e = e_t if offset == time else self._exp(offset, k)
+            result = []
+            for i in range(n):
+                result.append(c + r * (offset + i * time) - d * e)
+                e *= e_t
+            return result
+        return f
+
+
     def gf_limit(self, gf, data):
         """
         Calculate pressure of ascent ceiling for each tissue compartment.
@@ -681,16 +1170,37 @@ class DecoModelValidator(object):
 
     Create coroutine object, then call it to start the coroutine.
 
+    By default, every dive step is validated. In sampled mode, every n-th
+    dive step and all decompression stop dive steps are validated, which
+    reduces the cost of validation of dive profile expanded with short time
+    delta (see :py:class:`decotengu.conveyor.Conveyor`). The first
+    decompression stop is always validated.
+
+    The sampling and the counter of validated dive steps are reset when
+    the coroutine is started, i.e. for each dive profile.
+
     :var engine: DecoTengu decompression engine.
+    :var every: Validate every n-th dive step.
+    :var checked: Number of dive steps validated against ascent ceiling
+        limit.
     """
-    def __init__(self, engine):
+    def __init__(self, engine, every=1):
         """
         Create coroutine object.
 
         :param engine: DecoTengu decompression engine.
+        :param every: Validate every n-th dive step (all dive steps by
+            default).
         """
+        if every < 1:
+            raise ConfigError(
+                'Invalid dive step sampling value: {}'.format(every)
+            )
         self.engine = engine
+        self.every = every
+        self.checked = 0
         self._first_stop_checked = False
+        self._count = 0
 
 
     @coroutine
@@ -699,14 +1209,54 @@ class DecoModelValidator(object):
         Start the coroutine.
         """
         logger.info('started deco model validator')
+        self._reset()
         prev = None
         while True:
             step = yield
-            self._ceiling_limit(step)
-            self._first_stop_at_ceiling(prev, step)
+            self._validate(prev, step)
             prev = step
 
 
+    @coroutine
+    def chunks(self):
+        """
+        Start the coroutine validating chunks of dive steps.
+
+        .. seealso:: :py:func:`decotengu.flow.chunked_sender`
+        """
+        logger.info('started deco model validator (chunks)')
+        self._reset()
+        prev = None
+        while True:
+            chunk = yield
+            for step in chunk:
+                self._validate(prev, step)
+                prev = step
+
+
+    def _reset(self):
+        """
+        Reset state of the validator for next dive profile.
+        """
+        self.checked = 0
+        self._first_stop_checked = False
+        self._count = 0
+
+
+    def _validate(self, prev, step):
+        """
+        Validate a dive step.
+
+        :param prev: Previous dive step.
+        :param step: Dive step to verify.
+        """
+        # FIXME: Phase circular import, so using 'deco_stop' below
+        if self._count % self.every == 0 or step.phase == 'deco_stop':
+            self._ceiling_limit(step)
+        self._count += 1
+        self._first_stop_at_ceiling(prev, step)
+
+
     def _ceiling_limit(self, step):
         """
         Verify that a dive step is deeper than a pressure ceiling limit.
@@ -714,6 +1264,7 @@ class DecoModelValidator(object):
         :param step: Dive step to verify.
         """
         limit = self.engine.model.ceiling_limit(step.data, step.data.gf)
+        self.checked += 1
         if step.abs_p < limit: # ok when step.abs_p >= limit
             raise EngineError(
                 'Pressure ceiling validation error at {} (limit={})'
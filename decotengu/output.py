@@ -23,14 +23,43 @@ DecoTengu rich output classes, functions and coroutines.
 The implemented coroutines
 
 - convert dive step into rich dive information records
+- convert chunks of dive steps into columnar dive information
 - saving rich dive information records in CSV file
+- saving rich dive information records in binary tissue file
+
+The binary tissue file starts with a header
+
+- magic bytes `DTTISSUE`
+- length of header description as 32-bit unsigned integer (little-endian)
+- header description in JSON format, padded with spaces to multiple of
+  8 bytes; it contains names of sample columns, names of tissue
+  compartment columns, number of tissue compartments, byte order and names
+  of dive phases
+
+and is followed by fixed size records of 64-bit floating point numbers -
+one record for each dive information record. The record contains sample
+columns and then tissue compartment columns for each tissue compartment.
+Dive phase is stored as index of dive phases list.
+
+The file is much smaller than a CSV file, i.e. 568 bytes per dive
+information record versus about 1.9kB, and the records can be appended to
+the file while a dive is in progress. The binary tissue file is read with
+:py:class:`decotengu.output.TissueFile` class, which memory-maps the file
+and provides a zero-copy view for each column and each tissue compartment.
 """
 
+from array import array
 import csv
+import json
 import logging
+import mmap
+import struct
+import sys
 from collections import namedtuple
+from itertools import repeat
 
 from .flow import coroutine
+from .profile import DiveProfile, PHASES, TYPECODES
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +68,15 @@ logger = logging.getLogger(__name__)
 InfoSample = namedtuple('InfoSample', 'depth time pressure gas tissues phase')
 InfoTissue = namedtuple('InfoTissue', 'no pressure limit gf gf_limit')
 
+# binary tissue file format
+TISSUE_FILE_MAGIC = b'DTTISSUE'
+TISSUE_FILE_COLUMNS = (
+    'depth', 'time', 'pressure', 'gas_o2', 'gas_n2', 'gas_he', 'phase'
+)
+TISSUE_FILE_TISSUE_COLUMNS = (
+    'tissue_pressure', 'tissue_limit', 'gf', 'tissue_gf_limit'
+)
+
 
 class DiveStepInfoGenerator(object):
     """
@@ -90,6 +128,235 @@ class DiveStepInfoGenerator(object):
             target.send(sample)
 
 
+
+class InfoColumns(object):
+    """
+    Columnar dive information.
+
+    Each sample column is an array with a value for each dive step. Each
+    tissue compartment column is an array with number of tissue
+    compartments values for each dive step.
+
+    :var depth: Depth of dive steps [m].
+    :var time: Time of dive steps [min].
+    :var pressure: Absolute pressure of dive steps [bar].
+    :var phase: Dive phase codes of dive steps, see
+        :py:data:`decotengu.profile.PHASES`.
+    :var gas: Gas mix indexes of dive steps.
+    :var gas_list: List of gas mixes.
+    :var gf: Gradient factor values of dive steps.
+    :var gf99: Current gradient factor of dive steps, the maximum of
+        tissue compartment gradient at ambient pressure (zero if all tissue
+        compartments are undersaturated).
+    :var surf_gf: Surface gradient factor of dive steps, the maximum of
+        tissue compartment gradient at surface pressure.
+    :var leading: Leading tissue compartment number (starting with one) of
+        dive steps, the tissue compartment with deepest ascent ceiling.
+    :var tissue_pressure: Pressure of inert gas in tissue compartments.
+    :var tissue_limit: Tissue compartment pressure limits (gradient factor
+        1.0).
+    :var tissue_gf_limit: Tissue compartment pressure limits for gradient
+        factor values of dive steps.
+    :var n_tissues: Number of tissue compartments.
+    :var typecode: Typecode of tissue compartment columns, `d` or `f`.
+    """
+    TISSUE_COLUMNS = 'tissue_pressure', 'tissue_limit', 'tissue_gf_limit'
+
+    def __init__(self, n_tissues, gas_list=(), typecode='d'):
+        """
+        Create empty columnar dive information.
+
+        :param n_tissues: Number of tissue compartments.
+        :param gas_list: List of gas mixes.
+        :param typecode: Typecode of tissue compartment columns, `d` for
+            double precision or `f` for single precision.
+        """
+        if typecode not in TYPECODES:
+            raise ValueError('Invalid typecode: {}'.format(typecode))
+
+        self.n_tissues = n_tissues
+        self.typecode = typecode
+        self.depth = array('d')
+        self.time = array('d')
+        self.pressure = array('d')
+        self.phase = array('B')
+        self.gas = array('B')
+        self.gas_list = list(gas_list)
+        self.gf = array('d')
+        self.gf99 = array('d')
+        self.surf_gf = array('d')
+        self.leading = array('B')
+        self.tissue_pressure = array(typecode)
+        self.tissue_limit = array(typecode)
+        self.tissue_gf_limit = array(typecode)
+
+
+    def tissue(self, name, no):
+        """
+        Get tissue compartment column.
+
+        :param name: Tissue compartment column name.
+        :param no: Tissue compartment number (starting with one).
+        """
+        if name not in self.TISSUE_COLUMNS:
+            raise ValueError('Unknown tissue column: {}'.format(name))
+        if not 1 <= no <= self.n_tissues:
+            raise IndexError('Tissue compartment number out of range')
+        return getattr(self, name)[no - 1::self.n_tissues]
+
+
+    def __len__(self):
+        return len(self.time)
+
+
+
+def info_columns(engine, profile):
+    """
+    Calculate columnar dive information for dive steps.
+
+    The Buhlmann coefficients :math:`a` and :math:`b` are calculated once
+    for each tissue compartment of a dive step and used to calculate the
+    tissue compartment pressure limits, GF99 and SurfGF values.
+
+    The tissue compartment columns have the same typecode as tissues gas
+    loading arrays of columnar dive profile.
+
+    :param engine: DecoTengu decompression engine.
+    :param profile: Columnar dive profile or collection of dive steps.
+    """
+    model = engine.model
+    if not isinstance(profile, DiveProfile):
+        steps = list(profile)
+        n = len(steps[0].data.tissues) if steps else model.NUM_COMPARTMENTS
+        profile = DiveProfile(n)
+        profile.extend(steps)
+    n = profile.n_tissues
+
+    info = InfoColumns(n, profile.gas_list, profile.typecode)
+    info.time = profile.time[:]
+    info.pressure = profile.abs_p[:]
+    info.phase = profile.phase[:]
+    info.gas = profile.gas[:]
+    info.gf = profile.gf[:]
+    info.depth.extend(engine._to_depth(p) for p in profile.abs_p)
+
+    coeffs = tuple(zip(model.N2_A, model.N2_B, model.HE_A, model.HE_B))
+    surface = engine.surface_pressure
+    tp_append = info.tissue_pressure.append
+    tl_append = info.tissue_limit.append
+    tg_append = info.tissue_gf_limit.append
+    n2_col = profile.n2
+    he_col = profile.he
+    for i, (abs_p, gf) in enumerate(zip(profile.abs_p, profile.gf)):
+        gf99 = surf_gf = 0
+        leading = 0
+        max_limit = None
+        k = i * n
+        tissues = zip(n2_col[k:k + n], he_col[k:k + n])
+        for no, ((p_n2, p_he), (n2_a, n2_b, he_a, he_b)) in \
+                enumerate(zip(tissues, coeffs), 1):
+            p = p_n2 + p_he
+            a = (n2_a * p_n2 + he_a * p_he) / p
+            b = (n2_b * p_n2 + he_b * p_he) / p
+            gf_limit = (p - a * gf) / (gf / b + 1 - gf)
+            tp_append(p)
+            tl_append((p - a) * b)
+            tg_append(gf_limit)
+
+            # M-value at ambient and surface pressure
+            v = (p - abs_p) / (a + abs_p / b - abs_p)
+            if v > gf99:
+                gf99 = v
+            v = (p - surface) / (a + surface / b - surface)
+            if v > surf_gf:
+                surf_gf = v
+            if max_limit is None or gf_limit > max_limit:
+                max_limit = gf_limit
+                leading = no
+
+        info.gf99.append(gf99)
+        info.surf_gf.append(surf_gf)
+        info.leading.append(leading)
+
+    return info
+
+
+
+class DiveStepInfoBatch(object):
+    """
+    Coroutine class to convert chunks of dive steps into columnar dive
+    information.
+
+    The dive steps are collected in columnar dive profile. When the chunk
+    is full or the coroutine is closed, the columnar dive information is
+    sent to target coroutine, see :py:func:`info_columns` function.
+
+    Create coroutine object, then call it to start the coroutine.
+
+    :var engine: DecoTengu decompression engine.
+    :var target: Coroutine to send columnar dive information to.
+    :var chunk_size: Number of dive steps in a chunk.
+    :var typecode: Typecode of tissue compartment columns, `d` or `f`.
+    """
+    def __init__(self, engine, target, chunk_size=1024, typecode='d'):
+        """
+        Create the coroutine object.
+
+        :param engine: DecoTengu decompression engine.
+        :param target: Coroutine to send columnar dive information to.
+        :param chunk_size: Number of dive steps in a chunk.
+        :param typecode: Typecode of tissue compartment columns, `d` for
+            double precision or `f` for single precision.
+        """
+        self.engine = engine
+        self.target = target
+        self.chunk_size = chunk_size
+        self.typecode = typecode
+
+
+    @coroutine
+    def __call__(self):
+        """
+        Start the coroutine.
+        """
+        profile = None
+        try:
+            while True:
+                step = yield
+                if profile is None:
+                    profile = DiveProfile(
+                        len(step.data.tissues), typecode=self.typecode
+                    )
+                profile.append(step)
+                if len(profile) == self.chunk_size:
+                    self.target.send(info_columns(self.engine, profile))
+                    profile = DiveProfile(
+                        profile.n_tissues, profile.gas_list, self.typecode
+                    )
+        except GeneratorExit:
+            if profile:
+                self.target.send(info_columns(self.engine, profile))
+            self.target.close()
+
+
+    @coroutine
+    def chunks(self):
+        """
+        Start the coroutine receiving chunks of dive steps.
+
+        Columnar dive information is sent to target coroutine for each
+        received chunk.
+
+        .. seealso:: :py:func:`decotengu.flow.chunked_sender`
+        """
+        try:
+            while True:
+                chunk = yield
+                self.target.send(info_columns(self.engine, chunk))
+        except GeneratorExit:
+            self.target.close()
+
+
 @coroutine
 def csv_writer(f, target=None):
     """
@@ -109,19 +376,314 @@ def csv_writer(f, target=None):
     while True:
         sample = yield
 
-        r1 = [
+        r1 = (
             sample.depth, sample.time, sample.pressure,
             sample.gas.o2, sample.gas.n2, sample.gas.he
-        ]
+        )
+        phase = sample.phase
+        fcsv.writerows(
+            r1 + (t.no, t.pressure, t.limit, t.gf, t.gf_limit, phase)
+            for t in sample.tissues
+        )
+
+        if target:
+            target.send(sample)
+
+
+@coroutine
+def csv_columns_writer(f, layout='wide', precision=None, target=None):
+    """
+    Write columnar dive information into a CSV file.
+
+    The columnar dive information is written with one call of CSV writer
+    for each chunk of dive steps (see :py:class:`DiveStepInfoBatch`). The
+    CSV file has one row per dive step and the following layouts are
+    supported
+
+    wide
+        Tissue compartment columns for each tissue compartment, i.e.
+        `tissue_pressure_01`, ..., `tissue_pressure_16`.
+    leading
+        Maximum value of each tissue compartment column, which is leading
+        tissue compartment data plotted by `dt-plot` command.
+
+    :param f: File object.
+    :param layout: CSV file layout, `wide` or `leading`.
+    :param precision: Number of decimal places of floating point values,
+        full precision by default.
+    :param target: Optional coroutine to forward columnar dive information
+        to.
+    """
+    if layout not in ('wide', 'leading'):
+        raise ValueError('Unknown CSV file layout: {}'.format(layout))
+
+    header = [
+        'depth', 'time', 'pressure', 'gas_o2', 'gas_n2', 'gas_he', 'phase',
+        'gf', 'gf99', 'surf_gf', 'leading'
+    ]
+    names = InfoColumns.TISSUE_COLUMNS
+    fcsv = csv.writer(f)
+    if precision is None:
+        fmt = lambda values: values
+    else:
+        fmt = lambda values: map(round, values, repeat(precision))
+
+    try:
+        info = yield
+        n = info.n_tissues
+        if layout == 'wide':
+            header.extend(
+                '{}_{:02d}'.format(name, k)
+                for name in names for k in range(1, n + 1)
+            )
+        else:
+            header.extend(names)
+        fcsv.writerow(header)
+
+        while True:
+            if layout == 'wide':
+                tissues = [
+                    fmt(info.tissue(name, k))
+                    for name in names for k in range(1, n + 1)
+                ]
+            else:
+                tissues = [
+                    fmt(map(
+                        max, *(info.tissue(name, k) for k in range(1, n + 1))
+                    ))
+                    for name in names
+                ]
+
+            gas = [info.gas_list[i] for i in info.gas]
+            fcsv.writerows(zip(
+                fmt(info.depth), fmt(info.time), fmt(info.pressure),
+                (m.o2 for m in gas), (m.n2 for m in gas), (m.he for m in gas),
+                (PHASES[i] for i in info.phase),
+                fmt(info.gf), fmt(info.gf99), fmt(info.surf_gf), info.leading,
+                *tissues
+            ))
+
+            if target:
+                target.send(info)
+
+            info = yield
+    except GeneratorExit:
+        if target:
+            target.close()
+
+
+def tissue_file_header(n_tissues):
+    """
+    Create header of binary tissue file.
+
+    :param n_tissues: Number of tissue compartments.
+    """
+    desc = {
+        'version': 1,
+        'byteorder': 'little',
+        'columns': TISSUE_FILE_COLUMNS,
+        'tissue_columns': TISSUE_FILE_TISSUE_COLUMNS,
+        'tissues': n_tissues,
+        'phases': PHASES,
+    }
+    desc = json.dumps(desc).encode()
+    size = len(TISSUE_FILE_MAGIC) + 4 + len(desc)
+    desc += b' ' * (-size % 8)
+    return TISSUE_FILE_MAGIC + struct.pack('<I', len(desc)) + desc
+
+
+@coroutine
+def binary_writer(f, target=None):
+    """
+    Write rich dive information records into a binary tissue file.
+
+    The header of the file is written with the first dive information
+    record if the file position is at the beginning of the file. Otherwise,
+    the dive information records are appended to the file.
+
+    :param f: Binary file object.
+    :param target: Optional coroutine to forward dive information records to.
+    """
+    phases = {p: i for i, p in enumerate(PHASES)}
+    values = array('d')
+    header = f.tell() == 0
+    while True:
+        sample = yield
+
+        if header:
+            f.write(tissue_file_header(len(sample.tissues)))
+            header = False
+
+        gas = sample.gas
+        values.extend((
+            sample.depth, sample.time, sample.pressure,
+            gas.o2, gas.n2, gas.he, phases[sample.phase]
+        ))
         for tissue in sample.tissues:
-            r2 = [
-                tissue.no, tissue.pressure, tissue.limit, tissue.gf,
-                tissue.gf_limit, sample.phase
-            ]
-            fcsv.writerow(r1 + r2)
+            values.extend((
+                tissue.pressure, tissue.limit, tissue.gf, tissue.gf_limit
+            ))
+        if sys.byteorder != 'little':
+            values.byteswap()
+        f.write(values.tobytes())
+        del values[:]
 
         if target:
             target.send(sample)
 
 
+
+class TissueFile(object):
+    """
+    Reader of binary tissue file.
+
+    The file is memory-mapped and each column is a view of the memory-map
+    without copying data, i.e.
+
+        >>> import tempfile
+        >>> import decotengu
+        >>> from decotengu.flow import sender
+        >>> engine = decotengu.create(time_delta=1)
+        >>> engine.add_gas(0, 21)
+        >>> f = tempfile.NamedTemporaryFile()
+        >>> info = DiveStepInfoGenerator(engine, binary_writer(f))
+        >>> data = sender(engine.calculate, info)(35, 40)
+        >>> for step in data: pass
+        >>> f.flush()
+
+        >>> tf = TissueFile(f.name)
+        >>> len(tf)
+        94
+        >>> [round(v, 1) for v in tf.column('time')[-3:]]
+        [86.2, 87.2, 87.5]
+        >>> [round(v, 4) for v in tf.tissue('tissue_pressure', 1)[-3:]]
+        [1.0082, 1.0056, 1.0]
+        >>> tf.phase(-1)
+        'ascent'
+        >>> tf.close()
+
+    The views are instances of `memoryview` class and can be wrapped with
+    NumPy arrays without copying data, i.e. with `numpy.asarray` function.
+
+    The number of records is determined by size of the file, so records
+    appended to the file are available after :py:meth:`refresh` method
+    call.
+
+    :var columns: Names of sample columns.
+    :var tissue_columns: Names of tissue compartment columns.
+    :var n_tissues: Number of tissue compartments.
+    :var phases: Names of dive phases.
+    """
+    def __init__(self, fn):
+        """
+        Open binary tissue file.
+
+        :param fn: File name.
+        """
+        self._f = open(fn, 'rb')
+        magic = self._f.read(len(TISSUE_FILE_MAGIC))
+        if magic != TISSUE_FILE_MAGIC:
+            self._f.close()
+            raise ValueError('Not a binary tissue file: {}'.format(fn))
+        size, = struct.unpack('<I', self._f.read(4))
+        desc = json.loads(self._f.read(size).decode())
+        if desc['byteorder'] != sys.byteorder:
+            self._f.close()
+            raise ValueError(
+                'Byte order of binary tissue file not supported: {}'
+                .format(desc['byteorder'])
+            )
+
+        self.columns = tuple(desc['columns'])
+        self.tissue_columns = tuple(desc['tissue_columns'])
+        self.n_tissues = desc['tissues']
+        self.phases = tuple(desc['phases'])
+
+        self._offset = len(TISSUE_FILE_MAGIC) + 4 + size
+        self._width = len(self.columns) \
+            + self.n_tissues * len(self.tissue_columns)
+        self._mmap = None
+        self._view = None
+        self.refresh()
+
+
+    def refresh(self):
+        """
+        Memory-map the file again to access appended records.
+
+        Views obtained before the call are not updated.
+        """
+        f = self._f
+        f.seek(0, 2)
+        n = (f.tell() - self._offset) // (8 * self._width)
+        if self._mmap is not None:
+            self._view.release()
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass # views of previous memory-map are still used
+
+        self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        start = self._offset
+        end = start + n * 8 * self._width
+        self._view = memoryview(self._mmap)[start:end].cast('d')
+
+
+    def column(self, name):
+        """
+        Get view of sample column.
+
+        :param name: Column name.
+        """
+        k = self.columns.index(name)
+        return self._view[k::self._width]
+
+
+    def tissue(self, name, no):
+        """
+        Get view of tissue compartment column.
+
+        :param name: Tissue compartment column name.
+        :param no: Tissue compartment number (starting with one).
+        """
+        if not 1 <= no <= self.n_tissues:
+            raise IndexError('Tissue compartment number out of range')
+        nc = len(self.tissue_columns)
+        k = len(self.columns) + (no - 1) * nc \
+            + self.tissue_columns.index(name)
+        return self._view[k::self._width]
+
+
+    def phase(self, i):
+        """
+        Get name of dive phase of a record.
+
+        :param i: Record index.
+        """
+        return self.phases[int(self.column('phase')[i])]
+
+
+    def close(self):
+        """
+        Close binary tissue file.
+
+        The views of the file has to be released before the call.
+        """
+        self._view.release()
+        self._mmap.close()
+        self._f.close()
+
+
+    def __len__(self):
+        return len(self._view) // self._width
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
 # vim: sw=4:et:ai
@@ -0,0 +1,487 @@
+#
+# DecoTengu - dive decompression library.
+#
+# Copyright (C) 2013-2018 by Artur Wroblewski <wrobell@riseup.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Columnar dive profile.
+
+Long dive profiles with short time delta (see
+:py:class:`decotengu.conveyor.Conveyor`) consist of hundreds of thousands
+of dive steps. Each dive step is a tuple with nested decompression model
+data, which requires over 1.5kB of memory. The columnar dive profile stores
+dive steps in arrays (see `array` module) - one array for each dive step
+attribute and two arrays for tissues gas loading - which requires less than
+300 bytes for each dive step. The tissues gas loading arrays can store
+values with single precision, which requires less than 170 bytes for each
+dive step (see `typecode` parameter of
+:py:meth:`decotengu.Engine.calculate_profile` method).
+
+The columnar dive profile is created with
+:py:meth:`decotengu.Engine.calculate_profile` method
+
+    >>> import decotengu
+    >>> engine = decotengu.create(time_delta=0.1)
+    >>> engine.add_gas(0, 21)
+    >>> profile = engine.calculate_profile(35, 40)
+    >>> len(profile)
+    878
+    >>> profile[-1]
+    Step(phase="ascent", abs_p=1.0133, time=87.5000, gf=0.8500)
+
+The columns can be accessed directly, i.e. time and nitrogen pressure in
+first tissue compartment of the last 3 dive steps
+
+    >>> tail = profile[-3:]
+    >>> [round(t, 1) for t in tail.time]
+    [87.3, 87.4, 87.5]
+    >>> [round(p, 4) for p in tail.n2_tissue(0)]
+    [1.0048, 1.0029, 1.0]
+
+Dive state at arbitrary time can be obtained without expansion of dive
+profile with :py:class:`decotengu.profile.ProfileIndex` class. The index is
+created from dive steps calculated by DecoTengu engine
+
+    >>> engine = decotengu.create()
+    >>> engine.add_gas(0, 21)
+    >>> index = ProfileIndex(engine, engine.calculate(35, 40))
+    >>> index.state_at(45.5)
+    Step(phase="deco_stop", abs_p=2.2115, time=45.5000, gf=0.4833)
+
+and it allows to query for dive state at many points in time at once
+
+    >>> for step in index.states_at([20, 40.5, 41]):
+    ...     print(step)
+    Step(phase="const", abs_p=4.5080, time=20.0000, gf=0.3000)
+    Step(phase="ascent", abs_p=4.0088, time=40.5000, gf=0.3000)
+    Step(phase="ascent", abs_p=3.5095, time=41.0000, gf=0.3000)
+"""
+
+from array import array
+from bisect import bisect_right
+from itertools import groupby
+import logging
+
+from .const import EPSILON
+from .engine import Phase, Step
+from .error import EngineError
+from .flow import coroutine
+from .model import Data, DecoModelValidator
+
+logger = logging.getLogger(__name__)
+
+# dive phase codes stored in dive profile
+PHASES = (
+    Phase.START, Phase.DESCENT, Phase.CONST, Phase.ASCENT, Phase.DECO_STOP,
+    Phase.GAS_SWITCH,
+)
+PHASE_CODES = {p: i for i, p in enumerate(PHASES)}
+
+# typecodes of tissues gas loading arrays - double and single precision
+TYPECODES = 'd', 'f'
+
+
+class DiveProfile(object):
+    """
+    Dive profile with dive steps stored in columns.
+
+    Dive phases are stored as codes, see `PHASES` tuple. Gas mixes are
+    stored as indexes of gas mix list. Tissues gas loading is stored in
+    nitrogen and helium arrays, each with number of tissue compartments
+    values for each dive step.
+
+    The tissues gas loading arrays store values with double precision
+    (typecode `d`) or with single precision (typecode `f`), which halves
+    memory used by the arrays. The dive profile is calculated with double
+    precision in both cases, but validation of a dive profile stored with
+    single precision can fail when ascent ceiling limit is very close to
+    dive step pressure.
+
+    :var time: Time of dive steps [min].
+    :var abs_p: Absolute pressure of dive steps [bar].
+    :var phase: Dive phase codes of dive steps.
+    :var gas: Gas mix indexes of dive steps.
+    :var gf: Gradient factor values of dive steps.
+    :var n2: Nitrogen pressure in tissue compartments of dive steps.
+    :var he: Helium pressure in tissue compartments of dive steps.
+    :var gas_list: List of gas mixes.
+    :var n_tissues: Number of tissue compartments.
+    :var typecode: Typecode of tissues gas loading arrays, `d` or `f`.
+    """
+    def __init__(self, n_tissues=16, gas_list=(), typecode='d'):
+        """
+        Create empty dive profile.
+
+        :param n_tissues: Number of tissue compartments.
+        :param gas_list: List of gas mixes.
+        :param typecode: Typecode of tissues gas loading arrays, `d` for
+            double precision or `f` for single precision.
+        """
+        if typecode not in TYPECODES:
+            raise ValueError('Invalid typecode: {}'.format(typecode))
+
+        self.time = array('d')
+        self.abs_p = array('d')
+        self.phase = array('B')
+        self.gas = array('B')
+        self.gf = array('d')
+        self.n2 = array(typecode)
+        self.he = array(typecode)
+        self.gas_list = list(gas_list)
+        self.n_tissues = n_tissues
+        self.typecode = typecode
+        self._gas_index = {m: i for i, m in enumerate(self.gas_list)}
+
+
+    def append(self, step):
+        """
+        Append dive step to dive profile.
+
+        :param step: Dive step.
+        """
+        gas = self._gas_index.get(step.gas)
+        if gas is None:
+            gas = self._gas_index[step.gas] = len(self.gas_list)
+            self.gas_list.append(step.gas)
+
+        assert len(step.data.tissues) == self.n_tissues
+
+        self.time.append(step.time)
+        self.abs_p.append(step.abs_p)
+        self.phase.append(PHASE_CODES[step.phase])
+        self.gas.append(gas)
+        self.gf.append(step.data.gf)
+        self.n2.extend(t[0] for t in step.data.tissues)
+        self.he.extend(t[1] for t in step.data.tissues)
+
+
+    def extend(self, steps):
+        """
+        Append collection of dive steps to dive profile.
+
+        :param steps: Collection of dive steps.
+        """
+        for step in steps:
+            self.append(step)
+
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the columns of dive profile [bytes].
+        """
+        columns = self.time, self.abs_p, self.phase, self.gas, self.gf, \
+            self.n2, self.he
+        return sum(c.itemsize * len(c) for c in columns)
+
+
+    def n2_tissue(self, k):
+        """
+        Get nitrogen pressure of tissue compartment for all dive steps.
+
+        :param k: Tissue compartment number (starting with zero).
+        """
+        return self.n2[k::self.n_tissues]
+
+
+    def he_tissue(self, k):
+        """
+        Get helium pressure of tissue compartment for all dive steps.
+
+        :param k: Tissue compartment number (starting with zero).
+        """
+        return self.he[k::self.n_tissues]
+
+
+    def __len__(self):
+        return len(self.time)
+
+
+    def __iter__(self):
+        return (self._step(i) for i in range(len(self)))
+
+
+    def __getitem__(self, key):
+        """
+        Get dive step or a dive profile slice.
+
+        :param key: Dive step index or a slice.
+        """
+        if isinstance(key, slice):
+            return self._slice(key)
+
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError('Dive profile index out of range')
+        return self._step(key)
+
+
+    def _step(self, i):
+        """
+        Create dive step.
+
+        :param i: Dive step index.
+        """
+        n = self.n_tissues
+        k = i * n
+        tissues = tuple(zip(self.n2[k:k + n], self.he[k:k + n]))
+        data = Data(tissues, self.gf[i])
+        return Step(
+            PHASES[self.phase[i]], self.abs_p[i], self.time[i],
+            self.gas_list[self.gas[i]], data
+        )
+
+
+    def _slice(self, key):
+        """
+        Create dive profile with a slice of dive steps.
+
+        :param key: Slice of dive steps.
+        """
+        profile = DiveProfile(self.n_tissues, self.gas_list, self.typecode)
+        profile.time = self.time[key]
+        profile.abs_p = self.abs_p[key]
+        profile.phase = self.phase[key]
+        profile.gas = self.gas[key]
+        profile.gf = self.gf[key]
+
+        start, stop, stride = key.indices(len(self))
+        n = self.n_tissues
+        if stride == 1:
+            profile.n2 = self.n2[start * n:stop * n]
+            profile.he = self.he[start * n:stop * n]
+        else:
+            for i in range(start, stop, stride):
+                profile.n2.extend(self.n2[i * n:(i + 1) * n])
+                profile.he.extend(self.he[i * n:(i + 1) * n])
+        return profile
+
+
+
+class ProfileIndex(object):
+    """
+    Index of dive profile to query dive state at arbitrary time.
+
+    The index keeps dive steps calculated by DecoTengu engine. The dive
+    state at given time is calculated from the dive step preceding the
+    time with one calculation of tissues gas loading. The dive segment
+    enclosing the time is found with binary search.
+
+    :var engine: DecoTengu decompression engine.
+    :var steps: Dive steps of dive profile.
+    :var times: Time of dive steps [min].
+    """
+    def __init__(self, engine, steps):
+        """
+        Create index of dive profile.
+
+        :param engine: DecoTengu decompression engine.
+        :param steps: Dive steps of dive profile.
+        """
+        self.engine = engine
+        self.steps = tuple(steps)
+        self.times = array('d', (s.time for s in self.steps))
+
+
+    def state_at(self, time):
+        """
+        Calculate dive state at given time.
+
+        Dive step is returned. If there are multiple dive steps at the
+        time, i.e. on gas mix switch, then the last dive step is
+        returned.
+
+        :param time: Time of dive state [min].
+        """
+        times = self.times
+        if not times[0] - EPSILON <= time <= times[-1] + EPSILON:
+            raise ValueError(
+                'Time {}min outside of dive profile'.format(time)
+            )
+
+        i = bisect_right(times, time + EPSILON)
+        prev = self.steps[i - 1]
+        if time - prev.time < EPSILON:
+            return prev
+        return self._load(prev, self.steps[i], (time,))[0]
+
+
+    def states_at(self, times):
+        """
+        Calculate dive states for a sorted collection of times.
+
+        The dive states are calculated in one pass over dive segments and
+        the collection of times. If the times within a dive segment are
+        equally spaced, i.e. timestamps of a dive log, tissues gas loading
+        is calculated at once with
+        :py:meth:`decotengu.model.ZH_L16_GF.load_series` method.
+
+        Tuple of dive steps is returned.
+
+        :param times: Sorted collection of times [min].
+        """
+        steps = self.steps
+        result = []
+        times = tuple(times)
+        if not times:
+            return ()
+
+        if times[0] < self.times[0] - EPSILON \
+                or times[-1] > self.times[-1] + EPSILON:
+            raise ValueError('Times outside of dive profile')
+
+        i = 0  # index of next dive step
+        j = 0  # index of next time
+        n = len(times)
+        while j < n:
+            while i < len(steps) and steps[i].time < times[j] + EPSILON:
+                i += 1
+            prev = steps[i - 1]
+
+            # times equal to time of previous dive step
+            while j < n and times[j] - prev.time < EPSILON:
+                result.append(prev)
+                j += 1
+
+            # times within dive segment
+            k = j
+            while k < n and times[k] < steps[i].time - EPSILON:
+                k += 1
+            if k > j:
+                result.extend(self._load(prev, steps[i], times[j:k]))
+                j = k
+
+        assert len(result) == n
+        return tuple(result)
+
+
+    def _load(self, prev, end, times):
+        """
+        Calculate dive states within dive segment for a sorted collection
+        of times.
+
+        The equally spaced times are loaded at once with
+        :py:meth:`decotengu.model.ZH_L16_GF.load_series` method.
+
+        :param prev: Dive step at start of dive segment.
+        :param end: Dive step at end of dive segment.
+        :param times: Sorted collection of times within dive segment [min].
+        """
+        engine = self.engine
+        rate = (end.abs_p - prev.abs_p) / (end.time - prev.time)
+        phase = end.phase
+        gf = end.data.gf if phase == Phase.ASCENT else None
+        if phase not in (Phase.ASCENT, Phase.DESCENT, Phase.DECO_STOP):
+            phase = Phase.CONST
+
+        result = []
+        k = 0
+        n = len(times)
+        while k < n:
+            offset = times[k] - prev.time
+            delta = times[k + 1] - times[k] if k + 1 < n else 0
+            if delta < EPSILON:
+                delta = offset
+
+            # find the run of equally spaced times
+            m = k + 1
+            while m < n and abs(times[m] - times[k] - (m - k) * delta) \
+                    < EPSILON:
+                m += 1
+
+            series = engine.model.load_series(
+                prev.abs_p, delta, m - k, end.gas, rate, prev.data,
+                offset=offset
+            )
+            for t, data in zip(times[k:m], series):
+                abs_p = prev.abs_p + rate * (t - prev.time)
+                if gf is not None:
+                    data = data._replace(gf=gf)
+                result.append(Step(phase, abs_p, t, end.gas, data))
+            k = m
+
+        return result
+
+
+
+def validate_profile(engine, profile):
+    """
+    Validate columnar dive profile with decompression model.
+
+    The dive profile is validated after its calculation, i.e. instead of
+    validation of each dive step with
+    :py:class:`decotengu.model.DecoModelValidator` coroutine. The ascent
+    ceiling limits of the dive steps are calculated with
+    :py:meth:`decotengu.model.ZH_L16_GF.ceiling_limits` in one pass over
+    the columns of the dive profile, without creation of dive step objects.
+    The first decompression stop is verified with the decompression model
+    validator.
+
+    :param engine: DecoTengu decompression engine.
+    :param profile: Columnar dive profile.
+    """
+    model = engine.model
+    n = profile.n_tissues
+    n2_col = profile.n2
+    he_col = profile.he
+    abs_p_col = profile.abs_p
+
+    # gradient factor changes at decompression stops only, so calculate
+    # ceiling limits for runs of dive steps with the same gradient factor
+    i = 0
+    for gf, items in groupby(profile.gf):
+        j = i + len(tuple(items))
+        data = (
+            Data(tuple(zip(n2_col[k:k + n], he_col[k:k + n])), gf)
+            for k in range(i * n, j * n, n)
+        )
+        limits = model.ceiling_limits(data, gf)
+        for k, limit in enumerate(limits, i):
+            if abs_p_col[k] < limit: # ok when abs_p >= limit
+                raise EngineError(
+                    'Pressure ceiling validation error at {} (limit={})'
+                    .format(profile[k], limit)
+                )
+        i = j
+
+    try:
+        i = profile.phase.index(PHASE_CODES[Phase.DECO_STOP])
+    except ValueError:
+        i = 0  # no decompression stops
+    if i > 0:
+        validator = DecoModelValidator(engine)
+        validator._first_stop_at_ceiling(profile[i - 1], profile[i])
+
+
+
+@coroutine
+def profile_writer(profile, target=None):
+    """
+    Write dive steps into columnar dive profile.
+
+    :param profile: Dive profile.
+    :param target: Optional coroutine to forward dive steps to.
+    """
+    while True:
+        step = yield
+        profile.append(step)
+        if target:
+            target.send(step)
+
+
+# vim: sw=4:et:ai
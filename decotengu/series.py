@@ -0,0 +1,339 @@
+#
+# DecoTengu - dive decompression library.
+#
+# Copyright (C) 2013-2018 by Artur Wroblewski <wrobell@riseup.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Series of repetitive dives.
+
+A dive series is a chain of dives separated by surface intervals. Tissues
+gas loading at the start of a dive depends on all previous dives and
+surface intervals. During a surface interval, the diver breathes air at
+surface pressure.
+
+The tissues gas loading at the start and at the end of each dive is
+stored, so when a dive is changed, only the dive and the dives after it
+are recalculated. When tolerance is specified, the recalculation stops at
+a dive, which tissues gas loading at its start differs from previously
+calculated one by no more than the tolerance.
+
+Create the decompression engine and plan three dives
+
+    >>> import decotengu
+    >>> from decotengu.series import DiveSeries
+    >>> engine = decotengu.create()
+    >>> engine.add_gas(0, 21)
+    >>> series = DiveSeries(engine, tolerance=0.01)
+    >>> series.add(40, 25)
+    1
+    >>> series.add(30, 30, interval=60)
+    1
+    >>> series.add(18, 45, interval=120)
+    1
+    >>> [r.stops.total for r in series]
+    [25.0, 26.0, 0]
+
+Plan the next dive after a day at surface. Extend surface interval before
+the second dive. The second and the third dives are recalculated, but
+tissues gas loading at the start of the fourth dive converges within the
+tolerance, so the fourth dive is not recalculated
+
+    >>> series.add(18, 45, interval=24 * 60)
+    1
+    >>> series.update(1, interval=180)
+    2
+    >>> [r.stops.total for r in series]
+    [25.0, 13.0, 0, 0]
+"""
+
+from collections import deque, namedtuple
+import logging
+
+from . import const
+from .engine import GasMix, DecoTable
+
+logger = logging.getLogger(__name__)
+
+# gas mix breathed during surface interval
+AIR = GasMix(0, 100 - const.AIR_N2, const.AIR_N2, 0)
+
+
+Dive = namedtuple('Dive', 'depth time interval')
+Dive.__doc__ = """
+Dive of a dive series.
+
+:var depth: Maximum depth [m].
+:var time: Dive bottom time [min].
+:var interval: Surface interval before the dive [min].
+"""
+
+DiveResult = namedtuple(
+    'DiveResult', 'dive start end start_time end_time stops'
+)
+DiveResult.__doc__ = """
+Calculated dive of a dive series.
+
+:var dive: Dive of the dive series.
+:var start: Decompression model data at the start of the dive.
+:var end: Decompression model data at the end of the dive.
+:var start_time: Runtime of the dive series at the start of the dive [min].
+:var end_time: Runtime of the dive series at the end of the dive [min].
+:var stops: Decompression table of the dive.
+"""
+
+
+def converged(d1, d2, tolerance):
+    """
+    Check if tissues gas loading of decompression model data differs by
+    no more than tolerance.
+
+    :param d1: Decompression model data.
+    :param d2: Decompression model data.
+    :param tolerance: Maximum difference of inert gas pressure in a tissue
+        compartment [bar].
+    """
+    return d1.gf == d2.gf and all(
+        abs(p1 - p2) <= tolerance
+        for t1, t2 in zip(d1.tissues, d2.tissues)
+        for p1, p2 in zip(t1, t2)
+    )
+
+
+
+class DiveSeries(object):
+    """
+    Series of repetitive dives.
+
+    The dive series is a sequence of calculated dives, see
+    :py:class:`decotengu.series.DiveResult`.
+
+    :var engine: DecoTengu decompression engine.
+    :var data: Decompression model data at the start of the dive series.
+    :var tolerance: Maximum difference of inert gas pressure in a tissue
+        compartment to stop recalculation of the dive series [bar].
+    :var dives: List of dives of the dive series.
+    :var results: List of calculated dives.
+    :var calculated: Number of dive profile calculations.
+    """
+    def __init__(self, engine, data=None, tolerance=None):
+        """
+        Create dive series.
+
+        :param engine: DecoTengu decompression engine.
+        :param data: Decompression model data at the start of the dive
+            series (tissues saturated at surface pressure by default).
+        :param tolerance: Maximum difference of inert gas pressure in a
+            tissue compartment to stop recalculation of the dive series
+            [bar]; all subsequent dives are recalculated if null.
+        """
+        if data is None:
+            data = engine.model.init(engine.surface_pressure)
+
+        self.engine = engine
+        self.data = data
+        self.tolerance = tolerance
+        self.dives = []
+        self.results = []
+        self.calculated = 0
+
+
+    def __len__(self):
+        return len(self.results)
+
+
+    def __getitem__(self, k):
+        return self.results[k]
+
+
+    def __iter__(self):
+        return iter(self.results)
+
+
+    def add(self, depth, time, interval=0):
+        """
+        Add dive at the end of the dive series.
+
+        Number of calculated dives is returned.
+
+        :param depth: Maximum depth [m].
+        :param time: Dive bottom time [min].
+        :param interval: Surface interval before the dive [min].
+        """
+        self.dives.append(Dive(depth, time, interval))
+        return self._recalculate(len(self.dives) - 1)
+
+
+    def update(self, k, depth=None, time=None, interval=None):
+        """
+        Change dive of the dive series and recalculate the dive and the
+        dives after it.
+
+        Number of recalculated dives is returned.
+
+        :param k: Index of the dive.
+        :param depth: Maximum depth [m].
+        :param time: Dive bottom time [min].
+        :param interval: Surface interval before the dive [min].
+        """
+        dive = self.dives[k]
+        self.dives[k] = Dive(
+            dive.depth if depth is None else depth,
+            dive.time if time is None else time,
+            dive.interval if interval is None else interval,
+        )
+        return self._recalculate(k)
+
+
+    def remove(self, k):
+        """
+        Remove dive from the dive series and recalculate the dives after
+        it.
+
+        Number of recalculated dives is returned.
+
+        :param k: Index of the dive.
+        """
+        del self.dives[k]
+        del self.results[k]
+        return self._recalculate(k)
+
+
+    def recalculate(self, k=0):
+        """
+        Recalculate all dives of the dive series starting with dive `k`.
+
+        The method has to be called when configuration of decompression
+        engine changes.
+
+        Number of recalculated dives is returned.
+
+        :param k: Index of the first dive to recalculate.
+        """
+        return self._recalculate(k, converge=False)
+
+
+    def _recalculate(self, k, converge=True):
+        """
+        Recalculate dives of the dive series starting with dive `k`.
+
+        If `converge` is true, then the recalculation stops at a dive,
+        which can be reused, see
+        :py:meth:`decotengu.series.DiveSeries._reusable`.
+
+        Number of recalculated dives is returned.
+
+        :param k: Index of the first dive to recalculate.
+        :param converge: Stop recalculation when dives converge.
+        """
+        results = self.results
+        n = len(self.dives)
+        for i in range(k, n):
+            dive = self.dives[i]
+            if i == 0:
+                data, runtime = self.data, 0
+            else:
+                prev = results[i - 1]
+                data, runtime = prev.end, prev.end_time
+            data = self._surface(data, dive.interval)
+            runtime += dive.interval
+
+            old = results[i] if i < len(results) else None
+            if converge and i > k and self._reusable(old, dive, data):
+                self._shift(i, runtime - old.start_time)
+                if __debug__:
+                    logger.debug(
+                        'dive series: converged at dive {}'.format(i)
+                    )
+                return i - k
+
+            result = self._dive(dive, data, runtime)
+            if old is None:
+                results.append(result)
+            else:
+                results[i] = result
+
+        return n - k
+
+
+    def _surface(self, data, interval):
+        """
+        Calculate tissues gas loading at the end of surface interval.
+
+        The gradient factor is reset to gradient factor low parameter for
+        the next dive.
+
+        :param data: Decompression model data at the start of surface
+            interval.
+        :param interval: Surface interval [min].
+        """
+        engine = self.engine
+        model = engine.model
+        if interval > 0:
+            data = model.load(engine.surface_pressure, interval, AIR, 0, data)
+        return data._replace(gf=model.gf_low)
+
+
+    def _reusable(self, result, dive, data):
+        """
+        Check if previously calculated dive can be reused.
+
+        :param result: Previously calculated dive (or null).
+        :param dive: Dive of the dive series.
+        :param data: Decompression model data at the start of the dive.
+        """
+        return self.tolerance is not None \
+            and result is not None \
+            and result.dive == dive \
+            and converged(result.start, data, self.tolerance)
+
+
+    def _shift(self, k, delta):
+        """
+        Shift runtime of calculated dives starting with dive `k`.
+
+        :param k: Index of the first dive.
+        :param delta: Runtime shift [min].
+        """
+        results = self.results
+        for i in range(k, len(results)):
+            r = results[i]
+            results[i] = r._replace(
+                start_time=r.start_time + delta, end_time=r.end_time + delta
+            )
+
+
+    def _dive(self, dive, data, runtime):
+        """
+        Calculate dive of the dive series.
+
+        :param dive: Dive of the dive series.
+        :param data: Decompression model data at the start of the dive.
+        :param runtime: Runtime of the dive series at the start of the
+            dive [min].
+        """
+        engine = self.engine
+        steps = engine.calculate(
+            dive.depth, dive.time, data=data, runtime=runtime
+        )
+        end, = deque(steps, maxlen=1)
+        self.calculated += 1
+
+        stops = DecoTable(engine.deco_table)
+        return DiveResult(dive, data, end.data, runtime, end.time, stops)
+
+
+# vim: sw=4:et:ai
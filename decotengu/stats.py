@@ -0,0 +1,374 @@
+#
+# DecoTengu - dive decompression library.
+#
+# Copyright (C) 2013-2018 by Artur Wroblewski <wrobell@riseup.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Decompression engine instrumentation.
+
+The instrumentation counts calls of decompression model methods and
+decompression stop search probes, and measures time of dive phases for
+each dive profile calculation.
+
+The instrumentation overrides methods of decompression engine and
+decompression model with counting and timing wrappers. Decompression
+engine, which is not instrumented, is not affected in any way.
+
+Create the decompression engine and instrument it with
+:py:func:`decotengu.stats.instrument` function
+
+    >>> import decotengu
+    >>> from decotengu.stats import instrument
+    >>> engine = decotengu.create()
+    >>> engine.add_gas(0, 21)
+    >>> instr = instrument(engine)
+
+Calculate dive profile and read the statistics of the calculation
+
+    >>> profile = list(engine.calculate(35, 40))
+    >>> stats = instr.last
+    >>> stats.counters['deco_stops']
+    6
+    >>> stats.stops[0]
+    StopStats(depth=18.0, time=1.0, loads=1, probes=1, linear=0, bisect=0)
+
+The statistics of all calculations are aggregated
+
+    >>> profile = list(engine.calculate(40, 30))
+    >>> instr.total.counters['plans']
+    2
+
+Instrument the engine after other overrides of decompression engine
+and decompression model methods are applied, i.e. after
+:py:func:`decotengu.alt.tab.tab_engine` function is called.
+"""
+
+from collections import namedtuple, Counter
+from functools import wraps
+import time
+
+PHASES = 'descent', 'bottom', 'free_ascent', 'deco_ascent'
+
+# decompression model methods counted by instrumentation
+MODEL_METHODS = 'load', 'load_into', 'load_series', 'ceiling_limit', \
+    'ceiling_limits'
+
+# decompression model methods calculating tissues gas loading
+LOAD_METHODS = 'load', 'load_into', 'load_series'
+
+StopStats = namedtuple('StopStats', 'depth time loads probes linear bisect')
+StopStats.__doc__ = """
+Decompression stop search statistics.
+
+:var depth: Depth of decompression stop [m].
+:var time: Length of decompression stop [min].
+:var loads: Number of tissues gas loading calculations.
+:var probes: Number of checks if ascent to next decompression stop is
+    possible.
+:var linear: Number of linear search iterations.
+:var bisect: Number of binary search probes.
+"""
+
+
+class Stats(object):
+    """
+    Statistics of dive profile calculations.
+
+    The counters are
+
+    plans
+        Number of dive profile calculations.
+    load, load_into, load_series, ceiling_limit, ceiling_limits
+        Number of calls of decompression model methods.
+    loads
+        Number of tissues gas loading calculations, i.e. calls of `load`
+        and `load_into` methods plus length of each series calculated with
+        `load_series` method.
+    can_ascend
+        Number of checks if ascent is possible.
+    deco_stops, linear, bisect
+        Number of decompression stops, decompression stop linear search
+        iterations and binary search probes.
+
+    The timers measure time of dive phases (see `PHASES`) and total time of
+    calculation including dive steps pipeline (`total`).
+
+    Statistics are aggregated with `+` operator.
+
+    :var counters: Counters of events.
+    :var timers: Time of dive phases [s].
+    :var stops: Decompression stop search statistics.
+    """
+    def __init__(self):
+        """
+        Create empty statistics.
+        """
+        self.counters = Counter()
+        self.timers = Counter()
+        self.stops = []
+
+
+    def __add__(self, other):
+        stats = Stats()
+        stats.merge(self)
+        stats.merge(other)
+        return stats
+
+
+    def merge(self, other):
+        """
+        Add statistics to this statistics.
+
+        :param other: Statistics to add.
+        """
+        self.counters.update(other.counters)
+        self.timers.update(other.timers)
+        self.stops.extend(other.stops)
+
+
+
+class Instrument(object):
+    """
+    Instrumentation of decompression engine.
+
+    :var engine: DecoTengu decompression engine.
+    :var last: Statistics of last dive profile calculation.
+    :var total: Statistics of all dive profile calculations.
+    :var _phase: Dive phase being timed.
+    :var _stop: Counters of decompression stop being calculated.
+    """
+    def __init__(self, engine):
+        """
+        Create instrumentation of decompression engine.
+
+        :param engine: DecoTengu decompression engine.
+        """
+        self.engine = engine
+        self.last = Stats()
+        self.total = Stats()
+        self._phase = None
+        self._stop = None
+
+
+    def install(self):
+        """
+        Override methods of decompression engine and decompression model
+        with counting and timing wrappers.
+        """
+        engine = self.engine
+        model = engine.model
+        for name in MODEL_METHODS:
+            f = getattr(model, name)
+            if name in LOAD_METHODS:
+                f = self._loading(name, f)
+            else:
+                f = self._counted(name, f)
+            setattr(model, name, f)
+
+        engine._can_ascend = self._can_ascend(engine._can_ascend)
+        engine._deco_stop = self._deco_stop(engine._deco_stop)
+
+        engine._dive_descent = self._timed_gen('descent', engine._dive_descent)
+        engine._dive_bottom = self._timed('bottom', engine._dive_bottom)
+        engine._ndl_ascent = self._timed('free_ascent', engine._ndl_ascent)
+        engine._free_staged_ascent = self._timed_gen(
+            'free_ascent', engine._free_staged_ascent
+        )
+        engine._deco_staged_ascent = self._timed_gen(
+            'deco_ascent', engine._deco_staged_ascent
+        )
+        engine.calculate = self._calculate(engine.calculate)
+
+
+    def _counted(self, name, f):
+        """
+        Create wrapper counting calls of a function.
+
+        :param name: Counter name.
+        :param f: Function to wrap.
+        """
+        @wraps(f)
+        def wrapper(*args, **kw):
+            self.last.counters[name] += 1
+            return f(*args, **kw)
+        return wrapper
+
+
+    def _loading(self, name, f):
+        """
+        Create wrapper counting calls of tissues gas loading method and
+        number of tissues gas loading calculations.
+
+        :param name: Counter name.
+        :param f: Tissues gas loading method of decompression model.
+        """
+        series = name == 'load_series'
+        @wraps(f)
+        def wrapper(*args, **kw):
+            counters = self.last.counters
+            counters[name] += 1
+            counters['loads'] += (kw['n'] if 'n' in kw else args[2]) \
+                if series else 1
+            return f(*args, **kw)
+        return wrapper
+
+
+    def _can_ascend(self, f):
+        """
+        Create wrapper counting checks if ascent is possible.
+
+        Within a decompression stop, the first check is for one minute
+        decompression stop, then linear search is performed until ascent
+        is possible, which is followed by binary search.
+
+        :param f: Ascent check method of decompression engine.
+        """
+        @wraps(f)
+        def wrapper(*args, **kw):
+            result = f(*args, **kw)
+            self.last.counters['can_ascend'] += 1
+            stop = self._stop
+            if stop is not None:
+                stop['probes'] += 1
+                if stop['probes'] == 1:
+                    pass
+                elif stop['search'] == 'linear':
+                    stop['linear'] += 1
+                    if result:
+                        stop['search'] = 'bisect'
+                else:
+                    stop['bisect'] += 1
+            return result
+        return wrapper
+
+
+    def _deco_stop(self, f):
+        """
+        Create wrapper collecting decompression stop search statistics.
+
+        :param f: Decompression stop method of decompression engine.
+        """
+        @wraps(f)
+        def wrapper(step, *args, **kw):
+            counters = self.last.counters
+            loads = counters['loads']
+            self._stop = Counter(search='linear')
+            try:
+                end = f(step, *args, **kw)
+            finally:
+                stop, self._stop = self._stop, None
+
+            engine = self.engine
+            counters['deco_stops'] += 1
+            counters['linear'] += stop['linear']
+            counters['bisect'] += stop['bisect']
+            self.last.stops.append(StopStats(
+                engine._to_depth(step.abs_p), end.time - step.time,
+                counters['loads'] - loads, stop['probes'],
+                stop['linear'], stop['bisect'],
+            ))
+            return end
+        return wrapper
+
+
+    def _timed(self, phase, f):
+        """
+        Create wrapper measuring time of a dive phase function.
+
+        The time is not measured if the function is called within other
+        dive phase.
+
+        :param phase: Dive phase name.
+        :param f: Function to wrap.
+        """
+        @wraps(f)
+        def wrapper(*args, **kw):
+            if self._phase is not None:
+                return f(*args, **kw)
+
+            self._phase = phase
+            t = time.perf_counter()
+            try:
+                return f(*args, **kw)
+            finally:
+                self.last.timers[phase] += time.perf_counter() - t
+                self._phase = None
+        return wrapper
+
+
+    def _timed_gen(self, phase, f):
+        """
+        Create wrapper measuring time of a dive phase generator.
+
+        Only the time of generator execution is measured, the time of
+        processing of dive steps by the consumer of the generator is not.
+
+        :param phase: Dive phase name.
+        :param f: Generator function to wrap.
+        """
+        @wraps(f)
+        def wrapper(*args, **kw):
+            it = f(*args, **kw)
+            while True:
+                self._phase = phase
+                t = time.perf_counter()
+                try:
+                    step = next(it)
+                except StopIteration:
+                    return
+                finally:
+                    self.last.timers[phase] += time.perf_counter() - t
+                    self._phase = None
+                yield step
+        return wrapper
+
+
+    def _calculate(self, f):
+        """
+        Create wrapper collecting statistics of a dive profile calculation.
+
+        :param f: Dive profile calculation method.
+        """
+        @wraps(f)
+        def wrapper(*args, **kw):
+            stats = self.last = Stats()
+            stats.counters['plans'] += 1
+            t = time.perf_counter()
+            try:
+                yield from f(*args, **kw)
+            finally:
+                stats.timers['total'] += time.perf_counter() - t
+                self.total.merge(stats)
+        return wrapper
+
+
+
+def instrument(engine):
+    """
+    Instrument decompression engine.
+
+    The instrumentation object is returned, which provides statistics of
+    the last and of all dive profile calculations.
+
+    :param engine: DecoTengu decompression engine.
+    """
+    instr = Instrument(engine)
+    instr.install()
+    return instr
+
+
+# vim: sw=4:et:ai
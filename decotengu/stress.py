@@ -0,0 +1,333 @@
+#
+# DecoTengu - dive decompression library.
+#
+# Copyright (C) 2013-2018 by Artur Wroblewski <wrobell@riseup.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Randomized stress testing of decompression engine.
+
+Random dive plans are generated from seeds - dive depth between 10m and
+350m, bottom time up to 24 hours, surface pressure, gradient factors and
+gas mix list. Each dive plan is calculated with decompression model
+validator (see :py:class:`decotengu.model.DecoModelValidator`), the
+decompression table invariants are checked and the decompression table is
+cross-checked with the decompression tables calculated with alternative
+implementations, which should give the same results (see `CROSS_CHECK`).
+
+    >>> plan = random_plan(2)
+    >>> plan.depth, plan.time
+    (33.1, 5)
+    >>> check_plan(plan) is None
+    True
+
+Failing dive plan can be shrunk to a minimal dive plan, which still fails
+the check, see :py:func:`decotengu.stress.shrink` function.
+
+The stress tests are run with ``dt-stress`` script.
+"""
+
+from collections import namedtuple
+from functools import partial
+import math
+import multiprocessing
+import random
+import re
+
+import decotengu
+from . import const
+from .batch import use_alt
+from .error import EngineError
+
+Plan = namedtuple(
+    'Plan', 'depth time surface_pressure gf_low gf_high gas_list'
+)
+Plan.__doc__ = """
+Random dive plan.
+
+:var depth: Maximum dive depth [m].
+:var time: Dive bottom time [min].
+:var surface_pressure: Surface pressure [bar].
+:var gf_low: Gradient factor low parameter.
+:var gf_high: Gradient factor high parameter.
+:var gas_list: Gas mix list, tuple of gas mix switch depth, O2 and helium
+    percentage.
+"""
+
+# alternative implementations, which should calculate the same
+# decompression table as the decompression engine; the binary search of
+# first decompression stop is not included as it does not find
+# the shallowest first decompression stop for many dive plans
+CROSS_CHECK = 'scan',
+
+# decompression gas mixes (switch depth, O2, helium), which can be added
+# to random dive plan
+DECO_GAS_LIST = (21, 50, 0), (9, 80, 0), (6, 100, 0)
+
+# maximum partial pressure of O2 of bottom gas mix [bar]
+MAX_PPO2 = 1.4
+
+# descent rate [m/min] and maximum bottom time [min]
+DESCENT_RATE = 20.0
+MAX_TIME = 24 * 60
+
+
+def random_plan(seed):
+    """
+    Generate random dive plan.
+
+    :param seed: Seed of random number generator.
+    """
+    rnd = random.Random(seed)
+    depth = rnd.randint(100, 3500) / 10
+
+    # bottom time with log-uniform distribution
+    t_min = math.ceil(depth / DESCENT_RATE) + 1
+    time = rnd.uniform(math.log(t_min), math.log(MAX_TIME))
+    time = min(MAX_TIME, max(t_min, round(math.exp(time))))
+
+    surface_pressure = rnd.randint(84500, 101325) / 10 ** 5
+    gf_low = rnd.randint(5, 100)
+    gf_high = rnd.randint(max(gf_low, 50), 100)
+
+    abs_p = depth / 10 + 1
+    o2 = max(5, min(rnd.randint(21, 40), int(MAX_PPO2 / abs_p * 100)))
+    he = rnd.randint(0, 100 - o2) if depth > 40 else 0
+    gas_list = [(0, o2, he)]
+    gas_list.extend(
+        m for m in DECO_GAS_LIST if m[0] < depth and rnd.random() < 0.5
+    )
+
+    return Plan(
+        depth, time, surface_pressure, gf_low / 100, gf_high / 100,
+        tuple(gas_list)
+    )
+
+
+def create_engine(plan, alt=()):
+    """
+    Create decompression engine with decompression model validator for
+    dive plan.
+
+    :param plan: Dive plan.
+    :param alt: Collection of alternative implementation names.
+    """
+    engine = decotengu.create(validate=True)
+    engine.surface_pressure = plan.surface_pressure
+    engine.descent_rate = DESCENT_RATE
+    engine.model.gf_low = plan.gf_low
+    engine.model.gf_high = plan.gf_high
+    for depth, o2, he in plan.gas_list:
+        engine.add_gas(depth, o2, he)
+    use_alt(engine, alt)
+    return engine
+
+
+def is_valid(plan):
+    """
+    Check if dive plan can be calculated by decompression engine.
+
+    :param plan: Dive plan.
+    """
+    return 10 <= plan.depth \
+        and plan.time > plan.depth / DESCENT_RATE \
+        and 0 < plan.gf_low <= plan.gf_high <= 1 \
+        and all(m[0] < plan.depth for m in plan.gas_list)
+
+
+def check_table(engine, plan, steps):
+    """
+    Check invariants of dive profile and decompression table.
+
+    Error message is returned if any of the invariants is violated.
+
+    :param engine: Decompression engine used to calculate dive profile.
+    :param plan: Dive plan.
+    :param steps: Dive steps of dive profile.
+    """
+    if abs(steps[-1].abs_p - engine.surface_pressure) > const.EPSILON:
+        return 'dive profile does not end at surface: {}'.format(steps[-1])
+    if any(s2.time < s1.time for s1, s2 in zip(steps, steps[1:])):
+        return 'dive steps not sorted by time'
+
+    table = engine.deco_table
+    if any(s.depth % 3 != 0 or s.depth <= 0 for s in table):
+        return 'invalid decompression stop depth: {}'.format(table)
+    if any(s.time % 1 != 0 or s.time <= 0 for s in table):
+        return 'invalid decompression stop time: {}'.format(table)
+    if any(s1.depth <= s2.depth for s1, s2 in zip(table, table[1:])):
+        return 'decompression stops not sorted by depth: {}'.format(table)
+    return None
+
+
+def check_plan(plan, alt=CROSS_CHECK):
+    """
+    Calculate dive plan and check the results.
+
+    Error message is returned if the check fails, null otherwise.
+
+    :param plan: Dive plan.
+    :param alt: Collection of alternative implementation names to
+        cross-check decompression table with.
+    """
+    engine = create_engine(plan)
+    try:
+        steps = list(engine.calculate(plan.depth, plan.time))
+    except EngineError as ex:
+        return 'reference: {}'.format(ex)
+
+    error = check_table(engine, plan, steps)
+    if error:
+        return 'reference: {}'.format(error)
+
+    expected = list(engine.deco_table)
+    for name in alt:
+        engine = create_engine(plan, (name,))
+        try:
+            list(engine.calculate(plan.depth, plan.time))
+        except EngineError as ex:
+            return '{}: {}'.format(name, ex)
+        if list(engine.deco_table) != expected:
+            return '{}: decompression table differs: {} vs. {}'.format(
+                name, engine.deco_table, expected
+            )
+    return None
+
+
+def _candidates(plan):
+    """
+    Generate dive plans simpler than a dive plan.
+
+    :param plan: Dive plan.
+    """
+    for i in range(1, len(plan.gas_list)):
+        yield plan._replace(gas_list=plan.gas_list[:i] + plan.gas_list[i + 1:])
+    yield plan._replace(surface_pressure=const.SURFACE_PRESSURE)
+    yield plan._replace(gf_low=0.3, gf_high=0.85)
+    yield plan._replace(gas_list=((0, 21, 0),) + plan.gas_list[1:])
+    yield plan._replace(depth=math.floor(plan.depth))
+    yield plan._replace(depth=math.floor(plan.depth / 2))
+    yield plan._replace(depth=plan.depth - 3)
+    yield plan._replace(depth=plan.depth - 1)
+    yield plan._replace(time=plan.time // 2)
+    yield plan._replace(time=plan.time - 1)
+
+
+def error_kind(error):
+    """
+    Find source and kind of failure of dive plan check error message.
+
+    Tuple of source, i.e. `reference` or alternative implementation name,
+    and kind of failure is returned. The kind of failure is the leading
+    text of the error message without the values specific to a dive plan
+
+        >>> error_kind('reference: Pressure ceiling validation error at'
+        ...     ' Step(...) (limit=2.1)')
+        ('reference', 'Pressure ceiling validation error')
+        >>> error_kind('scan: decompression table differs: [...] vs. [...]')
+        ('scan', 'decompression table differs')
+
+    :param error: Dive plan check error message.
+    """
+    source, _, message = error.partition(': ')
+    kind = re.split(r':| at |\(|\. ', message, 1)[0]
+    return source, kind.strip()
+
+
+def shrink(plan, alt=CROSS_CHECK, max_checks=1000, error=None):
+    """
+    Shrink failing dive plan to a minimal dive plan, which fails the check.
+
+    Simpler dive plans are tried - without decompression gas mixes, at
+    standard surface pressure, with default gradient factors, on air,
+    shallower and shorter. A simpler dive plan is accepted if it fails the
+    check with the same source and kind of failure as the failing dive
+    plan (see :py:func:`decotengu.stress.error_kind`). The search stops
+    when no simpler dive plan fails the check in the same way.
+
+    The dive plan is returned unchanged if it does not fail the check.
+
+    :param plan: Failing dive plan.
+    :param alt: Collection of alternative implementation names to
+        cross-check decompression table with.
+    :param max_checks: Maximum number of dive plan checks.
+    :param error: Error message of the failing dive plan check; the dive
+        plan is checked if null.
+    """
+    checks = 0
+    if error is None:
+        error = check_plan(plan, alt)
+        checks += 1
+    if error is None:
+        return plan
+
+    kind = error_kind(error)
+    changed = True
+    while changed and checks < max_checks:
+        changed = False
+        for candidate in _candidates(plan):
+            if candidate == plan or not is_valid(candidate):
+                continue
+            checks += 1
+            error = check_plan(candidate, alt)
+            if error is not None and error_kind(error) == kind:
+                plan = candidate
+                changed = True
+                break
+            if checks >= max_checks:
+                break
+    return plan
+
+
+def check_seed(alt, seed):
+    """
+    Generate and check random dive plan.
+
+    Tuple of seed and error message (null if check is ok) is returned.
+
+    :param alt: Collection of alternative implementation names to
+        cross-check decompression table with.
+    :param seed: Seed of random dive plan.
+    """
+    return seed, check_plan(random_plan(seed), alt)
+
+
+def run_stress(seed, n, alt=CROSS_CHECK, jobs=1, chunk_size=64):
+    """
+    Check random dive plans for range of seeds.
+
+    Iterator of tuples of seed and error message (null if check is ok) is
+    returned. If number of jobs is greater than one, then the dive plans
+    are checked by pool of worker processes and the results are not
+    ordered.
+
+    :param seed: First seed.
+    :param n: Number of dive plans.
+    :param alt: Collection of alternative implementation names to
+        cross-check decompression table with.
+    :param jobs: Number of worker processes.
+    :param chunk_size: Number of seeds sent to a worker at once.
+    """
+    f = partial(check_seed, tuple(alt))
+    seeds = range(seed, seed + n)
+    if jobs > 1:
+        with multiprocessing.Pool(jobs) as pool:
+            yield from pool.imap_unordered(f, seeds, chunksize=chunk_size)
+    else:
+        yield from map(f, seeds)
+
+
+# vim: sw=4:et:ai
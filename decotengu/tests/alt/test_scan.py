@@ -0,0 +1,122 @@
+#
+# DecoTengu - dive decompression library.
+#
+# Copyright (C) 2013-2018 by Artur Wroblewski <wrobell@riseup.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Tests for DecoTengu first decompression stop candidate scan algorithm.
+"""
+
+from decotengu.engine import Phase
+from decotengu.alt.scan import ScanFindFirstStop
+
+from ..tools import _step, _engine, _data, AIR
+
+import unittest
+from unittest import mock
+
+
+class ScanFindFirstStopTestCase(unittest.TestCase):
+    """
+    Tests for DecoTengu first decompression stop candidate scan algorithm.
+    """
+    def setUp(self):
+        """
+        Create decompression engine and set unit test friendly pressure
+        parameters.
+        """
+        self.engine = _engine(air=True)
+        self.engine._find_first_stop = ScanFindFirstStop(self.engine)
+
+        model = self.engine.model
+        model.load_series = mock.MagicMock(
+            side_effect=lambda abs_p, time, n, *args, **kw: \
+                tuple(_data(0.3, k) for k in range(n))
+        )
+
+
+    def test_first_stop_finder(self):
+        """
+        Test candidate scan first deco stop finder
+
+        Call Engine._find_first_stop method and check if appropriate
+        ascent time is calculated.
+        """
+        model = self.engine.model
+        start = _step(Phase.ASCENT, 4.1, 20)
+        # 31m -> 12m, so ascent for 19m or 114s; ceiling at 12m at start
+        # and at 12m after ascent
+        model.ceiling_limit = mock.MagicMock(return_value=2.1)
+        model.ceiling_limits = mock.MagicMock(return_value=[2.15] * 11)
+
+        step = self.engine._find_first_stop(start, 1.0, AIR)
+        self.assertAlmostEqual(21.9, step.time)
+        self.assertAlmostEqual(2.2, step.abs_p)
+        self.assertEqual(Phase.ASCENT, step.phase)
+
+        args = model.load_series.call_args[0]
+        self.assertEquals(4.1, args[0])
+        self.assertAlmostEqual(0.3, args[1])
+        self.assertEquals(11, args[2]) # 30m, 27m, ..., 0m
+        self.assertAlmostEqual(0.1, model.load_series.call_args[1]['offset'])
+
+
+    def test_first_stop_finder_repeat(self):
+        """
+        Test candidate scan first deco stop finder repeating ascent to ceiling
+        """
+        model = self.engine.model
+        start = _step(Phase.ASCENT, 4.1, 20)
+        # ceiling at 12m at start, then at 9m after ascent to 12m
+        model.ceiling_limit = mock.MagicMock(return_value=2.1)
+        limits = [2.15] * 11
+        limits[6] = 1.8 # 12m
+        model.ceiling_limits = mock.MagicMock(return_value=limits)
+
+        step = self.engine._find_first_stop(start, 1.0, AIR)
+        self.assertAlmostEqual(22.2, step.time)
+        self.assertAlmostEqual(1.9, step.abs_p)
+
+
+    def test_first_stop_finder_at_depth(self):
+        """
+        Test candidate scan first deco stop finder when starting depth is deco stop
+        """
+        model = self.engine.model
+        start = _step(Phase.ASCENT, 2.2, 20)
+        model.ceiling_limit = mock.MagicMock(return_value=2.0)
+        model.ceiling_limits = mock.MagicMock(return_value=[2.0] * 4)
+
+        step = self.engine._find_first_stop(start, 1.0, AIR)
+        self.assertEqual(step, start)
+
+
+    def test_first_stop_finder_no_deco(self):
+        """
+        Test candidate scan first deco stop finder when no deco required
+        """
+        model = self.engine.model
+        start = _step(Phase.ASCENT, 4.1, 20)
+        model.ceiling_limit = mock.MagicMock(return_value=0.8)
+        model.ceiling_limits = mock.MagicMock(return_value=[0.8] * 11)
+
+        step = self.engine._find_first_stop(start, 1.0, AIR)
+        self.assertAlmostEqual(23.1, step.time)
+        self.assertAlmostEqual(1.0, step.abs_p)
+
+
+# vim: sw=4:et:ai
@@ -21,9 +21,11 @@
 Tabular calculator tests.
 """
 
-from decotengu.alt.tab import TabExp, tab_engine
+import math
 
-from ..tools import _engine
+from decotengu.alt.tab import TabExp, TimeQuantizer, tab_engine
+
+from ..tools import _engine, TX1845
 
 import unittest
 
@@ -48,9 +50,11 @@ class TabCalculatorTestCase(unittest.TestCase):
         # both n2 and he values of time constant k are initialized
         self.assertEqual([1, 2, 3, 4], sorted(kt_exp.keys()))
 
-        # check 1 minute and 6s time intervals
-        self.assertTrue(all(60 in v for v in kt_exp.values()))
-        self.assertTrue(all(6 in v for v in kt_exp.values()))
+        # check powers-of-two multiples of 6s time quantum
+        self.assertTrue(all(len(v) == 11 for v in kt_exp.values()))
+        self.assertAlmostEqual(math.exp(-0.1), kt_exp[1][0])
+        self.assertAlmostEqual(math.exp(-0.2), kt_exp[1][1])
+        self.assertAlmostEqual(math.exp(-102.4), kt_exp[1][10])
 
 
     def test_1min(self):
@@ -77,6 +81,110 @@ class TabCalculatorTestCase(unittest.TestCase):
         self.assertAlmostEqual(0.30119, v, 4)
 
 
+    def test_zero(self):
+        """
+        Test tabular calculation for zero time
+        """
+        v = self.tab_exp(0, 1)
+        self.assertEqual(1.0, v)
+
+
+    def test_long_time(self):
+        """
+        Test tabular calculation for time longer than the table
+        """
+        tab_exp = TabExp([0.01], [], size=3)
+        self.assertEqual((0, 3, 3, 3), tab_exp._split(25))
+        self.assertEqual((0, 1, 2), tab_exp._split(7))
+        self.assertAlmostEqual(math.exp(-0.025), tab_exp(2.5, 0.01), 12)
+
+
+    def test_quantum(self):
+        """
+        Test tabular calculation with custom time quantum
+        """
+        tab_exp = TabExp([1], [], quantum=1 / 60)
+        self.assertAlmostEqual(math.exp(-1.05), tab_exp(1.05, 1), 12)
+
+
+    def test_max_error(self):
+        """
+        Test tabular calculator maximum error
+        """
+        self.assertTrue(self.tab_exp.max_error(200) < 1e-14)
+
+
+    def test_memory(self):
+        """
+        Test tabular calculator memory footprint
+        """
+        memory = self.tab_exp.memory
+        self.assertTrue(memory > 4 * 11 * 8)
+
+        # split tables have 2 * 2^5 items for default size
+        self.assertEqual(32, len(self.tab_exp._low))
+        self.assertEqual(32, len(self.tab_exp._high))
+
+        # memory footprint is bounded
+        self.tab_exp.max_error(24 * 60)
+        self.assertEqual(memory, self.tab_exp.memory)
+        self.assertTrue(memory < 16 * 1024, memory)
+
+
+
+class TimeQuantizerTestCase(unittest.TestCase):
+    """
+    Time quantizer tests.
+    """
+    def setUp(self):
+        """
+        Create time quantizer.
+        """
+        self.quantizer = TimeQuantizer(_engine().model, 0.1)
+
+
+    def test_quantize(self):
+        """
+        Test time quantization
+        """
+        time, rate = self.quantizer.quantize(1 / 6, -1.8)
+        self.assertAlmostEqual(0.2, time)
+        self.assertAlmostEqual(-1.5, rate)
+
+        # pressure change is preserved
+        self.assertAlmostEqual(-1.8 / 6, time * rate)
+
+
+    def test_quantize_short(self):
+        """
+        Test time quantization of time shorter than half of time quantum
+        """
+        time, rate = self.quantizer.quantize(0.01, -1.8)
+        self.assertAlmostEqual(0.1, time)
+        self.assertAlmostEqual(-0.18, rate)
+
+
+    def test_quantize_zero(self):
+        """
+        Test time quantization of zero time
+        """
+        self.assertEqual((0, -1.8), self.quantizer.quantize(0, -1.8))
+
+
+    def test_load_series(self):
+        """
+        Test quantized tissues gas loading for series of times
+        """
+        quantizer = self.quantizer
+        data = quantizer.model.init(1.013)
+        result = quantizer.load_series(4, 1 / 6, 3, TX1845, -1.8, data)
+
+        expected = tuple(
+            quantizer.load(4, t, TX1845, -1.8, data) for t in (1/6, 2/6, 3/6)
+        )
+        self.assertEqual(expected, result)
+
+
 
 class TabOverrideTestCase(unittest.TestCase):
     """
@@ -97,4 +205,20 @@ class TabOverrideTestCase(unittest.TestCase):
         self.assertTrue(isinstance(engine.model._exp, TabExp))
 
 
+    def test_tab_override_quantize(self):
+        """
+        Test tabular calculator override with time quantization
+        """
+        engine = _engine()
+        engine.descent_rate = 30
+        engine.ascent_rate = 15
+
+        tab_engine(engine, quantum=0.05, quantize=True)
+
+        self.assertEqual(30, engine.descent_rate)
+        self.assertEqual(15, engine.ascent_rate)
+        self.assertEqual(0.05, engine.model._exp.quantum)
+        self.assertTrue(isinstance(engine.model.load.__self__, TimeQuantizer))
+
+
 # vim: sw=4:et:ai
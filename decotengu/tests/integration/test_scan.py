@@ -0,0 +1,83 @@
+#
+# DecoTengu - dive decompression library.
+#
+# Copyright (C) 2013-2018 by Artur Wroblewski <wrobell@riseup.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+First decompression stop candidate scan integration tests.
+"""
+
+from pprint import pformat
+
+from decotengu import create
+from decotengu.alt.scan import ScanFindFirstStop
+
+from . import test_engine as te
+
+
+class EngineTest(te.EngineTest):
+    """
+    Abstract class for all DecoTengu engine test cases.
+    """
+    def _engine(self, *args, **kw):
+        engine = create(*args, **kw)
+        engine._find_first_stop = ScanFindFirstStop(engine)
+        return engine
+
+
+
+class ScanTestCase(EngineTest):
+    """
+    First decompression stop candidate scan integration tests.
+    """
+    def test_same_deco_stops(self):
+        """
+        Test candidate scan finds the same deco stops as default algorithm
+        """
+        dives = (
+            ((0, 21, 0),), 17, 90,
+        ), (
+            ((0, 27, 0), (22, 50, 0)), 45, 25,
+        ), (
+            ((0, 18, 45), (22, 50, 0), (6, 100, 0)), 68, 20,
+        ), (
+            ((0, 13, 50), (33, 36, 0), (21, 50, 0), (9, 80, 0)), 90, 20,
+        )
+        for mixes, depth, time in dives:
+            tables = []
+            for engine in (create(), self._engine()):
+                engine.model.gf_low = 0.2
+                engine.model.gf_high = 0.75
+                for mix in mixes:
+                    engine.add_gas(*mix)
+                list(engine.calculate(depth, time, descent=False))
+                tables.append(engine.deco_table)
+
+            self.assertEquals(tables[0], tables[1], pformat(tables))
+
+
+
+# copy main test cases for DecoTengu engine
+class NDLTestCase(EngineTest, te.NDLTestCase):
+    pass
+
+
+class ProfileTestCase(EngineTest, te.ProfileTestCase):
+    pass
+
+
+# vim: sw=4:et:ai
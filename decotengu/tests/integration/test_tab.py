@@ -22,6 +22,8 @@ Tabular tissue calculator integration tests.
 """
 
 from pprint import pformat
+import math
+import random
 
 from decotengu import create
 from decotengu.alt.tab import tab_engine
@@ -142,6 +144,84 @@ class EngineTestCase(EngineTest):
         self.assertEquals(13, t) # or 13 for descent_rate=10
 
 
+    def test_quantized_rates(self):
+        """
+        Test deco engine with quantized time and various ascent rates
+
+        The decompression stops of the trimix dive are the same as
+        calculated without tabular calculator.
+        """
+        rates = (9, 18), (20, 15), (7, 3)
+        for descent_rate, ascent_rate in rates:
+            engine = create()
+            tab_engine(engine, quantize=True)
+            engines = create(), engine
+            for engine in engines:
+                engine.descent_rate = descent_rate
+                engine.ascent_rate = ascent_rate
+                engine.model.gf_low = 0.2
+                engine.model.gf_high = 0.75
+                engine.add_gas(0, 13, 50)
+                engine.add_gas(33, 36)
+                engine.add_gas(21, 50)
+                engine.add_gas(9, 80)
+                data = list(engine.calculate(90, 20))
+
+            dt1, dt2 = (e.deco_table for e in engines)
+            msg = 'rates={}/{}\n{}'.format(
+                descent_rate, ascent_rate, pformat(dt2)
+            )
+            self.assertEquals(list(dt1), list(dt2), msg)
+
+
+    def test_quantized_rates_deviation(self):
+        """
+        Test deviation of deco stops calculated with quantized time
+
+        For random dive plans with various descent and ascent rates, the
+        decompression stops differ by up to 2 minutes, total decompression
+        time by up to 5 minutes and first decompression stop by up to 3m.
+        """
+        rnd = random.Random(7)
+        n = 0
+        for i in range(40):
+            depth = rnd.randint(22, 90)
+            descent_rate = rnd.choice((5, 9, 12, 15, 18, 20, 25))
+            time = rnd.randint(math.ceil(depth / descent_rate) + 1, 60)
+            ascent_rate = rnd.choice((3, 5, 7, 9, 12, 15, 18))
+            gf_low = rnd.randint(20, 50) / 100
+            gf_high = rnd.randint(70, 95) / 100
+
+            engine = create()
+            tab_engine(engine, quantize=True)
+            engines = create(), engine
+            for engine in engines:
+                engine.descent_rate = descent_rate
+                engine.ascent_rate = ascent_rate
+                engine.model.gf_low = gf_low
+                engine.model.gf_high = gf_high
+                engine.add_gas(0, 21 if depth <= 50 else 18, 0 if depth <= 50 else 35)
+                engine.add_gas(21, 50)
+                data = list(engine.calculate(depth, time))
+
+            dt1, dt2 = (e.deco_table for e in engines)
+            msg = 'plan={}m/{}min, rates={}/{}\n{}\n{}'.format(
+                depth, time, descent_rate, ascent_rate, pformat(dt1),
+                pformat(dt2)
+            )
+            s1 = {s.depth: s.time for s in dt1}
+            s2 = {s.depth: s.time for s in dt2}
+            for d in set(s1) | set(s2):
+                self.assertTrue(abs(s1.get(d, 0) - s2.get(d, 0)) <= 2, msg)
+            self.assertTrue(abs(dt1.total - dt2.total) <= 5, msg)
+            if dt1 and dt2:
+                self.assertTrue(abs(dt1[0].depth - dt2[0].depth) <= 3, msg)
+            n += dt1 != dt2
+
+        # the decompression tables differ for some of the dive plans
+        self.assertTrue(n > 0)
+
+
 
 # copy main test cases for DecoTengu engine
 class NDLTestCase(EngineTest, te.NDLTestCase):
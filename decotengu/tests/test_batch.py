@@ -0,0 +1,187 @@
+#
+# DecoTengu - dive decompression library.
+#
+# Copyright (C) 2013-2018 by Artur Wroblewski <wrobell@riseup.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Batch calculation of dive plans tests.
+"""
+
+import decotengu
+from decotengu.batch import PLAN_DEFAULTS, parse_gas_list, parse_alt, \
+    parse_plan, engine_key, create_engine, run_plan, run_batch
+
+import unittest
+
+
+class ParsePlanTestCase(unittest.TestCase):
+    """
+    Dive plan line parsing tests.
+    """
+    def test_gas_list(self):
+        """
+        Test parsing gas mix list
+        """
+        gas_list = parse_gas_list('+21,0@0 18,45@0 50,0@22')
+        self.assertEqual(
+            ((0, 21, 0, True), (0, 18, 45, False), (22, 50, 0, False)),
+            gas_list
+        )
+        self.assertEqual(gas_list, parse_gas_list(['+21,0@0', '18,45@0', '50,0@22']))
+
+
+    def test_alt(self):
+        """
+        Test parsing alternative implementation names
+        """
+        self.assertEqual(('bisect', 'tab'), parse_alt('tab,bisect'))
+        self.assertEqual(('tab',), parse_alt('tab'))
+        self.assertEqual(('bisect', 'tab'), parse_alt(['tab', 'bisect']))
+        self.assertEqual((), parse_alt(''))
+        self.assertRaises(ValueError, parse_alt, 'tab,poly')
+
+
+    def test_text(self):
+        """
+        Test parsing dive plan text line
+        """
+        plan = parse_plan('40 35', PLAN_DEFAULTS)
+        self.assertEqual(40, plan['depth'])
+        self.assertEqual(35, plan['time'])
+        self.assertEqual(30, plan['gf_low'])
+        self.assertEqual(((0, 21, 0, False),), plan['gas_list'])
+        self.assertIsInstance(plan['depth'], int)
+        self.assertIsInstance(plan['time'], int)
+
+
+    def test_text_float(self):
+        """
+        Test parsing dive plan text line with decimal depth and time
+        """
+        plan = parse_plan('40.5 35', PLAN_DEFAULTS)
+        self.assertEqual(40.5, plan['depth'])
+        self.assertEqual(35, plan['time'])
+        self.assertIsInstance(plan['time'], int)
+
+
+    def test_text_gf_gas(self):
+        """
+        Test parsing dive plan text line with gradient factors and gas mixes
+        """
+        plan = parse_plan('40 35 20/90 21,0@0 50,0@21', PLAN_DEFAULTS)
+        self.assertEqual(20, plan['gf_low'])
+        self.assertEqual(90, plan['gf_high'])
+        self.assertEqual(
+            ((0, 21, 0, False), (21, 50, 0, False)), plan['gas_list']
+        )
+
+
+    def test_json(self):
+        """
+        Test parsing dive plan JSON line
+        """
+        line = '{"depth": 40, "time": 35, "gf_high": 90, "id": 7,' \
+            ' "gas_list": ["21,0@0", "50,0@21"]}'
+        plan = parse_plan(line, PLAN_DEFAULTS)
+        self.assertEqual(40, plan['depth'])
+        self.assertEqual(90, plan['gf_high'])
+        self.assertEqual(30, plan['gf_low'])
+        self.assertEqual(7, plan['id'])
+        self.assertEqual(2, len(plan['gas_list']))
+
+
+    def test_json_alt(self):
+        """
+        Test parsing dive plan JSON line with alternative implementations
+        """
+        plan = parse_plan('{"depth": 40, "time": 35, "alt": "tab"}', PLAN_DEFAULTS)
+        self.assertEqual(('tab',), plan['alt'])
+
+        line = '{"depth": 40, "time": 35, "alt": ["scan", "tab"]}'
+        plan = parse_plan(line, PLAN_DEFAULTS)
+        self.assertEqual(('scan', 'tab'), plan['alt'])
+
+        line = '{"depth": 40, "time": 35, "alt": "t,a,b"}'
+        self.assertRaises(ValueError, parse_plan, line, PLAN_DEFAULTS)
+
+
+    def test_error(self):
+        """
+        Test parsing invalid dive plan line
+        """
+        self.assertRaises(ValueError, parse_plan, '40', PLAN_DEFAULTS)
+        self.assertRaises(ValueError, parse_plan, '{"depth": 40}', PLAN_DEFAULTS)
+
+
+
+class BatchTestCase(unittest.TestCase):
+    """
+    Batch calculation of dive plans tests.
+    """
+    def test_engine_reuse(self):
+        """
+        Test reuse of configured decompression engine
+        """
+        p1 = parse_plan('40 35', PLAN_DEFAULTS)
+        p2 = parse_plan('30 20', PLAN_DEFAULTS)
+        p3 = parse_plan('30 20 20/90', PLAN_DEFAULTS)
+        e1 = create_engine(engine_key(p1))
+        self.assertIs(e1, create_engine(engine_key(p2)))
+        self.assertIsNot(e1, create_engine(engine_key(p3)))
+        self.assertEqual(0.2, create_engine(engine_key(p3)).model.gf_low)
+
+
+    def test_run_plan(self):
+        """
+        Test calculation of dive plan
+        """
+        plan = parse_plan('{"depth": 40, "time": 35, "id": "a"}', PLAN_DEFAULTS)
+        result = run_plan(plan)
+
+        engine = decotengu.create()
+        engine.add_gas(0, 21)
+        list(engine.calculate(40, 35))
+
+        self.assertEqual('a', result['id'])
+        self.assertEqual(engine.deco_table.total, result['total'])
+        self.assertEqual(
+            [[s.depth, s.time] for s in engine.deco_table], result['stops']
+        )
+
+
+    def test_run_batch(self):
+        """
+        Test batch calculation of dive plans
+        """
+        lines = ['40 35', '', '# comment', '40', '30 20 20/90']
+        results = list(run_batch(lines, PLAN_DEFAULTS))
+        self.assertEqual([1, 4, 5], [r['line'] for r in results])
+        self.assertIn('error', results[1])
+        self.assertEqual(30, results[2]['depth'])
+
+
+    def test_run_batch_jobs(self):
+        """
+        Test batch calculation of dive plans with worker processes
+        """
+        lines = ['{} 20'.format(d) for d in range(20, 50)]
+        expected = list(run_batch(lines, PLAN_DEFAULTS))
+        results = list(run_batch(lines, PLAN_DEFAULTS, jobs=2, chunk_size=4))
+        self.assertEqual(expected, results)
+
+
+# vim: sw=4:et:ai
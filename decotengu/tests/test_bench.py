@@ -0,0 +1,110 @@
+#
+# DecoTengu - dive decompression library.
+#
+# Copyright (C) 2013-2018 by Artur Wroblewski <wrobell@riseup.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+DecoTengu benchmarks tests.
+"""
+
+from decotengu.bench import Result, run_benchmark, run_benchmarks, \
+    save_results, load_results, compare
+
+import io
+import unittest
+
+
+def _result(config, scenario, median, memory_peak):
+    return Result(
+        config, scenario, 1, [median], median, median, median, 0.0,
+        memory_peak, 10
+    )
+
+
+class BenchmarkTestCase(unittest.TestCase):
+    """
+    DecoTengu benchmarks tests.
+    """
+    def test_run_benchmark(self):
+        """
+        Test running benchmark
+        """
+        r = run_benchmark('standard', 'u260', number=2, repeat=3)
+        self.assertEqual('standard', r.config)
+        self.assertEqual('u260', r.scenario)
+        self.assertEqual(3, len(r.times))
+        self.assertEqual(min(r.times), r.min)
+        self.assertTrue(r.min <= r.median <= max(r.times))
+        self.assertTrue(r.memory_peak > 0)
+        self.assertTrue(r.memory_blocks > 0)
+
+
+    def test_run_benchmark_decimal(self):
+        """
+        Test running benchmark with decimal type
+        """
+        r = run_benchmark('tab-decimal', 'shallow', number=1, repeat=1)
+        self.assertEqual(0, r.stdev)
+
+
+    def test_run_benchmarks(self):
+        """
+        Test running benchmarks for configurations and scenarios
+        """
+        results = run_benchmarks(
+            ['standard', 'bisect'], ['shallow'], number=1, repeat=1,
+            warmup=0
+        )
+        keys = [(r.config, r.scenario) for r in results]
+        self.assertEqual([('standard', 'shallow'), ('bisect', 'shallow')], keys)
+
+
+    def test_save_load(self):
+        """
+        Test saving and loading benchmark results
+        """
+        results = [_result('standard', 'shallow', 0.001, 1000)]
+        f = io.StringIO()
+        save_results(f, results)
+        f.seek(0)
+        self.assertEqual(results, load_results(f))
+
+
+    def test_compare(self):
+        """
+        Test comparing benchmark results with baseline
+        """
+        baseline = [
+            _result('standard', 'shallow', 0.001, 1000),
+            _result('standard', 'u260', 0.002, 2000),
+        ]
+        results = [
+            _result('standard', 'shallow', 0.00105, 1200),
+            _result('standard', 'u260', 0.003, 2000),
+            _result('tab', 'u260', 0.003, 2000),
+        ]
+        comparison = list(compare(baseline, results, threshold=0.1))
+        self.assertEqual(4, len(comparison))
+
+        regressions = [(c.scenario, c.metric) for c in comparison if c.regression]
+        self.assertEqual(
+            [('shallow', 'memory_peak'), ('u260', 'median')], regressions
+        )
+        self.assertAlmostEqual(0.5, comparison[2].change)
+
+
+# vim: sw=4:et:ai
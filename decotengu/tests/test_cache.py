@@ -0,0 +1,171 @@
+#
+# DecoTengu - dive decompression library.
+#
+# Copyright (C) 2013-2018 by Artur Wroblewski <wrobell@riseup.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Dive plan prefix cache tests.
+"""
+
+from decotengu.cache import plan_cache
+from decotengu.model import ZH_L16C_GF
+import decotengu
+
+import unittest
+
+
+def _engine():
+    engine = decotengu.create(validate=False)
+    engine.add_gas(0, 21)
+    engine.add_gas(21, 50)
+    return engine
+
+
+class PlanCacheTestCase(unittest.TestCase):
+    """
+    Dive plan prefix cache tests.
+    """
+    def setUp(self):
+        self.engine = _engine()
+        self.cache = plan_cache(self.engine)
+
+
+    def _check(self, f=None):
+        """
+        Compare dive profile calculated with the cache to dive profile
+        calculated without the cache.
+        """
+        ref = _engine()
+        if f:
+            f(ref)
+            f(self.engine)
+
+        s1 = list(ref.calculate(45, 30))
+        s2 = list(self.engine.calculate(45, 30))
+        self.assertEqual(ref.deco_table, self.engine.deco_table)
+        self.assertEqual([s.data for s in s1], [s.data for s in s2])
+        self.assertEqual([s.time for s in s1], [s.time for s in s2])
+
+
+    def test_same_plan(self):
+        """
+        Test dive plan prefix cache reusing all segments of dive plan
+        """
+        self._check()
+        loads = self.cache.loads
+        misses = self.cache.misses
+        self._check()
+
+        self.assertEqual(loads, self.cache.loads)
+        self.assertEqual(misses, self.cache.misses)
+        self.assertEqual(loads, self.cache.saved_loads)
+        self.assertTrue(0 < self.cache.hit_rate < 1)
+
+
+    def test_last_stop_6m(self):
+        """
+        Test dive plan prefix cache with last decompression stop at 6m
+        """
+        self._check()
+        def f(engine):
+            engine.last_stop_6m = True
+        self._check(f)
+        self.assertTrue(self.cache.hits > 0)
+        self.assertTrue(self.cache.saved_loads > 0)
+
+
+    def test_gas_mix(self):
+        """
+        Test dive plan prefix cache with additional decompression gas mix
+        """
+        self._check()
+        self._check(lambda engine: engine.add_gas(6, 100))
+        self.assertTrue(self.cache.hits > 0)
+
+
+    def test_gf_high(self):
+        """
+        Test dive plan prefix cache with changed gradient factor
+        """
+        self._check()
+        def f(engine):
+            engine.model.gf_high = 0.9
+        self._check(f)
+
+
+    def test_gf_low(self):
+        """
+        Test dive plan prefix cache with changed gradient factor low
+        """
+        self._check()
+        hits = self.cache.hits
+        def f(engine):
+            engine.model.gf_low = 0.2
+        self._check(f)
+        self.assertEqual(hits, self.cache.hits)
+
+
+    def test_surface_pressure(self):
+        """
+        Test dive plan prefix cache with changed surface pressure
+        """
+        self._check()
+        hits = self.cache.hits
+        def f(engine):
+            engine.surface_pressure = 0.9
+        self._check(f)
+        self.assertEqual(hits, self.cache.hits)
+
+
+    def test_water_vapour_pressure(self):
+        """
+        Test dive plan prefix cache with changed water vapour pressure
+        """
+        self._check()
+        hits = self.cache.hits
+        def f(engine):
+            engine.model.water_vapour_pressure = 0.0493
+        self._check(f)
+        self.assertEqual(hits, self.cache.hits)
+
+
+    def test_model(self):
+        """
+        Test dive plan prefix cache with different decompression model
+        """
+        list(self.engine.calculate(45, 30))
+        hits = self.cache.hits
+
+        self.engine.model = ZH_L16C_GF()
+        list(self.engine.calculate(45, 30))
+        self.assertEqual(hits, self.cache.hits)
+
+
+    def test_lru(self):
+        """
+        Test dive plan prefix cache eviction of least recently used segments
+        """
+        engine = _engine()
+        cache = plan_cache(engine, size=10)
+        list(engine.calculate(45, 30))
+        self.assertEqual(10, len(cache))
+
+        cache.clear()
+        self.assertEqual(0, len(cache))
+
+
+# vim: sw=4:et:ai
@@ -21,10 +21,12 @@
 Conveyor tests.
 """
 
-from decotengu.engine import Phase
-from decotengu.conveyor import Conveyor
+from decotengu.engine import Phase, Step
+from decotengu.conveyor import Conveyor, AdaptiveConveyor
+from decotengu.error import ConfigError, EngineError
+import decotengu
 
-from .tools import _step, AIR, EAN50
+from .tools import _engine, _step, AIR, EAN50
 
 import unittest
 from unittest import mock
@@ -91,6 +93,211 @@ class ConveyorTestCase(unittest.TestCase):
         self.assertEquals(s2, v2)
 
 
+    def _check_steps(self, expected, steps):
+        """
+        Check dive steps against expected dive steps.
+        """
+        self.assertEqual(len(expected), len(steps))
+        for s1, s2 in zip(expected, steps):
+            self.assertEqual(s1.phase, s2.phase)
+            self.assertAlmostEqual(s1.abs_p, s2.abs_p)
+            self.assertAlmostEqual(s1.time, s2.time)
+            self.assertEqual(s1.gas, s2.gas)
+            self.assertEqual(s1.data.gf, s2.data.gf)
+            for t1, t2 in zip(s1.data.tissues, s2.data.tissues):
+                self.assertAlmostEqual(t1[0], t2[0])
+                self.assertAlmostEqual(t1[1], t2[1])
+
+
+    def test_expand_descent(self):
+        """
+        Test conveyor expansion of descent
+        """
+        engine = _engine()
+        data = engine.model.init(engine.surface_pressure)
+        prev = Step(Phase.DESCENT, 2.0, 1, AIR, data)
+        end = engine._step_next_descent(prev, 1.2, AIR)
+
+        conveyor = Conveyor(engine, 0.5)
+        steps = list(conveyor._expand(prev, end, 2))
+
+        s1 = engine._step_next_descent(prev, 0.5, AIR)
+        s2 = engine._step_next_descent(s1, 0.5, AIR)
+        self._check_steps([s1, s2], steps)
+
+
+    def test_expand_ascent(self):
+        """
+        Test conveyor expansion of ascent
+        """
+        engine = _engine()
+        data = engine.model.init(engine.surface_pressure)
+        prev = Step(Phase.DESCENT, 4.0, 20, AIR, data)
+        prev = engine._step_next(prev, 20, AIR)
+        end = engine._step_next_ascent(prev, 1.2, AIR, gf=0.4)
+
+        conveyor = Conveyor(engine, 0.5)
+        steps = list(conveyor._expand(prev, end, 2))
+
+        s1 = engine._step_next_ascent(prev, 0.5, AIR, gf=0.4)
+        s2 = engine._step_next_ascent(s1, 0.5, AIR, gf=0.4)
+        self._check_steps([s1, s2], steps)
+
+
+    def test_expand_deco_stop(self):
+        """
+        Test conveyor expansion of decompression stop
+        """
+        engine = _engine()
+        data = engine.model.init(engine.surface_pressure)
+        prev = Step(Phase.ASCENT, 1.6, 20, EAN50, data)
+        end = engine._step_next(prev, 3, EAN50, phase=Phase.DECO_STOP)
+
+        conveyor = Conveyor(engine, 1)
+        steps = list(conveyor._expand(prev, end, 2))
+
+        s1 = engine._step_next(prev, 1, EAN50, phase=Phase.DECO_STOP)
+        s2 = engine._step_next(s1, 1, EAN50, phase=Phase.DECO_STOP)
+        self._check_steps([s1, s2], steps)
+
+
+    def test_expand_chunks(self):
+        """
+        Test conveyor expansion of dive steps in chunks
+        """
+        engine = _engine()
+        data = engine.model.init(engine.surface_pressure)
+        prev = Step(Phase.DESCENT, 2.0, 1, AIR, data)
+        end = engine._step_next_descent(prev, 2.2, AIR)
+
+        conveyor = Conveyor(engine, 0.5)
+        expected = list(conveyor._expand(prev, end, 4))
+
+        conveyor.chunk_size = 3
+        steps = list(conveyor._expand(prev, end, 4))
+        self._check_steps(expected, steps)
+
+
+    def test_validate(self):
+        """
+        Test conveyor validation of dive steps expansion
+        """
+        engine = _engine()
+        data = engine.model.init(engine.surface_pressure)
+        prev = Step(Phase.CONST, 4.0, 20, AIR, data)
+        end = engine._step_next(prev, 2.5, AIR)
+
+        conveyor = Conveyor(engine, 1, validate=True)
+        conveyor._validate(prev, end, 2, 0.5)
+
+        # tissues gas loading of next dive step does not match
+        end = end._replace(data=data)
+        self.assertRaises(
+            EngineError, conveyor._validate, prev, end, 2, 0.5
+        )
+
+
+
+class AdaptiveConveyorTestCase(unittest.TestCase):
+    """
+    Adaptive conveyor tests.
+    """
+    def setUp(self):
+        self.engine = _engine(air=True)
+        self.full = list(Conveyor(self.engine, 0.1)(30, 20))
+
+
+    def _interpolation_error(self, steps):
+        """
+        Calculate maximum error of linear interpolation of tissues pressure
+        between dive steps for all dive steps calculated every time delta.
+        """
+        error = 0
+        k = 0
+        for s in self.full:
+            while steps[k].time < s.time - 1e-9:
+                k += 1
+            if abs(steps[k].time - s.time) < 1e-9:
+                continue
+            s1, s2 = steps[k - 1], steps[k]
+            w = (s.time - s1.time) / (s2.time - s1.time)
+            error = max(error, max(
+                abs(v - (v1 + w * (v2 - v1)))
+                for t, t1, t2 in zip(
+                    s.data.tissues, s1.data.tissues, s2.data.tissues
+                )
+                for v, v1, v2 in zip(t, t1, t2)
+            ))
+        return error
+
+
+    def test_tolerance(self):
+        """
+        Test adaptive conveyor dive steps within tolerance
+        """
+        conveyor = AdaptiveConveyor(self.engine, 0.1, tolerance=0.02)
+        steps = list(conveyor(30, 20))
+
+        self.assertEqual(len(steps), conveyor.samples)
+        self.assertEqual(len(self.full), len(steps) + conveyor.skipped)
+        self.assertTrue(conveyor.reduction > 10)
+        self.assertTrue(conveyor.error <= 0.02)
+        self.assertTrue(self._interpolation_error(steps) <= 0.02)
+
+
+    def test_create(self):
+        """
+        Test creating engine with adaptive conveyor
+        """
+        engine = decotengu.create(time_delta=0.1, tolerance=0.02)
+        self.assertIsInstance(engine.calculate.__wrapped__, AdaptiveConveyor)
+        self.assertRaises(ConfigError, decotengu.create, tolerance=0.02)
+
+
+    def test_engine_steps(self):
+        """
+        Test adaptive conveyor emitting dive steps of engine
+        """
+        conveyor = AdaptiveConveyor(self.engine, 0.1)
+        steps = list(conveyor(30, 20))
+        engine_steps = list(self.engine.calculate(30, 20))
+        times = set(round(s.time, 6) for s in steps)
+        self.assertTrue(all(round(s.time, 6) in times for s in engine_steps))
+
+
+    def test_max_gap(self):
+        """
+        Test adaptive conveyor maximum gap between dive steps
+        """
+        conveyor = AdaptiveConveyor(
+            self.engine, 0.1, tolerance=1, max_gap=2, margin=0
+        )
+        steps = list(conveyor(30, 20))
+        gaps = [s2.time - s1.time for s1, s2 in zip(steps, steps[1:])]
+        self.assertTrue(max(gaps) <= 2 + 1e-9)
+        self.assertTrue(len(steps) < len(self.full))
+
+
+    def test_margin(self):
+        """
+        Test adaptive conveyor emitting dive steps close to ceiling
+        """
+        conveyor = AdaptiveConveyor(self.engine, 0.1, tolerance=1, margin=0)
+        n = len(list(conveyor(30, 20)))
+
+        conveyor = AdaptiveConveyor(self.engine, 0.1, tolerance=1, margin=1)
+        steps = list(conveyor(30, 20))
+        self.assertTrue(len(steps) > n)
+        limits = self.engine.model.ceiling_limits(s.data for s in self.full)
+        near = [
+            round(s.time, 6) for s, limit in zip(self.full, limits)
+            if s.abs_p - limit < 1 and s.phase != Phase.ASCENT
+        ]
+        times = set(round(s.time, 6) for s in steps)
+        self.assertTrue(all(t in times for t in near))
+
+
+
 # FIXME: readd the tests below
 #    def test_dive_descent(self):
 #        """
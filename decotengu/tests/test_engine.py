@@ -320,6 +320,125 @@ class EngineTestCase(unittest.TestCase):
         self.assertEquals(5, step.abs_p, step)
 
 
+    def test_compile(self):
+        """
+        Test compiling dive plan
+        """
+        engine = self.engine
+        engine.add_gas(6, 100)
+        engine.add_gas(22, 50)
+        engine.add_gas(33, 36, travel=True)
+        plan = engine.compile(45, 25)
+
+        self.assertEqual(engine._to_pressure(45), plan.abs_p)
+        self.assertEqual((33, 0), tuple(m.depth for m in plan.descent_gas_list))
+        self.assertEqual((0, 22, 6), tuple(m.depth for m in plan.gas_list))
+        self.assertEqual(2, len(plan.descent_stages))
+        self.assertEqual(3, len(plan.free_stages))
+        self.assertEqual(3, len(plan.deco_stages))
+
+        k = engine._n_stops(engine._to_pressure(18))
+        gf = (engine.model.gf_high - engine.model.gf_low) / k
+        self.assertEqual(gf, plan.gf_steps[k])
+
+
+    def test_compile_immutable(self):
+        """
+        Test compiled dive plan can be hashed and pickled
+        """
+        import pickle
+        plan = self.engine.compile(45, 25)
+        self.assertEqual(hash(plan), hash(self.engine.compile(45, 25)))
+        self.assertEqual(plan, pickle.loads(pickle.dumps(plan)))
+
+
+    def test_compile_error(self):
+        """
+        Test compiling dive plan with invalid gas mix list
+        """
+        engine = Engine()
+        self.assertRaises(ConfigError, engine.compile, 25, 15)
+
+
+    def test_execute(self):
+        """
+        Test executing compiled dive plan
+        """
+        engine = self.engine
+        engine.add_gas(22, 50)
+        plan = engine.compile(45, 25)
+
+        s1 = list(engine.calculate(45, 25))
+        t1 = list(engine.deco_table)
+        for i in range(2):
+            s2 = list(engine.execute(plan))
+            self.assertEqual([s.data for s in s1], [s.data for s in s2])
+            self.assertEqual(t1, engine.deco_table)
+
+
+    def test_execute_config_error(self):
+        """
+        Test executing compiled dive plan with changed engine configuration
+        """
+        plan = self.engine.compile(45, 25)
+        self.engine.last_stop_6m = True
+        it = self.engine.execute(plan)
+        self.assertRaises(ConfigError, next, it)
+
+
+    def test_runtime(self):
+        """
+        Test deco engine dive runtime offset
+        """
+        engine = self.engine
+        s1 = list(engine.calculate(45, 25))
+        t1 = list(engine.deco_table)
+        s2 = list(engine.calculate(45, 25, runtime=10))
+
+        for a, b in zip(s1, s2):
+            self.assertAlmostEqual(a.time + 10, b.time)
+        self.assertEqual([s.data for s in s1], [s.data for s in s2])
+        self.assertEqual(t1, engine.deco_table)
+
+
+    def test_data(self):
+        """
+        Test deco engine starting dive at bottom with decompression model data
+        """
+        engine = self.engine
+        engine.add_gas(22, 50)
+        s1 = list(engine.calculate(45, 25))
+        t1 = list(engine.deco_table)
+
+        # restart the dive at the end of descent
+        k, start = next((k, s) for k, s in enumerate(s1) if s.abs_p == 5.5)
+        s2 = list(engine.calculate(
+            45, 25 - start.time, descent=False, data=start.data,
+            runtime=start.time
+        ))
+
+        self.assertEqual(start.data, s2[0].data)
+        self.assertEqual(start.time, s2[0].time)
+        self.assertEqual([s.data for s in s1[k:]], [s.data for s in s2])
+        self.assertEqual([s.time for s in s1[k:]], [s.time for s in s2])
+        self.assertEqual(t1, engine.deco_table)
+
+
+    def test_data_surface(self):
+        """
+        Test deco engine starting dive with decompression model data
+        """
+        engine = self.engine
+        list(engine.calculate(30, 20))
+        total = engine.deco_table.total
+
+        # tissues loaded by previous dive
+        data = engine.model.snapshot([1.2] * 16)
+        steps = list(engine.calculate(30, 20, data=data))
+        self.assertEqual(data, steps[0].data)
+        self.assertTrue(engine.deco_table.total > total)
+
+
 
 class FirstStopFinderTestCase(unittest.TestCase):
     """
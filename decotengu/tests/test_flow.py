@@ -21,8 +21,10 @@
 Test for DecoTengu data flow processing functions and coroutines.
 """
 
-from decotengu.flow import sender, coroutine
+from decotengu.flow import sender, chunked_sender, chunk_adapter, \
+    coroutine, ThreadedSink
 
+import threading
 import unittest
 
 class SenderTestCase(unittest.TestCase):
@@ -49,4 +51,177 @@ class SenderTestCase(unittest.TestCase):
         self.assertEquals([0, 1, 2], data)
 
 
+    def test_sender_close(self):
+        """
+        Test sender decorator closing coroutines
+        """
+        def f(n):
+            return range(n)
+
+        data = []
+        @coroutine
+        def printer():
+            try:
+                while True:
+                    v = yield
+            except GeneratorExit:
+                data.append('closed')
+
+        fd = sender(f, printer, printer)
+        result = fd(3)
+        next(result)
+        self.assertEquals([], data)
+        list(result)
+        self.assertEquals(['closed', 'closed'], data)
+
+
+
+
+class ChunkedSenderTestCase(unittest.TestCase):
+    """
+    Chunked sender decorator tests.
+    """
+    def setUp(self):
+        self.data = []
+
+
+    @coroutine
+    def printer(self):
+        try:
+            while True:
+                v = yield
+                self.data.append(v)
+        except GeneratorExit:
+            self.data.append('closed')
+
+
+    def test_chunked_sender(self):
+        """
+        Test chunked sender decorator
+        """
+        fd = chunked_sender(range, self.printer, chunk_size=3)
+        result = list(fd(8))
+        self.assertEqual(list(range(8)), result)
+        self.assertEqual(
+            [[0, 1, 2], [3, 4, 5], [6, 7], 'closed'], self.data
+        )
+
+
+    def test_chunked_sender_empty(self):
+        """
+        Test chunked sender decorator with no data
+        """
+        fd = chunked_sender(range, self.printer, chunk_size=3)
+        self.assertEqual([], list(fd(0)))
+        self.assertEqual(['closed'], self.data)
+
+
+    def test_chunk_adapter(self):
+        """
+        Test chunk adapter of coroutine processing items one by one
+        """
+        fd = chunked_sender(range, chunk_adapter(self.printer), chunk_size=3)
+        result = list(fd(5))
+        self.assertEqual(list(range(5)), result)
+        self.assertEqual([0, 1, 2, 3, 4, 'closed'], self.data)
+
+
+
+class ThreadedSinkTestCase(unittest.TestCase):
+    """
+    Threaded sink tests.
+    """
+    def setUp(self):
+        self.data = []
+        self.thread = None
+
+
+    @coroutine
+    def sink(self, error_at=None, event=None):
+        try:
+            while True:
+                v = yield
+                self.thread = threading.current_thread()
+                if event:
+                    event.wait()
+                if v == error_at:
+                    raise ValueError('sink error')
+                self.data.append(v)
+        except GeneratorExit:
+            self.data.append('closed')
+
+
+    def test_send(self):
+        """
+        Test threaded sink sending data to writer thread
+        """
+        fd = sender(range, ThreadedSink(self.sink, batch_size=3))
+        result = list(fd(10))
+        self.assertEqual(list(range(10)), result)
+        self.assertEqual(list(range(10)) + ['closed'], self.data)
+        self.assertIsNot(threading.current_thread(), self.thread)
+
+
+    def test_flush(self):
+        """
+        Test threaded sink flush
+        """
+        sink = ThreadedSink(self.sink, batch_size=100)
+        c = sink()
+        c.send(1)
+        c.send(2)
+        self.assertEqual([], self.data)
+
+        sink.flush()
+        self.assertEqual([1, 2], self.data)
+
+        c.close()
+        self.assertEqual([1, 2, 'closed'], self.data)
+
+
+    def test_backpressure(self):
+        """
+        Test threaded sink blocking producer when queue is full
+        """
+        event = threading.Event()
+        sink = ThreadedSink(
+            lambda: self.sink(event=event), batch_size=1, queue_size=2
+        )
+        c = sink()
+        producer = threading.Thread(
+            target=lambda: [c.send(i) for i in range(10)]
+        )
+        producer.start()
+        producer.join(0.2)
+        self.assertTrue(producer.is_alive())  # blocked by full queue
+
+        event.set()
+        producer.join()
+        c.close()
+        self.assertEqual(list(range(10)) + ['closed'], self.data)
+
+
+    def test_error(self):
+        """
+        Test threaded sink propagating exception to producer
+        """
+        fd = sender(
+            range, ThreadedSink(lambda: self.sink(error_at=5), batch_size=2)
+        )
+        self.assertRaises(ValueError, list, fd(100))
+        self.assertEqual([0, 1, 2, 3, 4], self.data)
+
+
+    def test_error_close(self):
+        """
+        Test threaded sink propagating exception to producer on close
+        """
+        sink = ThreadedSink(lambda: self.sink(error_at=1), batch_size=10)
+        c = sink()
+        c.send(0)
+        c.send(1)
+        self.assertRaises(ValueError, c.close)
+        self.assertEqual([0], self.data)
+
+
 # vim: sw=4:et:ai
@@ -22,11 +22,14 @@ DecoTengu calculator tests.
 """
 
 from decotengu.engine import Engine, Phase
-from decotengu.error import EngineError
+from decotengu.error import ConfigError, EngineError
 from decotengu.model import eq_gf_limit, ZH_L16B_GF, Data, DecoModelValidator
+import decotengu
 
-from .tools import _engine, _step, AIR
+from .tools import _engine, _step, AIR, TX1845
 
+from collections import deque
+import math
 import unittest
 from unittest import mock
 
@@ -134,6 +137,32 @@ class ZH_L16_GFTestCase(unittest.TestCase):
         self.assertEquals(expected, tissues)
 
 
+    def test_snapshot(self):
+        """
+        Test deco model data creation from tissues pressure
+        """
+        m = ZH_L16B_GF()
+        n = m.NUM_COMPARTMENTS
+        data = m.snapshot([1.2] * n, [0.5] * n, 0.4)
+        self.assertEqual(tuple([(1.2, 0.5)] * n), data.tissues)
+        self.assertEqual(0.4, data.gf)
+
+        data = m.snapshot([1.2] * n)
+        self.assertEqual(tuple([(1.2, 0.0)] * n), data.tissues)
+        self.assertEqual(m.gf_low, data.gf)
+
+
+    def test_snapshot_error(self):
+        """
+        Test deco model data creation from invalid tissues pressure
+        """
+        m = ZH_L16B_GF()
+        n = m.NUM_COMPARTMENTS
+        self.assertRaises(ValueError, m.snapshot, [1.2] * (n - 1))
+        self.assertRaises(ValueError, m.snapshot, [1.2] * n, [0.5])
+        self.assertRaises(ValueError, m.snapshot, [-1.2] * n)
+
+
     def test_tissues_load(self):
         """
         Test deco model all tissue compartments loading with inert gas
@@ -158,6 +187,77 @@ class ZH_L16_GFTestCase(unittest.TestCase):
         self.assertAlmostEqual(0.88692043, v)
 
 
+    def test_load_series(self):
+        """
+        Test deco model tissue compartments loading for series of exposure times
+        """
+        m = ZH_L16B_GF()
+        data = m.init(1.013)
+        result = m.load_series(4, 0.5, 3, TX1845, -1, data, offset=0.2)
+
+        self.assertEquals(3, len(result))
+        for t, d in zip((0.2, 0.7, 1.2), result):
+            expected = m.load(4, t, TX1845, -1, data)
+            for v1, v2 in zip(expected.tissues, d.tissues):
+                self.assertAlmostEqual(v1[0], v2[0])
+                self.assertAlmostEqual(v1[1], v2[1])
+            self.assertEquals(data.gf, d.gf)
+
+
+    def test_load_series_default_offset(self):
+        """
+        Test deco model tissue compartments loading for series of exposure times (default offset)
+        """
+        m = ZH_L16B_GF()
+        data = m.init(1.013)
+        result = m.load_series(4, 0.5, 2, AIR, 0, data)
+
+        expected = m.load(4, 0.5, AIR, 0, data)
+        expected = expected, m.load(4, 0.5, AIR, 0, expected)
+        for e, d in zip(expected, result):
+            for v1, v2 in zip(e.tissues, d.tissues):
+                self.assertAlmostEqual(v1[0], v2[0])
+                self.assertAlmostEqual(v1[1], v2[1])
+
+
+    def test_load_into(self):
+        """
+        Test deco model tissue compartments loading into data buffer
+        """
+        m = ZH_L16B_GF()
+        data = m.init(1.013)
+        buff = m.buffer(data)
+        expected = m.load(4, 2, TX1845, -1, data)
+
+        result = m.load_into(4, 2, TX1845, -1, data, buff)
+        self.assertIs(buff, result)
+        self.assertEquals(expected, m.freeze(buff))
+
+        # load in place
+        expected = m.load(4, 1, AIR, 0, expected)
+        result = m.load_into(4, 1, AIR, 0, buff, buff)
+        self.assertEquals(expected, m.freeze(result))
+        self.assertEquals(m.ceiling_limit(expected), m.ceiling_limit(buff))
+
+
+    def test_ceiling_limits(self):
+        """
+        Test calculation of pressure limit for collection of deco model data
+        """
+        m = ZH_L16B_GF()
+        data = m.init(1.013)
+        data = m.load(6, 30, TX1845, 0, data)
+        items = (data, m.load(4, 10, AIR, 0, data))
+
+        v = m.ceiling_limits(items, 0.4)
+        self.assertEquals(2, len(v))
+        self.assertAlmostEqual(m.ceiling_limit(items[0], 0.4), v[0])
+        self.assertAlmostEqual(m.ceiling_limit(items[1], 0.4), v[1])
+
+        v = m.ceiling_limits(items)
+        self.assertAlmostEqual(m.ceiling_limit(items[0]), v[0])
+
+
     @mock.patch('decotengu.model.eq_gf_limit')
     def test_ceiling_limit(self, f):
         """
@@ -230,6 +330,139 @@ class ZH_L16_GFTestCase(unittest.TestCase):
 
 
 
+class SurfaceTimeTestCase(unittest.TestCase):
+    """
+    Desaturation and no-fly time tests.
+    """
+    def setUp(self):
+        self.model = m = ZH_L16B_GF()
+        data = m.init(1.01325)
+        self.air = m.load(4, 30, AIR, 0, m.load(5, 20, AIR, 0, data))
+        self.tx = m.load(4, 30, AIR, 0, m.load(6, 20, TX1845, 0, data))
+        self.p_sat = 0.79 * (1.01325 - m.water_vapour_pressure)
+
+
+    def test_desaturation_time(self):
+        """
+        Test desaturation time calculation
+        """
+        m = self.model
+        t = m.desaturation_time(1.01325, self.air)
+        p = 1.05 * self.p_sat
+
+        data = m.load(1.01325, t, AIR, 0, self.air)
+        self.assertAlmostEqual(p, max(sum(v) for v in data.tissues))
+        data = m.load(1.01325, t - 1, AIR, 0, self.air)
+        self.assertTrue(max(sum(v) for v in data.tissues) > p)
+
+
+    def test_desaturation_time_saturated(self):
+        """
+        Test desaturation time calculation for tissues saturated at surface
+        """
+        m = self.model
+        self.assertEqual(0, m.desaturation_time(1.01325, m.init(1.01325)))
+        self.assertEqual(0, m.no_fly_time(1.01325, m.init(1.01325)))
+
+
+    def test_desaturation_time_helium(self):
+        """
+        Test desaturation time calculation for tissues loaded with helium
+        """
+        m = self.model
+        t = m.desaturation_time(1.01325, self.tx)
+        p = 1.05 * self.p_sat
+
+        data = m.load(1.01325, t, AIR, 0, self.tx)
+        self.assertTrue(max(sum(v) for v in data.tissues) <= p)
+        data = m.load(1.01325, t - 1, AIR, 0, self.tx)
+        self.assertTrue(max(sum(v) for v in data.tissues) > p)
+
+
+    def test_no_fly_time(self):
+        """
+        Test no-fly time calculation
+        """
+        m = self.model
+        t = m.no_fly_time(1.01325, self.air)
+
+        data = m.load(1.01325, t, AIR, 0, self.air)
+        self.assertAlmostEqual(0.75, m.ceiling_limit(data, m.gf_high))
+        data = m.load(1.01325, t - 1, AIR, 0, self.air)
+        self.assertTrue(m.ceiling_limit(data, m.gf_high) > 0.75)
+
+
+    def test_no_fly_time_helium(self):
+        """
+        Test no-fly time calculation for tissues loaded with helium
+        """
+        m = self.model
+        t = m.no_fly_time(1.01325, self.tx, abs_p=0.8, gf=0.7)
+
+        data = m.load(1.01325, t, AIR, 0, self.tx)
+        self.assertTrue(m.ceiling_limit(data, 0.7) <= 0.8)
+        data = m.load(1.01325, t - 1, AIR, 0, self.tx)
+        self.assertTrue(m.ceiling_limit(data, 0.7) > 0.8)
+
+
+    def test_surface_time_trimix_dive(self):
+        """
+        Test desaturation and no-fly time calculation after trimix dives
+        """
+        for depth, time, o2, he in ((70, 25, 18, 45), (100, 20, 10, 70)):
+            engine = decotengu.create()
+            engine.add_gas(0, o2, he)
+            engine.add_gas(21, 50)
+            engine.add_gas(6, 100)
+            end, = deque(engine.calculate(depth, time), maxlen=1)
+            m = engine.model
+
+            # simulate surface interval with 0.1min steps
+            data = end.data
+            t, no_fly, desat = 0, None, None
+            while desat is None:
+                if no_fly is None and m.ceiling_limit(data, m.gf_high) <= 0.75:
+                    no_fly = t
+                if max(sum(v) for v in data.tissues) <= 1.05 * self.p_sat:
+                    desat = t
+                data = m.load(1.01325, 0.1, AIR, 0, data)
+                t += 0.1
+
+            v = m.no_fly_time(1.01325, end.data)
+            self.assertTrue(abs(no_fly - v) < 1, (depth, no_fly, v))
+            v = m.desaturation_time(1.01325, end.data)
+            self.assertTrue(abs(desat - v) < 1, (depth, desat, v))
+
+
+    def test_no_fly_time_inf(self):
+        """
+        Test no-fly time calculation for unreachable aircraft cabin pressure
+        """
+        m = self.model
+        t = m.no_fly_time(1.01325, self.air, abs_p=0.3)
+        self.assertEqual(math.inf, t)
+
+
+    def test_batch(self):
+        """
+        Test desaturation and no-fly time calculation for collection of
+        deco model data
+        """
+        m = self.model
+        data = self.air, self.tx
+
+        v = m.desaturation_times(1.01325, data)
+        self.assertEqual(2, len(v))
+        self.assertEqual(m.desaturation_time(1.01325, self.air), v[0])
+        self.assertEqual(m.desaturation_time(1.01325, self.tx), v[1])
+
+        v = m.no_fly_times(1.01325, data, 0.8, 0.7)
+        self.assertEqual(2, len(v))
+        self.assertEqual(m.no_fly_time(1.01325, self.air, 0.8, 0.7), v[0])
+        self.assertEqual(m.no_fly_time(1.01325, self.tx, 0.8, 0.7), v[1])
+
+
+
 class DecoModelValidatorTestCase(unittest.TestCase):
     """
     Decompression model validator tests.
@@ -303,4 +536,87 @@ class DecoModelValidatorTestCase(unittest.TestCase):
         engine.model.ceiling_limit.assert_called_once_with(s1.data)
 
 
+    def test_sampled(self):
+        """
+        Test validation of every n-th dive step and decompression stops
+        """
+        engine = _engine()
+        model = engine.model
+        validator = DecoModelValidator(engine, every=3)
+        model.ceiling_limit = mock.MagicMock(return_value=2.19)
+
+        steps = [_step(Phase.ASCENT, 2.2, t) for t in range(7)]
+        steps[4] = _step(Phase.DECO_STOP, 2.2, 4)
+
+        c = validator()
+        for s in steps:
+            c.send(s)
+
+        # steps 0, 3, 4 (deco stop) and 6, and first stop check
+        self.assertEqual(4, validator.checked)
+        self.assertEqual(5, model.ceiling_limit.call_count)
+
+
+    def test_sampled_reset(self):
+        """
+        Test validation sampling reset for each dive profile
+        """
+        engine = _engine()
+        model = engine.model
+        validator = DecoModelValidator(engine, every=3)
+        model.ceiling_limit = mock.MagicMock(return_value=2.19)
+
+        for i in range(2):
+            c = validator()
+            for t in range(2):
+                c.send(_step(Phase.ASCENT, 2.2, t))
+            c.send(_step(Phase.DECO_STOP, 2.2, 2))
+
+            # step 0, deco stop and first stop check
+            self.assertEqual(2, validator.checked)
+            self.assertTrue(validator._first_stop_checked)
+        self.assertEqual(6, model.ceiling_limit.call_count)
+
+
+    def test_sampled_error(self):
+        """
+        Test validation of dive step skipped in sampled mode
+        """
+        engine = _engine()
+        model = engine.model
+        validator = DecoModelValidator(engine, every=2)
+        model.ceiling_limit = mock.MagicMock(return_value=2.19)
+
+        c = validator()
+        c.send(_step(Phase.CONST, 2.2, 1))
+        c.send(_step(Phase.CONST, 2.0, 2)) # skipped
+        self.assertRaises(EngineError, c.send, _step(Phase.CONST, 2.0, 3))
+
+
+    def test_sampled_invalid(self):
+        """
+        Test validator sampling configuration error
+        """
+        engine = _engine()
+        self.assertRaises(ConfigError, DecoModelValidator, engine, every=0)
+
+
+    def test_chunks(self):
+        """
+        Test validation of chunks of dive steps
+        """
+        engine = _engine()
+        model = engine.model
+        validator = DecoModelValidator(engine)
+        model.ceiling_limit = mock.MagicMock(return_value=2.19)
+
+        s1 = _step(Phase.CONST, 2.2, 3)
+        s2 = _step(Phase.CONST, 2.2, 4)
+        s3 = _step(Phase.CONST, 2.0, 5)
+        c = validator.chunks()
+        c.send([s1, s2]) # no exception expected
+        self.assertEqual(2, model.ceiling_limit.call_count)
+        self.assertRaises(EngineError, c.send, [s3])
+
+
 # vim: sw=4:et:ai
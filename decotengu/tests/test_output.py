@@ -22,12 +22,15 @@ Tests for DecoTengu output classes, functions and coroutines.
 """
 
 import io
+import tempfile
 
 from decotengu.engine import Phase, Step
-from decotengu.output import DiveStepInfoGenerator, csv_writer, \
-        InfoSample, InfoTissue
+from decotengu.output import DiveStepInfoGenerator, DiveStepInfoBatch, \
+        csv_writer, csv_columns_writer, binary_writer, info_columns, \
+        InfoSample, InfoTissue, InfoColumns, TissueFile
 from decotengu.model import ZH_L16B_GF
 from decotengu.flow import coroutine
+from decotengu.profile import DiveProfile
 
 from .tools import _engine, _data, AIR
 
@@ -93,6 +96,180 @@ class DiveStepInfoTestCase(unittest.TestCase):
 
 
 
+class InfoColumnsTestCase(unittest.TestCase):
+    """
+    Columnar dive information tests.
+    """
+    def setUp(self):
+        self.engine = _engine()
+        self.engine.model = ZH_L16B_GF()
+        self.steps = [
+            Step(Phase.CONST, 3.0, 100, AIR, _data(0.3, 2.2, 2.3)),
+            Step(Phase.DECO_STOP, 2.5, 145, AIR, _data(0.4, 1.2, 1.3)),
+        ]
+
+
+    def test_info_columns(self):
+        """
+        Test columnar dive information
+        """
+        info = info_columns(self.engine, self.steps)
+
+        self.assertEqual(2, len(info))
+        self.assertEqual(2, info.n_tissues)
+        self.assertEqual([20, 15], info.depth.tolist())
+        self.assertEqual([100, 145], info.time.tolist())
+        self.assertEqual([3.0, 2.5], info.pressure.tolist())
+        self.assertEqual([0.3, 0.4], info.gf.tolist())
+        self.assertEqual([AIR], info.gas_list)
+
+        self.assertEqual([2.2, 1.2], info.tissue('tissue_pressure', 1).tolist())
+        self.assertEqual([2.3, 1.3], info.tissue('tissue_pressure', 2).tolist())
+        v1, v2 = info.tissue('tissue_limit', 1)
+        self.assertAlmostEqual(0.57475712, v1)
+        v1, v2 = info.tissue('tissue_gf_limit', 2)
+        self.assertAlmostEqual(1.72332601, v1)
+
+        # leading tissue compartment has deepest ceiling
+        self.assertEqual([2, 2], info.leading.tolist())
+
+
+    def test_info_columns_generator(self):
+        """
+        Test columnar dive information against dive step info
+        """
+        data = []
+        @coroutine
+        def sink():
+            while True:
+                data.append((yield))
+
+        info = DiveStepInfoGenerator(self.engine, sink())()
+        for step in self.steps:
+            info.send(step)
+
+        profile = DiveProfile(2)
+        profile.extend(self.steps)
+        info = info_columns(self.engine, profile)
+        for i, sample in enumerate(data):
+            for t in sample.tissues:
+                k = 2 * i + t.no - 1
+                self.assertAlmostEqual(t.pressure, info.tissue_pressure[k])
+                self.assertAlmostEqual(t.limit, info.tissue_limit[k])
+                self.assertAlmostEqual(t.gf_limit, info.tissue_gf_limit[k])
+
+
+    def test_gf99(self):
+        """
+        Test columnar dive information GF99 and SurfGF
+        """
+        steps = self.steps + [
+            Step(Phase.ASCENT, 1.5, 150, AIR, _data(0.5, 1.2, 2.3)),
+        ]
+        info = info_columns(self.engine, steps)
+        model = self.engine.model
+        gradient = lambda k, p_t, p: \
+            (p_t - p) / (model.N2_A[k] + p / model.N2_B[k] - p)
+
+        # undersaturated tissue compartments
+        self.assertEqual(0, info.gf99[0])
+        self.assertEqual(0, info.gf99[1])
+
+        gf99 = max(gradient(0, 1.2, 1.5), gradient(1, 2.3, 1.5))
+        self.assertAlmostEqual(gf99, info.gf99[2])
+        surf_gf = max(gradient(0, 1.2, 1.0), gradient(1, 2.3, 1.0))
+        self.assertAlmostEqual(surf_gf, info.surf_gf[2])
+        self.assertEqual(2, info.leading[2])
+
+
+    def test_tissue(self):
+        """
+        Test columnar dive information tissue column errors
+        """
+        info = info_columns(self.engine, self.steps)
+        self.assertRaises(ValueError, info.tissue, 'depth', 1)
+        self.assertRaises(IndexError, info.tissue, 'tissue_pressure', 3)
+
+
+    def test_batch(self):
+        """
+        Test converting chunks of dive steps into columnar dive information
+        """
+        data = []
+        @coroutine
+        def sink():
+            try:
+                while True:
+                    data.append((yield))
+            except GeneratorExit:
+                data.append(None)
+
+        steps = self.steps * 3
+        batch = DiveStepInfoBatch(self.engine, sink(), chunk_size=4)()
+        for step in steps:
+            batch.send(step)
+        self.assertEqual(1, len(data))
+        self.assertEqual(4, len(data[0]))
+
+        # remaining dive steps are sent on close
+        batch.close()
+        self.assertEqual(3, len(data))
+        self.assertEqual(2, len(data[1]))
+        self.assertIsNone(data[2])
+
+
+    def test_batch_single_precision(self):
+        """
+        Test converting dive steps into columnar dive information with
+        tissue compartment columns in single precision
+        """
+        data = []
+        @coroutine
+        def sink():
+            while True:
+                data.append((yield))
+
+        batch = DiveStepInfoBatch(self.engine, sink(), typecode='f')()
+        for step in self.steps:
+            batch.send(step)
+        batch.close()
+
+        info, = data
+        expected = info_columns(self.engine, self.steps)
+        for name in info.TISSUE_COLUMNS:
+            col = getattr(info, name)
+            self.assertEqual('f', col.typecode)
+            for v1, v2 in zip(getattr(expected, name), col):
+                self.assertAlmostEqual(v1, v2, 6)
+        self.assertEqual('d', info.gf99.typecode)
+        self.assertRaises(ValueError, InfoColumns, 2, typecode='i')
+
+
+    def test_batch_chunks(self):
+        """
+        Test converting received chunks of dive steps into columnar dive
+        information
+        """
+        data = []
+        @coroutine
+        def sink():
+            try:
+                while True:
+                    data.append((yield))
+            except GeneratorExit:
+                data.append(None)
+
+        batch = DiveStepInfoBatch(self.engine, sink()).chunks()
+        batch.send(self.steps * 3)
+        batch.send(self.steps)
+        batch.close()
+        self.assertEqual(3, len(data))
+        self.assertEqual(6, len(data[0]))
+        self.assertEqual(2, len(data[1]))
+        self.assertIsNone(data[2])
+
+
+
 class CSVWriterTestCase(unittest.TestCase):
     """
     Tests for saving tissue saturation data in a CSV file.
@@ -129,4 +306,185 @@ class CSVWriterTestCase(unittest.TestCase):
         self.assertTrue(st[4].endswith('const\r'), st[4])
 
 
+
+
+class CSVColumnsWriterTestCase(unittest.TestCase):
+    """
+    Tests for saving columnar dive information in a CSV file.
+    """
+    def setUp(self):
+        engine = _engine()
+        engine.model = ZH_L16B_GF()
+        steps = [
+            Step(Phase.CONST, 3.0, 100, AIR, _data(0.3, 2.2, 2.3)),
+            Step(Phase.DECO_STOP, 2.5, 145, AIR, _data(0.4, 1.2, 1.3)),
+        ]
+        self.info = info_columns(engine, steps)
+
+
+    def _write(self, *args, **kw):
+        f = io.StringIO()
+        writer = csv_columns_writer(f, *args, **kw)
+        writer.send(self.info)
+        writer.send(self.info)
+        return [r.split(',') for r in f.getvalue().split('\r\n')]
+
+
+    def test_wide(self):
+        """
+        Test saving columnar dive information in wide CSV file
+        """
+        rows = self._write('wide')
+        self.assertEqual(6, len(rows))
+        self.assertEqual([''], rows[-1])
+
+        header = rows[0]
+        self.assertEqual(17, len(header))
+        self.assertEqual(['depth', 'time', 'pressure'], header[:3])
+        self.assertEqual(
+            ['tissue_pressure_01', 'tissue_pressure_02', 'tissue_limit_01'],
+            header[11:14]
+        )
+        self.assertEqual('tissue_gf_limit_02', header[-1])
+
+        row = rows[1]
+        self.assertEqual(17, len(row))
+        self.assertEqual(['20.0', '100.0', '3.0', '21', '79', '0'], row[:6])
+        self.assertEqual('const', row[6])
+        self.assertEqual(['2.2', '2.3'], row[11:13])
+        self.assertEqual('deco_stop', rows[2][6])
+
+
+    def test_leading(self):
+        """
+        Test saving columnar dive information in leading tissue CSV file
+        """
+        rows = self._write('leading')
+        self.assertEqual(6, len(rows))
+        header = rows[0]
+        self.assertEqual(
+            ['leading', 'tissue_pressure', 'tissue_limit', 'tissue_gf_limit'],
+            header[-4:]
+        )
+        row = rows[1]
+        self.assertEqual(14, len(row))
+        self.assertEqual('2.3', row[11])
+        self.assertEqual(
+            max(self.info.tissue_limit[:2]), float(row[12])
+        )
+        self.assertEqual(
+            max(self.info.tissue_gf_limit[:2]), float(row[13])
+        )
+
+
+    def test_precision(self):
+        """
+        Test saving columnar dive information in CSV file with precision
+        """
+        rows = self._write('leading', precision=3)
+        self.assertEqual(
+            round(max(self.info.tissue_limit[:2]), 3), float(rows[1][12])
+        )
+        self.assertTrue(all(len(v) <= 6 for v in rows[1][11:]))
+
+
+    def test_layout(self):
+        """
+        Test saving columnar dive information in unknown CSV file layout
+        """
+        self.assertRaises(ValueError, csv_columns_writer, io.StringIO(), 'x')
+
+
+
+class BinaryTissueFileTestCase(unittest.TestCase):
+    """
+    Tests for saving tissue saturation data in a binary tissue file.
+    """
+    def setUp(self):
+        self.data = [
+            InfoSample(0, 0, 2.1, AIR, [
+                InfoTissue(1, 1.2, 0.9, 0.3, 0.95),
+                InfoTissue(2, 1.3, 0.91, 0.3, 0.96),
+            ], 'descent'),
+            InfoSample(2, 5, 3.1, AIR, [
+                InfoTissue(1, 1.4, 0.95, 0.3, 0.98),
+                InfoTissue(2, 1.5, 0.96, 0.3, 0.99),
+            ], 'const'),
+        ]
+        self.f = tempfile.NamedTemporaryFile()
+
+
+    def tearDown(self):
+        self.f.close()
+
+
+    def test_write(self):
+        """
+        Test saving tissue saturation data in binary tissue file
+        """
+        writer = binary_writer(self.f)
+        for i in self.data:
+            writer.send(i)
+        self.f.flush()
+
+        with TissueFile(self.f.name) as tf:
+            self.assertEqual(2, len(tf))
+            self.assertEqual(2, tf.n_tissues)
+            self.assertEqual([0, 5], tf.column('time').tolist())
+            self.assertEqual([2.1, 3.1], tf.column('pressure').tolist())
+            self.assertEqual([21, 21], tf.column('gas_o2').tolist())
+            self.assertEqual('descent', tf.phase(0))
+            self.assertEqual('const', tf.phase(1))
+            v = tf.tissue('tissue_pressure', 2)
+            self.assertEqual([1.3, 1.5], v.tolist())
+            v.release()
+            v = tf.tissue('tissue_gf_limit', 1)
+            self.assertEqual([0.95, 0.98], v.tolist())
+            v.release()
+
+
+    def test_append(self):
+        """
+        Test appending tissue saturation data to binary tissue file
+        """
+        writer = binary_writer(self.f)
+        writer.send(self.data[0])
+        self.f.flush()
+
+        with TissueFile(self.f.name) as tf:
+            self.assertEqual(1, len(tf))
+
+            # the header is not written when appending to the file
+            writer = binary_writer(self.f)
+            writer.send(self.data[1])
+            self.f.flush()
+            self.assertEqual(1, len(tf))
+
+            tf.refresh()
+            self.assertEqual(2, len(tf))
+            self.assertEqual([0, 5], tf.column('time').tolist())
+
+
+    def test_tissue_no(self):
+        """
+        Test binary tissue file tissue compartment number out of range
+        """
+        writer = binary_writer(self.f)
+        writer.send(self.data[0])
+        self.f.flush()
+
+        with TissueFile(self.f.name) as tf:
+            self.assertRaises(IndexError, tf.tissue, 'tissue_pressure', 0)
+            self.assertRaises(IndexError, tf.tissue, 'tissue_pressure', 3)
+
+
+    def test_magic(self):
+        """
+        Test opening a file, which is not binary tissue file
+        """
+        self.f.write(b'depth,time,pressure\n')
+        self.f.flush()
+        self.assertRaises(ValueError, TissueFile, self.f.name)
+
+
 # vim: sw=4:et:ai
@@ -0,0 +1,321 @@
+#
+# DecoTengu - dive decompression library.
+#
+# Copyright (C) 2013-2018 by Artur Wroblewski <wrobell@riseup.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Columnar dive profile tests.
+"""
+
+from decotengu.engine import Phase, Step
+from decotengu.conveyor import Conveyor
+from decotengu.error import EngineError
+from decotengu.profile import DiveProfile, ProfileIndex, profile_writer, \
+    validate_profile
+
+from .tools import _data, _engine, AIR, EAN50
+
+import unittest
+from unittest import mock
+
+
+class DiveProfileTestCase(unittest.TestCase):
+    """
+    Columnar dive profile tests.
+    """
+    def setUp(self):
+        """
+        Create dive profile with three dive steps.
+        """
+        self.steps = (
+            Step(Phase.START, 1.0, 0, AIR, _data(0.3, 0.7, 0.7)),
+            Step(Phase.DESCENT, 3.0, 2, AIR, _data(0.3, 1.2, 0.9)),
+            Step(Phase.GAS_SWITCH, 3.0, 2, EAN50, _data(0.4, 1.2, 0.9)),
+        )
+        self.profile = DiveProfile(2)
+        self.profile.extend(self.steps)
+
+
+    def test_append(self):
+        """
+        Test appending dive step to dive profile
+        """
+        profile = self.profile
+        self.assertEqual(3, len(profile))
+        self.assertEqual([0, 2, 2], profile.time.tolist())
+        self.assertEqual([1.0, 3.0, 3.0], profile.abs_p.tolist())
+        self.assertEqual([0, 1, 5], profile.phase.tolist())
+        self.assertEqual([0, 0, 1], profile.gas.tolist())
+        self.assertEqual([0.3, 0.3, 0.4], profile.gf.tolist())
+        self.assertEqual([AIR, EAN50], profile.gas_list)
+        self.assertEqual(
+            [0.7, 0.7, 1.2, 0.9, 1.2, 0.9], profile.n2.tolist()
+        )
+        self.assertEqual([0.0] * 6, profile.he.tolist())
+
+
+    def test_tissue(self):
+        """
+        Test getting tissue compartment column of dive profile
+        """
+        profile = self.profile
+        self.assertEqual([0.7, 1.2, 1.2], profile.n2_tissue(0).tolist())
+        self.assertEqual([0.7, 0.9, 0.9], profile.n2_tissue(1).tolist())
+        self.assertEqual([0.0] * 3, profile.he_tissue(1).tolist())
+
+
+    def test_nbytes(self):
+        """
+        Test dive profile memory usage
+        """
+        # 3 steps * (3 * 8 bytes + 2 bytes + 2 * 2 tissues * 8 bytes)
+        self.assertEqual(174, self.profile.nbytes)
+
+
+    def test_single_precision(self):
+        """
+        Test dive profile with tissues gas loading in single precision
+        """
+        profile = DiveProfile(2, typecode='f')
+        profile.extend(self.steps)
+
+        # tissues gas loading arrays use half of the memory
+        self.assertEqual(174 - 48, profile.nbytes)
+        self.assertEqual(3, len(profile))
+        for s1, s2 in zip(self.steps, profile):
+            for v1, v2 in zip(s1.data.tissues, s2.data.tissues):
+                self.assertAlmostEqual(v1[0], v2[0], 6)
+                self.assertAlmostEqual(v1[1], v2[1], 6)
+
+        self.assertEqual('f', profile[1:].n2.typecode)
+        self.assertEqual('f', profile[::2].he.typecode)
+        self.assertRaises(ValueError, DiveProfile, 2, typecode='i')
+
+
+    def test_index(self):
+        """
+        Test getting dive step from dive profile
+        """
+        self.assertEqual(self.steps[1], self.profile[1])
+        self.assertEqual(self.steps[2], self.profile[-1])
+        self.assertEqual(self.steps, tuple(self.profile))
+        self.assertRaises(IndexError, self.profile.__getitem__, 3)
+        self.assertRaises(IndexError, self.profile.__getitem__, -4)
+
+
+    def test_slice(self):
+        """
+        Test slicing dive profile
+        """
+        profile = self.profile[1:]
+        self.assertEqual(self.steps[1:], tuple(profile))
+
+        profile = self.profile[::2]
+        self.assertEqual(self.steps[::2], tuple(profile))
+        self.assertEqual([0.7, 1.2], profile.n2_tissue(0).tolist())
+
+
+    def test_profile_writer(self):
+        """
+        Test writing dive steps into dive profile with coroutine
+        """
+        profile = DiveProfile(2)
+        target = mock.MagicMock()
+        writer = profile_writer(profile, target)
+        for step in self.steps:
+            writer.send(step)
+
+        self.assertEqual(self.steps, tuple(profile))
+        self.assertEqual(3, target.send.call_count)
+
+
+
+class ProfileIndexTestCase(unittest.TestCase):
+    """
+    Dive profile index tests.
+    """
+    def setUp(self):
+        """
+        Create dive profile index and expanded dive profile.
+        """
+        self.engine = _engine(air=True)
+        self.engine.add_gas(22, 50)
+        self.steps = list(self.engine.calculate(30, 20))
+        self.index = ProfileIndex(self.engine, self.steps)
+
+        # on gas mix switch, the index returns the gas mix switch step
+        steps = list(Conveyor(self.engine, 0.5)(30, 20))
+        self.expanded = [
+            s1 for s1, s2 in zip(steps, steps[1:] + [None])
+            if s2 is None or s2.phase != Phase.GAS_SWITCH
+        ]
+
+
+    def _check_step(self, expected, step):
+        """
+        Check dive step against expected dive step.
+        """
+        self.assertAlmostEqual(expected.time, step.time)
+        self.assertAlmostEqual(expected.abs_p, step.abs_p)
+        self.assertEqual(expected.gas, step.gas)
+        self.assertEqual(expected.data.gf, step.data.gf)
+        for t1, t2 in zip(expected.data.tissues, step.data.tissues):
+            self.assertAlmostEqual(t1[0], t2[0])
+            self.assertAlmostEqual(t1[1], t2[1])
+
+
+    def test_state_at(self):
+        """
+        Test dive profile index query
+        """
+        for expected in self.expanded:
+            step = self.index.state_at(expected.time)
+            self._check_step(expected, step)
+
+
+    def test_state_at_step(self):
+        """
+        Test dive profile index query at time of dive step
+        """
+        step = self.steps[3]
+        self.assertIs(step, self.index.state_at(step.time))
+
+
+    def test_state_at_gas_switch(self):
+        """
+        Test dive profile index query at time of gas mix switch
+        """
+        k, switch = next(
+            (k, s) for k, s in enumerate(self.steps)
+            if s.phase == Phase.GAS_SWITCH
+        )
+        self.assertEqual(switch.time, self.steps[k - 1].time)
+        self.assertIs(switch, self.index.state_at(switch.time))
+
+
+    def test_state_at_outside(self):
+        """
+        Test dive profile index query outside of dive profile
+        """
+        self.assertRaises(ValueError, self.index.state_at, -1)
+        self.assertRaises(
+            ValueError, self.index.state_at, self.steps[-1].time + 1
+        )
+
+
+    def test_states_at(self):
+        """
+        Test dive profile index batch query
+        """
+        times = [s.time for s in self.expanded]
+        steps = self.index.states_at(times)
+        self.assertEqual(len(times), len(steps))
+        for expected, step in zip(self.expanded, steps):
+            self._check_step(expected, step)
+
+
+    def test_states_at_irregular(self):
+        """
+        Test dive profile index batch query for irregular times
+        """
+        end = self.steps[-1].time
+        times = [0, 0.3, 0.3, 1.1, 5, 5.2, 5.7, 25.1, 26, end - 0.1, end]
+        steps = self.index.states_at(times)
+        self.assertEqual(len(times), len(steps))
+        for t, step in zip(times, steps):
+            self._check_step(self.index.state_at(t), step)
+
+
+    def test_states_at_empty(self):
+        """
+        Test dive profile index batch query for no times
+        """
+        self.assertEqual((), self.index.states_at([]))
+
+
+    def test_states_at_outside(self):
+        """
+        Test dive profile index batch query outside of dive profile
+        """
+        self.assertRaises(ValueError, self.index.states_at, [-1, 1])
+
+
+
+class ValidateProfileTestCase(unittest.TestCase):
+    """
+    Columnar dive profile validation tests.
+    """
+    def setUp(self):
+        """
+        Create decompression engine and columnar dive profile.
+        """
+        self.engine = _engine(air=True)
+        steps = Conveyor(self.engine, 0.5)(30, 20)
+        self.profile = DiveProfile()
+        self.profile.extend(steps)
+
+
+    def test_validate(self):
+        """
+        Test columnar dive profile validation
+        """
+        validate_profile(self.engine, self.profile) # no exception expected
+
+
+    def test_ceiling_limit(self):
+        """
+        Test columnar dive profile validation at ascent ceiling limit
+        """
+        profile = self.profile
+        i = len(profile) - 2
+        step = profile[i]
+        limit = self.engine.model.ceiling_limit(step.data, step.data.gf)
+
+        profile.abs_p[i] = limit + 1e-9
+        validate_profile(self.engine, profile) # no exception expected
+
+        profile.abs_p[i] = limit - 1e-9
+        self.assertRaises(EngineError, validate_profile, self.engine, profile)
+
+
+    def test_validate_error(self):
+        """
+        Test columnar dive profile validation error
+        """
+        profile = self.profile
+        i = len(profile) // 2
+        profile.abs_p[i] = 1.0
+        self.assertRaises(EngineError, validate_profile, self.engine, profile)
+
+
+    def test_validate_first_stop(self):
+        """
+        Test columnar dive profile validation of first decompression stop
+        """
+        model = self.engine.model
+        model.ceiling_limit = mock.MagicMock(return_value=1.0)
+        self.assertRaises(
+            EngineError, validate_profile, self.engine, self.profile
+        )
+        stop = next(
+            s for s, n in zip(self.profile, self.profile[1:])
+            if n.phase == Phase.DECO_STOP
+        )
+        model.ceiling_limit.assert_called_once_with(stop.data)
+
+
+# vim: sw=4:et:ai
@@ -0,0 +1,160 @@
+#
+# DecoTengu - dive decompression library.
+#
+# Copyright (C) 2013-2018 by Artur Wroblewski <wrobell@riseup.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Dive series tests.
+"""
+
+from decotengu.series import DiveSeries, Dive, converged, AIR
+from decotengu.model import Data
+import decotengu
+
+import unittest
+
+DIVES = (40, 25, 0), (30, 30, 60), (18, 45, 120), (18, 45, 24 * 60)
+
+
+def _engine():
+    engine = decotengu.create()
+    engine.add_gas(0, 21)
+    return engine
+
+
+def _series(tolerance=None, dives=DIVES):
+    series = DiveSeries(_engine(), tolerance=tolerance)
+    for depth, time, interval in dives:
+        series.add(depth, time, interval)
+    return series
+
+
+
+class DiveSeriesTestCase(unittest.TestCase):
+    """
+    Dive series tests.
+    """
+    def test_add(self):
+        """
+        Test adding dives to dive series
+        """
+        series = _series()
+        self.assertEqual(4, len(series))
+        self.assertEqual(4, series.calculated)
+        self.assertEqual(Dive(30, 30, 60), series[1].dive)
+
+        engine = series.engine
+        self.assertEqual(engine.model.init(1.01325), series[0].start)
+        self.assertEqual(0, series[0].start_time)
+        for prev, result in zip(series, series[1:]):
+            interval = result.dive.interval
+            self.assertAlmostEqual(
+                prev.end_time + interval, result.start_time
+            )
+            data = engine.model.load(1.01325, interval, AIR, 0, prev.end)
+            self.assertEqual(data.tissues, result.start.tissues)
+            self.assertEqual(engine.model.gf_low, result.start.gf)
+
+
+    def test_repetitive_dive(self):
+        """
+        Test repetitive dive requires longer decompression
+        """
+        series = _series(dives=((30, 30, 0), (30, 30, 60)))
+        s1, s2 = series
+        self.assertTrue(s2.stops.total > s1.stops.total)
+
+
+    def test_update(self):
+        """
+        Test updating dive of dive series
+        """
+        series = _series()
+        n = series.update(1, interval=180)
+        self.assertEqual(3, n)
+        self.assertEqual(7, series.calculated)
+        self.assertEqual(Dive(30, 30, 180), series[1].dive)
+
+        expected = _series(dives=DIVES[:1] + ((30, 30, 180),) + DIVES[2:])
+        self.assertEqual(expected.results, series.results)
+
+
+    def test_update_converged(self):
+        """
+        Test updating dive of dive series with early stop of recalculation
+        """
+        series = _series(tolerance=0.01)
+        n = series.update(1, time=20)
+        self.assertEqual(2, n)
+        self.assertEqual(6, series.calculated)
+
+        expected = _series(dives=DIVES[:1] + ((30, 20, 60),) + DIVES[2:])
+        self.assertEqual(
+            [r.stops for r in expected], [r.stops for r in series]
+        )
+
+        # runtime of reused dive is shifted
+        self.assertAlmostEqual(expected[3].start_time, series[3].start_time)
+        self.assertAlmostEqual(expected[3].end_time, series[3].end_time)
+        self.assertTrue(converged(expected[3].start, series[3].start, 0.01))
+
+
+    def test_remove(self):
+        """
+        Test removing dive from dive series
+        """
+        series = _series()
+        n = series.remove(1)
+        self.assertEqual(2, n)
+        self.assertEqual(3, len(series))
+
+        expected = _series(dives=DIVES[:1] + DIVES[2:])
+        self.assertEqual(expected.results, series.results)
+
+
+    def test_recalculate(self):
+        """
+        Test recalculation of dive series after engine configuration change
+        """
+        series = _series(tolerance=0.01)
+        series.engine.model.gf_high = 0.7
+        self.assertEqual(4, series.recalculate())
+
+        expected = _series()
+        self.assertNotEqual(expected.results, series.results)
+        expected.engine.model.gf_high = 0.7
+        expected.recalculate()
+        self.assertEqual(expected.results, series.results)
+
+
+
+class ConvergedTestCase(unittest.TestCase):
+    """
+    Decompression model data convergence tests.
+    """
+    def test_converged(self):
+        """
+        Test decompression model data convergence
+        """
+        d1 = Data(((1.0, 0.1), (1.1, 0.0)), 0.3)
+        d2 = Data(((1.005, 0.1), (1.1, 0.009)), 0.3)
+        self.assertTrue(converged(d1, d2, 0.01))
+        self.assertFalse(converged(d1, d2, 0.001))
+        self.assertFalse(converged(d1, d2._replace(gf=0.4), 0.01))
+
+
+# vim: sw=4:et:ai
@@ -0,0 +1,188 @@
+#
+# DecoTengu - dive decompression library.
+#
+# Copyright (C) 2013-2018 by Artur Wroblewski <wrobell@riseup.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Decompression engine instrumentation tests.
+"""
+
+from decotengu.alt.naive import DecoStopStepper
+from decotengu.engine import Engine
+from decotengu.stats import Stats, StopStats, instrument, PHASES
+
+import unittest
+
+
+class InstrumentTestCase(unittest.TestCase):
+    """
+    Decompression engine instrumentation tests.
+    """
+    def setUp(self):
+        """
+        Create instrumented decompression engine.
+        """
+        self.engine = Engine()
+        self.engine.add_gas(0, 21)
+        self.instr = instrument(self.engine)
+
+
+    def test_counters(self):
+        """
+        Test instrumentation counters
+        """
+        list(self.engine.calculate(35, 40))
+        stats = self.instr.last
+        counters = stats.counters
+
+        self.assertEqual(1, counters['plans'])
+        self.assertEqual(len(self.engine.deco_table), counters['deco_stops'])
+        self.assertEqual(counters['deco_stops'], len(stats.stops))
+        self.assertTrue(counters['load'] > 0)
+        self.assertTrue(counters['ceiling_limit'] > 0)
+        self.assertEqual(
+            counters['load'] + counters['load_into'], counters['loads']
+        )
+        loads = sum(s.loads for s in stats.stops)
+        self.assertTrue(counters['load_into'] <= loads <= counters['loads'])
+
+
+    def test_counters_series(self):
+        """
+        Test instrumentation counter of tissues gas loading series
+        """
+        model = self.engine.model
+        data = model.init(1.01325)
+        model.load_series(3.0, 0.1, 5, self.engine._gas_list[0], 0, data)
+        model.load_series(3.0, 0.1, n=2, gas=self.engine._gas_list[0],
+            rate=0, data=data)
+
+        counters = self.instr.last.counters
+        self.assertEqual(2, counters['load_series'])
+        self.assertEqual(7, counters['loads'])
+
+
+    def test_stops_decostep(self):
+        """
+        Test decompression stop search statistics of deco stop stepper
+        """
+        engine = Engine()
+        engine.add_gas(0, 21)
+        engine._deco_stop = DecoStopStepper(engine)
+        instr = instrument(engine)
+
+        list(engine.calculate(35, 40))
+        stats = instr.last
+        self.assertEqual(len(engine.deco_table), len(stats.stops))
+        self.assertEqual(0, stats.counters['load_into'])
+        for s in stats.stops:
+            self.assertEqual(s.time, s.loads, s)
+
+
+    def test_stops(self):
+        """
+        Test decompression stop search statistics
+        """
+        list(self.engine.calculate(35, 40))
+        stops = self.instr.last.stops
+        table = self.engine.deco_table
+
+        self.assertEqual([s.depth for s in table], [s.depth for s in stops])
+        self.assertEqual([s.time for s in table], [s.time for s in stops])
+        for s in stops:
+            self.assertEqual(s.probes, 1 + s.linear + s.bisect)
+            # one minute stop does not need any search
+            self.assertEqual(s.time == 1, s.probes == 1)
+
+
+    def test_timers(self):
+        """
+        Test instrumentation timers
+        """
+        list(self.engine.calculate(35, 40))
+        timers = self.instr.last.timers
+        for phase in PHASES:
+            self.assertTrue(timers[phase] > 0, phase)
+        self.assertTrue(
+            timers['total'] >= sum(timers[phase] for phase in PHASES)
+        )
+
+
+    def test_total(self):
+        """
+        Test aggregation of statistics of dive profile calculations
+        """
+        list(self.engine.calculate(35, 40))
+        s1 = self.instr.last
+        list(self.engine.calculate(30, 30))
+        s2 = self.instr.last
+
+        total = self.instr.total
+        self.assertEqual(2, total.counters['plans'])
+        self.assertEqual(
+            s1.counters['load'] + s2.counters['load'], total.counters['load']
+        )
+        self.assertEqual(s1.stops + s2.stops, total.stops)
+
+        stats = s1 + s2
+        self.assertEqual(total.counters, stats.counters)
+
+
+    def test_ndl_dive(self):
+        """
+        Test instrumentation of NDL dive
+        """
+        list(self.engine.calculate(15, 20))
+        stats = self.instr.last
+        self.assertEqual(0, stats.counters['deco_stops'])
+        self.assertTrue(stats.timers['free_ascent'] > 0)
+        self.assertEqual(0, stats.timers['deco_ascent'])
+
+
+    def test_not_instrumented(self):
+        """
+        Test decompression engine without instrumentation
+        """
+        engine = Engine()
+        self.assertNotIn('calculate', engine.__dict__)
+        self.assertNotIn('load', engine.model.__dict__)
+
+
+
+class StatsTestCase(unittest.TestCase):
+    """
+    Dive profile calculation statistics tests.
+    """
+    def test_merge(self):
+        """
+        Test merging statistics
+        """
+        s1 = Stats()
+        s1.counters['load'] = 2
+        s1.timers['bottom'] = 0.5
+        s1.stops.append(StopStats(9, 1, 1, 1, 0, 0))
+        s2 = Stats()
+        s2.counters['load'] = 3
+        s2.timers['bottom'] = 0.25
+
+        s1.merge(s2)
+        self.assertEqual(5, s1.counters['load'])
+        self.assertEqual(0.75, s1.timers['bottom'])
+        self.assertEqual(1, len(s1.stops))
+
+
+# vim: sw=4:et:ai
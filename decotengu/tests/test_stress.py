@@ -0,0 +1,206 @@
+#
+# DecoTengu - dive decompression library.
+#
+# Copyright (C) 2013-2018 by Artur Wroblewski <wrobell@riseup.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Randomized stress testing tests.
+"""
+
+from decotengu.stress import Plan, random_plan, is_valid, check_plan, \
+    error_kind, shrink, run_stress, MAX_TIME
+
+import unittest
+from unittest import mock
+
+
+class RandomPlanTestCase(unittest.TestCase):
+    """
+    Random dive plan tests.
+    """
+    def test_deterministic(self):
+        """
+        Test random dive plan generation is deterministic
+        """
+        self.assertEqual(random_plan(3), random_plan(3))
+        self.assertNotEqual(random_plan(3), random_plan(4))
+
+
+    def test_valid(self):
+        """
+        Test random dive plans are valid
+        """
+        for seed in range(200):
+            plan = random_plan(seed)
+            self.assertTrue(is_valid(plan), plan)
+            self.assertTrue(10 <= plan.depth <= 350, plan)
+            self.assertTrue(plan.time <= MAX_TIME, plan)
+            self.assertTrue(0.845 <= plan.surface_pressure <= 1.01325, plan)
+
+            depths = [m[0] for m in plan.gas_list]
+            self.assertEqual(0, depths[0])
+            self.assertEqual(len(set(depths)), len(depths))
+
+
+
+class CheckPlanTestCase(unittest.TestCase):
+    """
+    Dive plan check tests.
+    """
+    def test_check_plan(self):
+        """
+        Test dive plan check
+        """
+        plan = Plan(45, 25, 1.01325, 0.3, 0.85, ((0, 27, 0), (22, 50, 0)))
+        self.assertIsNone(check_plan(plan))
+
+
+    def test_check_plan_error(self):
+        """
+        Test dive plan check reporting engine error
+        """
+        plan = Plan(59, 5, 1.01325, 0.3, 0.85, ((0, 21, 0),))
+        error = check_plan(plan, alt=())
+        self.assertTrue(error.startswith('reference: '), error)
+
+
+    def test_run_stress(self):
+        """
+        Test checking range of random dive plans
+        """
+        with mock.patch('decotengu.stress.check_plan') as f:
+            f.return_value = None
+            results = list(run_stress(5, 3, alt=()))
+
+        self.assertEqual([(5, None), (6, None), (7, None)], results)
+        self.assertEqual(random_plan(6), f.call_args_list[1][0][0])
+
+
+
+class ErrorKindTestCase(unittest.TestCase):
+    """
+    Dive plan check error message classification tests.
+    """
+    def test_error_kind(self):
+        """
+        Test finding source and kind of failure of check error message
+        """
+        self.assertEqual(
+            ('reference', 'dive profile does not end'),
+            error_kind('reference: dive profile does not end at surface: x')
+        )
+        self.assertEqual(
+            ('scan', 'First decompression stop not'),
+            error_kind(
+                'scan: First decompression stop not at deco ceiling.'
+                ' Error for x'
+            )
+        )
+        self.assertEqual(
+            ('reference', 'invalid decompression stop time'),
+            error_kind('reference: invalid decompression stop time: [1]')
+        )
+
+
+
+class ShrinkTestCase(unittest.TestCase):
+    """
+    Failing dive plan shrinking tests.
+    """
+    def test_shrink(self):
+        """
+        Test shrinking failing dive plan
+        """
+        # fail for dive plans deeper than 30m with 50% gas mix
+        def check(plan, alt):
+            if plan.depth > 30 and any(m[1] == 50 for m in plan.gas_list):
+                return 'reference: error at {}'.format(plan.depth)
+            return None
+
+        plan = Plan(
+            101.7, 300, 0.9, 0.2, 0.7,
+            ((0, 14, 50), (21, 50, 0), (6, 100, 0))
+        )
+        with mock.patch('decotengu.stress.check_plan', check):
+            result = shrink(plan)
+
+        expected = Plan(
+            31, 2, 1.01325, 0.3, 0.85, ((0, 21, 0), (21, 50, 0))
+        )
+        self.assertEqual(expected, result)
+
+
+    def test_shrink_same_failure(self):
+        """
+        Test shrinking failing dive plan to dive plan failing the same way
+        """
+        # fail for dive plans deeper than 30m, but alternative
+        # implementation fails for dive plans shallower than 60m
+        def check(plan, alt):
+            if plan.depth < 60:
+                return 'scan: decompression table differs: []'
+            elif plan.depth > 30:
+                return 'reference: error at {}'.format(plan.depth)
+            return None
+
+        plan = Plan(100, 300, 1.01325, 0.3, 0.85, ((0, 21, 0),))
+        with mock.patch('decotengu.stress.check_plan', check):
+            result = shrink(plan)
+        self.assertEqual(60, result.depth)
+
+        # different kind of failure of reference implementation
+        def check(plan, alt):
+            if plan.depth < 60:
+                return 'reference: dive profile does not end at surface: x'
+            return 'reference: error at {}'.format(plan.depth)
+
+        with mock.patch('decotengu.stress.check_plan', check):
+            result = shrink(plan)
+        self.assertEqual(60, result.depth)
+
+
+    def test_shrink_not_failing(self):
+        """
+        Test shrinking dive plan, which does not fail the check
+        """
+        plan = random_plan(1)
+        with mock.patch('decotengu.stress.check_plan') as f:
+            f.return_value = None
+            self.assertEqual(plan, shrink(plan))
+
+        self.assertEqual(1, f.call_count)
+
+
+    def test_shrink_max_checks(self):
+        """
+        Test shrinking failing dive plan with limited number of checks
+        """
+        with mock.patch('decotengu.stress.check_plan') as f:
+            f.return_value = 'reference: error'
+            shrink(random_plan(1), max_checks=3)
+
+        self.assertEqual(3, f.call_count)
+
+        # the checks of candidates failing the other way are limited too
+        with mock.patch('decotengu.stress.check_plan') as f:
+            f.return_value = 'scan: error'
+            shrink(random_plan(1), max_checks=3, error='reference: error')
+
+        self.assertEqual(3, f.call_count)
+
+
+# vim: sw=4:et:ai
@@ -29,6 +29,7 @@ from unittest import mock
 AIR = GasMix(depth=0, o2=21, n2=79, he=0)
 EAN50 = GasMix(depth=22, o2=50, n2=50, he=0)
 O2 = GasMix(depth=6, o2=100, n2=0, he=0)
+TX1845 = GasMix(depth=0, o2=18, n2=37, he=45)
 
 def _step(phase, abs_p, time, gas=AIR, data=None):
     if data is None: